@@ -0,0 +1,207 @@
+"""
+Benchmark the stages of an export on synthetic vaults.
+
+Run from the repository root:
+
+    python -m benchmarks.run --notes 1000 10000 50000 --output results.json
+    python -m benchmarks.run --notes 1000 --baseline results.json --threshold 0.25
+
+Each stage is timed over a regular export of the whole vault, by the stage
+timers of the parser, the best of the repeats is kept. With a baseline the run fails when a stage got slower than the
+threshold allows.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from obsidian_parser import ObsidianParser
+from benchmarks.vaultgen import VaultShape, generate_vault
+
+
+RESULTS_VERSION = 1
+STAGES = ("scan", "index", "transfer", "tokenize", "embeds", "assets", "links", "frontmatter", "write", "process")
+DEFAULT_SHAPE = VaultShape()
+# Stages faster than this, in seconds, are too noisy to gate on.
+MIN_GATED_SECONDS = 0.005
+
+
+class RemoteImageHandler(BaseHTTPRequestHandler):
+    """Serve a stand-in image for any remote image of the synthetic vault."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        """Serve a small image, the same one for the same path."""
+        body = self.path.encode() * 16
+        self.send_response(200)
+        self.send_header("ETag", f'"{len(body)}"')
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Keep the benchmark output quiet."""
+
+
+@contextlib.contextmanager
+def remote_image_server():
+    """Serve the remote images of the synthetic vault, and yield the base URL."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RemoteImageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def time_stages(vault_dir: str, work_dir: str) -> dict[str, float]:
+    """
+    Export a vault, and time each stage of the export.
+
+    The stages are timed by the parser itself, with the stage timers of its
+    metrics, so the export is the one that ships. The `process` stage is the
+    whole export.
+
+    :param vault_dir: The synthetic vault.
+    :type vault_dir: str
+    :param work_dir: A directory to export into.
+    :type work_dir: str
+
+    :return: The seconds spent in each stage.
+    :rtype: dict[str, float]
+    """
+    hugo_dir = os.path.join(work_dir, "content")
+    shutil.rmtree(hugo_dir, ignore_errors=True)
+    os.makedirs(hugo_dir)
+    parser = ObsidianParser(vault_dir, "blog", hugo_dir)
+    start = time.perf_counter()
+    parser.process(erase_hugo_content=True)
+    seconds = dict.fromkeys(STAGES, 0.0)
+    seconds.update(parser.metrics.snapshot()["stages"])
+    seconds["process"] = time.perf_counter() - start
+    return seconds
+
+
+def run_benchmark(shape: VaultShape, repeat: int = 3, work_dir: str = None) -> dict:
+    """
+    Generate a synthetic vault and time the stages of its export.
+
+    :param shape: The shape of the vault.
+    :type shape: VaultShape
+    :param repeat: The number of timed exports, the best time of each stage
+        is kept.
+    :type repeat: int
+    :param work_dir: The directory to generate and export the vault in, a
+        temporary directory when not given.
+    :type work_dir: str
+
+    :return: The result of the benchmark.
+    :rtype: dict
+    """
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp, remote_image_server() as remote_base:
+        vault_dir = os.path.join(tmp, "vault")
+        start = time.perf_counter()
+        generate_vault(vault_dir, shape, remote_base)
+        generated = time.perf_counter() - start
+        best = {}
+        for _ in range(repeat):
+            for stage, seconds in time_stages(vault_dir, tmp).items():
+                best[stage] = min(seconds, best.get(stage, seconds))
+    return {
+        "shape": shape._asdict(),
+        "generate_seconds": round(generated, 6),
+        "stages": {stage: round(seconds, 6) for stage, seconds in best.items()},
+        "per_note_us": {stage: round(seconds / shape.notes * 1e6, 3) for stage, seconds in best.items()},
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Compare results with a baseline.
+
+    :param results: The results of this run.
+    :type results: dict
+    :param baseline: The results of a previous run.
+    :type baseline: dict
+    :param threshold: The allowed slowdown of a stage, 0.25 allows 25%.
+    :type threshold: float
+
+    :return: A description of each regression.
+    :rtype: list[str]
+    """
+    previous = {run["shape"]["notes"]: run for run in baseline.get("runs", [])}
+    regressions = []
+    for run in results["runs"]:
+        notes = run["shape"]["notes"]
+        if notes not in previous:
+            continue
+        for stage, seconds in run["stages"].items():
+            before = previous[notes]["stages"].get(stage)
+            if before is None or max(before, seconds) < MIN_GATED_SECONDS:
+                continue
+            if seconds > before * (1 + threshold):
+                regressions.append(
+                    f"{notes} notes, {stage}: {seconds:.3f}s against {before:.3f}s (+{(seconds / before - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def main(argv: list[str] = None) -> int:
+    """Run the benchmarks."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--notes", help="Note counts of the vaults to benchmark.", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--note-size", help="Words per note.", type=int, default=DEFAULT_SHAPE.note_size)
+    parser.add_argument("--link-density", help="Wiki links per 100 words.", type=float, default=DEFAULT_SHAPE.link_density)
+    parser.add_argument("--embeds", help="Vault images embedded per note.", type=int, default=DEFAULT_SHAPE.embeds)
+    parser.add_argument("--tags", help="Tags per note.", type=int, default=DEFAULT_SHAPE.tags)
+    parser.add_argument("--remote-images", help="Remote images per note.", type=int, default=DEFAULT_SHAPE.remote_images)
+    parser.add_argument("--seed", help="Seed of the vault generator.", type=int, default=DEFAULT_SHAPE.seed)
+    parser.add_argument("--repeat", help="Timed exports per vault, the best is kept.", type=int, default=3)
+    parser.add_argument("--work-dir", help="Directory to generate the vaults in.", type=str)
+    parser.add_argument("--output", help="File to write the results to, as JSON.", type=str)
+    parser.add_argument("--baseline", help="Results of a previous run to check for regressions.", type=str)
+    parser.add_argument("--threshold", help="Allowed slowdown of a stage against the baseline.", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    results = {
+        "version": RESULTS_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "runs": [],
+    }
+    for notes in args.notes:
+        shape = VaultShape(
+            notes=notes, note_size=args.note_size, link_density=args.link_density, embeds=args.embeds,
+            tags=args.tags, remote_images=args.remote_images, seed=args.seed,
+        )
+        print(f"Benchmarking a vault of {notes} notes...")
+        run = run_benchmark(shape, args.repeat, args.work_dir)
+        for stage in STAGES:
+            print(f"  {stage:<12} {run['stages'][stage]:>10.3f}s {run['per_note_us'][stage]:>12.1f}us/note")
+        results["runs"].append(run)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            return 1
+        print(f"No stage regressed by more than {args.threshold * 100:.0f}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""
+Benchmark how fast the parser starts, for the conversion server.
+
+Run from the repository root:
+
+    python -m benchmarks.startup --output startup.json
+    python -m benchmarks.startup --baseline startup.json --threshold 0.25
+
+Each command runs in a fresh interpreter, the best of the repeats is kept:
+``python`` starts the interpreter alone, ``import`` imports the package,
+``parser`` imports the parser, and ``serve`` starts the conversion server on
+a small synthetic vault and waits for the answer to its first request. The
+run also fails when importing the parser imports a module which is only
+imported on first use.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.vaultgen import VaultShape, generate_vault
+
+
+RESULTS_VERSION = 1
+COMMANDS = ("python", "import", "parser", "serve")
+# Slow to import, and only needed by some runs.
+LAZY_MODULES = ("numpy", "http.client", "multiprocessing", "sqlite3", "subprocess")
+SERVE_SHAPE = VaultShape(notes=50, remote_images=0)
+# Slowdowns smaller than this, in seconds, are too noisy to gate on.
+MIN_GATED_SECONDS = 0.01
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_command(argv: list[str], stdin: bytes = None) -> float:
+    """
+    Run a command to its end.
+
+    :param argv: The command.
+    :type argv: list[str]
+    :param stdin: The input of the command.
+    :type stdin: bytes
+
+    :return: The seconds it took.
+    :rtype: float
+    """
+    start = time.perf_counter()
+    subprocess.run(argv, input=stdin, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, cwd=ROOT_DIR, check=True)
+    return time.perf_counter() - start
+
+
+def eager_modules(module: str) -> list[str]:
+    """
+    Return the lazily imported modules a module imports, in a fresh interpreter.
+
+    :param module: The module to import.
+    :type module: str
+
+    :return: The modules of `LAZY_MODULES` which got imported.
+    :rtype: list[str]
+    """
+    code = f"import json, sys, {module}; print(json.dumps([m for m in {list(LAZY_MODULES)!r} if m in sys.modules]))"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, cwd=ROOT_DIR, check=True).stdout
+    return json.loads(output)
+
+
+def run_startup(repeat: int = 5, work_dir: str = None) -> dict:
+    """
+    Time the start of the parser and of the conversion server.
+
+    :param repeat: The number of runs of each command, the best is kept.
+    :type repeat: int
+    :param work_dir: The directory to generate the vault in, a temporary
+        directory when not given.
+    :type work_dir: str
+
+    :return: The result of the benchmark.
+    :rtype: dict
+    """
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        vault_dir = os.path.join(tmp, "vault")
+        hugo_dir = os.path.join(tmp, "content")
+        os.makedirs(hugo_dir)
+        notes = generate_vault(vault_dir, SERVE_SHAPE)
+        request = json.dumps({"note": os.path.relpath(notes[0], vault_dir)}).encode() + b"\n"
+        commands = {
+            "python": ([sys.executable, "-c", "pass"], None),
+            "import": ([sys.executable, "-c", "import obsidian_parser"], None),
+            "parser": ([sys.executable, "-c", "import obsidian_parser.obsidianparser"], None),
+            "serve": ([
+                sys.executable, "main.py", "--serve", "--obsidian-vault-dir", vault_dir,
+                "--export-dir", "blog", "--hugo-content-dir", hugo_dir,
+            ], request),
+        }
+        best = {}
+        for _ in range(repeat):
+            for command, (argv, stdin) in commands.items():
+                seconds = time_command(argv, stdin)
+                best[command] = min(seconds, best.get(command, seconds))
+    return {
+        "seconds": {command: round(seconds, 6) for command, seconds in best.items()},
+        "eager_modules": eager_modules("obsidian_parser.obsidianparser"),
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Compare results with a baseline.
+
+    The time of the interpreter alone is taken off both, so the comparison
+    is about the parser. Slowdowns of less than `MIN_GATED_SECONDS` are not
+    reported.
+
+    :param results: The results of this run.
+    :type results: dict
+    :param baseline: The results of a previous run.
+    :type baseline: dict
+    :param threshold: The allowed slowdown of a command, 0.25 allows 25%.
+    :type threshold: float
+
+    :return: A description of each regression.
+    :rtype: list[str]
+    """
+    regressions = []
+    now, before = results["seconds"], baseline.get("seconds", {})
+    for command in COMMANDS[1:]:
+        if command not in now or command not in before:
+            continue
+        seconds = now[command] - now["python"]
+        previous = max(before[command] - before.get("python", 0.0), 0.001)
+        if seconds > previous * (1 + threshold) and seconds - previous >= MIN_GATED_SECONDS:
+            regressions.append(
+                f"{command}: {seconds * 1000:.0f}ms against {previous * 1000:.0f}ms (+{(seconds / previous - 1) * 100:.0f}%)"
+            )
+    return regressions
+
+
+def main(argv: list[str] = None) -> int:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", help="Runs of each command, the best is kept.", type=int, default=5)
+    parser.add_argument("--work-dir", help="Directory to generate the vault in.", type=str)
+    parser.add_argument("--output", help="File to write the results to, as JSON.", type=str)
+    parser.add_argument("--baseline", help="Results of a previous run to check for regressions.", type=str)
+    parser.add_argument("--threshold", help="Allowed slowdown of a command against the baseline.", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    results = {
+        "version": RESULTS_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        **run_startup(args.repeat, args.work_dir),
+    }
+    for command in COMMANDS:
+        print(f"  {command:<8} {results['seconds'][command] * 1000:>8.1f}ms")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    failed = False
+    for module in results["eager_modules"]:
+        print(f"Eager import: the parser imports {module} on start")
+        failed = True
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            failed = True
+        else:
+            print(f"No command regressed by more than {args.threshold * 100:.0f}%")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
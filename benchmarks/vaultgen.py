@@ -0,0 +1,121 @@
+"""Deterministic synthetic Obsidian vaults for the benchmarks."""
+import os
+import random
+from typing import NamedTuple
+
+
+WORDS = (
+    "hugo obsidian vault note page bundle asset image link heading section "
+    "azure cloud network storage compute identity policy template module script "
+    "deploy release pipeline build test monitor alert metric log trace"
+).split()
+
+
+class VaultShape(NamedTuple):
+    """
+    The shape of a synthetic vault.
+
+    :param notes: The number of notes.
+    :param note_size: The approximate size of the body of a note, in words.
+    :param link_density: The number of wiki links per 100 words.
+    :param embeds: The number of embedded vault images per note.
+    :param tags: The number of tags per note.
+    :param remote_images: The number of remote images per note.
+    :param images: The number of distinct vault images.
+    :param folders: The number of folders the notes are spread over.
+    :param seed: The seed of the generator.
+    """
+
+    notes: int = 1000
+    note_size: int = 400
+    link_density: float = 2.0
+    embeds: int = 2
+    tags: int = 3
+    remote_images: int = 1
+    images: int = 200
+    folders: int = 20
+    seed: int = 0
+
+
+FRONTMATTER_SHAPES = ("none", "minimal", "full", "aliases")
+
+
+def note_name(index: int) -> str:
+    """Return the name of a synthetic note."""
+    return f"note-{index:06d}"
+
+
+def frontmatter(rng: random.Random, index: int, tags: list[str]) -> str:
+    """Return the frontmatter of a synthetic note, in one of a few shapes."""
+    shape = FRONTMATTER_SHAPES[index % len(FRONTMATTER_SHAPES)]
+    if shape == "none":
+        return ""
+    if shape == "minimal":
+        return f"---\ntitle: Note {index}\n---\n"
+    if shape == "full":
+        return (
+            f"---\ntitle: Note {index}\ndescription: {' '.join(rng.choices(WORDS, k=8))}\n"
+            f"date: 2021-{index % 12 + 1:02d}-{index % 28 + 1:02d}\ntags: [{', '.join(tags)}]\n"
+            f"categories: [{rng.choice(WORDS)}]\ndraft: {str(index % 7 == 0).lower()}\n---\n"
+        )
+    return f"---\naliases:\n  - Alias {index}\n  - {rng.choice(WORDS)} {index}\ntags:\n" + "".join(f"  - {tag}\n" for tag in tags) + "---\n"
+
+
+def generate_vault(vault_dir: str, shape: VaultShape, remote_base: str = "http://127.0.0.1:8000") -> list[str]:
+    """
+    Write a synthetic vault.
+
+    The same shape always produces the same vault. Notes are written to the
+    `blog` folder of the vault, images to its `attachments` folder. Remote
+    images point at `remote_base`, which is expected to serve any
+    ``/img/<n>.png``.
+
+    :param vault_dir: The directory to write the vault to.
+    :type vault_dir: str
+    :param shape: The shape of the vault.
+    :type shape: VaultShape
+    :param remote_base: The URL the remote images are served from.
+    :type remote_base: str
+
+    :return: The File URI's of the notes.
+    :rtype: list[str]
+    """
+    rng = random.Random(shape.seed)
+    attachments_dir = os.path.join(vault_dir, "attachments")
+    os.makedirs(attachments_dir, exist_ok=True)
+    for image in range(shape.images):
+        with open(os.path.join(attachments_dir, f"image-{image:04d}.png"), "wb") as f:
+            f.write(rng.randbytes(256 + image % 1024))
+
+    notes = []
+    for index in range(shape.notes):
+        folder = os.path.join(vault_dir, "blog", f"folder-{index % max(shape.folders, 1):03d}")
+        os.makedirs(folder, exist_ok=True)
+        tags = [f"tag-{rng.randrange(50)}" for _ in range(shape.tags)]
+        lines = [frontmatter(rng, index, tags), f"# Note {index}\n\n"]
+        words = 0
+        section = 0
+        while words < shape.note_size:
+            if words % 120 == 0:
+                section += 1
+                lines.append(f"\n## Section {section}\n\n")
+            sentence = rng.choices(WORDS, k=12)
+            if rng.random() < shape.link_density * 12 / 100:
+                target = note_name(rng.randrange(shape.notes))
+                sentence[rng.randrange(12)] = rng.choice((
+                    f"[[{target}]]", f"[[{target}|alias]]", f"[[{target}#Section 1]]",
+                ))
+            lines.append(" ".join(sentence) + ".\n")
+            words += 12
+        if index % 10 == 0:
+            lines.append("\n```python\n# [[not-a-link]] #not-a-tag\nprint('code')\n```\n")
+        for _ in range(shape.embeds):
+            lines.append(f"\n![[attachments/image-{rng.randrange(shape.images):04d}.png]]\n")
+        for _ in range(shape.remote_images):
+            lines.append(f"\n![remote]({remote_base}/img/{rng.randrange(shape.images)}.png)\n")
+        lines.append("\n" + " ".join(f"#{tag}" for tag in tags) + "\n")
+        note = os.path.join(folder, note_name(index) + ".md")
+        with open(note, "w", encoding="utf-8") as f:
+            f.write("".join(lines))
+        notes.append(note)
+    return notes
@@ -4,8 +4,23 @@ Obsidian Parser CLI
 
 # Import Multiplication from your library
 from obsidian_parser import ObsidianParser
+from obsidian_parser.assetstore import ASSET_MODES, AssetStore
+from obsidian_parser.metadata import MetadataIndex
+from obsidian_parser.remote import RemoteFetcher
+from obsidian_parser.renderers import RENDERERS
+from obsidian_parser.scanner import VaultScanner
+from obsidian_parser.search import SearchIndex
+from obsidian_parser.server import ConversionServer
+from obsidian_parser.shard import Shard, merge_shards
+from obsidian_parser.schema import FrontmatterSchema
+from obsidian_parser.targets import load_targets
+from obsidian_parser.watcher import VaultWatcher
+from obsidian_parser.instrumentation import logger
 import argparse
+import cProfile
+import logging
 import os
+import sys
 
 __version__ = "0.3.5"
 
@@ -29,16 +44,253 @@ parser.add_argument(
     type=str
 )
 
+parser.add_argument(
+    "--incremental",
+    help="Only export the notes which changed since the previous export, and remove the bundles of deleted notes.",
+    action="store_true",
+)
+
+parser.add_argument(
+    "--plan",
+    help="Only list the files an export would create, update or delete, and exit with 1 when there are any.",
+    action="store_true",
+)
+
+parser.add_argument(
+    "--sync",
+    help="Only create, update and delete the files which changed, instead of erasing the Hugo content directory.",
+    action="store_true",
+)
+
+parser.add_argument(
+    "--watch",
+    help="Keep running, and export the notes affected by each change to the vault.",
+    action="store_true",
+)
+
+parser.add_argument(
+    "--watch-debounce",
+    help="Seconds to wait for a burst of changes to settle before exporting, in watch mode.",
+    type=float,
+    default=0.2,
+)
+
+parser.add_argument(
+    "--watch-polling",
+    help="Poll the vault for changes instead of using inotify, in watch mode.",
+    action="store_true",
+)
+
+parser.add_argument(
+    "--serve",
+    help="Keep running, and convert the notes requested as JSON lines on stdin, answering on stdout, "
+    "without writing them to the Hugo content directory.",
+    action="store_true",
+)
+
+parser.add_argument(
+    "--serve-socket",
+    help="Keep running like --serve, but take the conversion requests on this Unix socket instead of stdin.",
+    type=str,
+)
+
+parser.add_argument(
+    "--jobs",
+    help="Number of notes to process in parallel, 0 uses all CPU cores.",
+    type=int,
+    default=1,
+)
+
+parser.add_argument(
+    "--asset-mode",
+    help="How vault assets are placed into page bundles: copied into each bundle, "
+    "stored once and hard linked into each bundle, or stored once and shared by all pages.",
+    choices=ASSET_MODES,
+    default="copy",
+)
+
+parser.add_argument(
+    "--asset-store-dir",
+    help="Directory the assets are stored in once, for the link and shared asset modes.",
+    type=str,
+)
+
+parser.add_argument(
+    "--asset-store-url",
+    help="URL the asset store directory is published under, for the shared asset mode.",
+    type=str,
+)
+
+parser.add_argument(
+    "--cache-dir",
+    help="Directory to keep caches in between runs, such as downloaded remote images.",
+    type=str,
+)
+
+parser.add_argument(
+    "--tag",
+    help="Only export the notes with this tag.",
+    type=str,
+)
+
+parser.add_argument(
+    "--where",
+    help="Only export the notes with this frontmatter field, as KEY or KEY=VALUE. Can be repeated.",
+    action="append",
+    default=[],
+)
+
+parser.add_argument(
+    "--folder",
+    help="Only export the notes in this folder of the export directory. Can be repeated.",
+    action="append",
+    default=[],
+)
+
+parser.add_argument(
+    "--ignore",
+    help="Skip the files and folders matching this glob, on top of the globs in the .exportignore file "
+    "of the vault. Can be repeated.",
+    action="append",
+    default=[],
+)
+
+parser.add_argument(
+    "--targets",
+    help="YAML file routing the notes of the export directory, by folder, tag or frontmatter fields, "
+    "to sections of the Hugo content directory or to other content directories, exported from a single scan of the vault.",
+    type=str,
+)
+
+parser.add_argument(
+    "--frontmatter-schema",
+    help="YAML file listing the frontmatter fields of the Hugo pages, with their source fields and defaults.",
+    type=str,
+)
+
+parser.add_argument(
+    "--backlinks",
+    help="Add the backlinks of each page, and its related pages when --related is given, to its frontmatter.",
+    action="store_true",
+)
+
+parser.add_argument(
+    "--related",
+    help="Number of related pages to list for each page, by the links and tags they share.",
+    type=int,
+    default=0,
+)
+
+parser.add_argument(
+    "--graph-data",
+    help="File to write the backlinks and related pages of every page to, as JSON, such as a file in the data directory of the site.",
+    type=str,
+)
+
+parser.add_argument(
+    "--search-index",
+    help="Directory to write a sharded full-text search index of the pages to, such as a directory of the static files of the site.",
+    type=str,
+)
+
+parser.add_argument(
+    "--search-shards",
+    help="Number of files the terms of the search index are spread over.",
+    type=int,
+    default=16,
+)
+
+parser.add_argument(
+    "--render",
+    help="Also render the notes to another output target, as FORMAT=DIR, from the same parsed notes. "
+    f"The formats are {', '.join(RENDERERS)}. Can be repeated.",
+    action="append",
+    default=[],
+)
+
+parser.add_argument(
+    "--shard",
+    help="Only export this shard of the notes, as i/N, to split an export over N runners. "
+    "Merge the hugo content directories of the shards with the merge command.",
+    type=str,
+)
+
+parser.add_argument(
+    "--log-level",
+    help="The level of the messages to log, debug lists every note, image and link.",
+    choices=["debug", "info", "warning", "error"],
+    default="info",
+)
+
+parser.add_argument(
+    "--metrics-json",
+    help="File to write the counters, stage timings and slowest notes of the run to, as JSON.",
+    type=str,
+)
+
+parser.add_argument(
+    "--profile",
+    help="File to write cProfile statistics of the run to, for use with pstats or snakeviz.",
+    type=str,
+)
+
 parser.add_argument(
     "--version",
     action="version",
     version="%(prog)s " + __version__,
 )
 
+merge_parser = argparse.ArgumentParser(
+    prog="main.py merge",
+    description="Merge the hugo content directories of the shards of an export, exported with --shard.",
+)
+
+merge_parser.add_argument(
+    "--hugo-content-dir",
+    help="Directory of your Hugo content directory, the shards should be merged into.",
+    type=str,
+    required=True,
+)
+
+merge_parser.add_argument(
+    "--allow-broken-links",
+    help="Merge the shards even when links point at pages no shard exported.",
+    action="store_true",
+)
+
+merge_parser.add_argument(
+    "shard_dirs",
+    help="The hugo content directories of the shards.",
+    nargs="+",
+)
+
+def merge(argv: list[str]) -> int:
+    """Run the merge command."""
+    args = merge_parser.parse_args(argv)
+    logging.basicConfig(format="%(message)s", level=logging.INFO)
+    logger.info("Obsidian Parser CLI %s", __version__)
+    for shard_dir in args.shard_dirs:
+        if not os.path.isdir(shard_dir):
+            merge_parser.error(f"The shard directory `{shard_dir}` does not exist.")
+    try:
+        result = merge_shards(args.shard_dirs, args.hugo_content_dir)
+    except ValueError as e:
+        logger.error("%s", e)
+        return 1
+    if result["broken_links"] and not args.allow_broken_links:
+        logger.error("%d link(s) point at pages no shard exported", len(result["broken_links"]))
+        return 1
+    return 0
+
 def main():
     """Run the CLI."""
+    if sys.argv[1:2] == ["merge"]:
+        sys.exit(merge(sys.argv[2:]))
     args = parser.parse_args()
-    print(f"Obsidian Parser CLI {__version__}")
+    # Stdout carries the responses when serving on stdin.
+    log_stream = sys.stderr if args.serve and not args.serve_socket else sys.stdout
+    logging.basicConfig(format="%(message)s", level=args.log_level.upper(), stream=log_stream)
+    logger.info("Obsidian Parser CLI %s", __version__)
     if not args.hugo_content_dir or not os.path.isdir(args.hugo_content_dir):
         parser.error("The hugo content directory does not exist.")
     if not args.obsidian_vault_dir or not os.path.isdir(args.obsidian_vault_dir):
@@ -46,12 +298,109 @@ def main():
     if not args.export_dir or not os.path.isdir(os.path.join(args.obsidian_vault_dir, args.export_dir)):
         parser.error("The obsidian vault directory to export does not exist.")
 
+    if args.asset_mode != "copy" and not args.asset_store_dir:
+        parser.error(f"The {args.asset_mode} asset mode requires --asset-store-dir.")
+    if args.asset_mode == "shared" and args.asset_store_url is None:
+        parser.error("The shared asset mode requires --asset-store-url.")
+
+    fields = {}
+    for condition in args.where:
+        key, separator, value = condition.partition("=")
+        fields[key.strip()] = value.strip() if separator else None
+
+    renderers = []
+    for target in args.render:
+        name, separator, output_dir = target.partition("=")
+        if name.strip() not in RENDERERS or not separator or not output_dir.strip():
+            parser.error(f"The render target `{target}` is not FORMAT=DIR, with one of the formats {', '.join(RENDERERS)}.")
+        renderers.append(RENDERERS[name.strip()](output_dir.strip()))
+
+    targets = None
+    if args.targets:
+        if not os.path.isfile(args.targets):
+            parser.error("The export targets do not exist.")
+        try:
+            targets = load_targets(args.targets)
+        except ValueError as e:
+            parser.error(str(e))
+
+    shard = None
+    if args.shard:
+        try:
+            shard = Shard.parse(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+        if args.search_index:
+            parser.error("The search index cannot be split over shards, build it in an export which is not sharded.")
+        if args.watch or args.serve or args.serve_socket:
+            parser.error("--shard only applies to a single export.")
+
+    if args.frontmatter_schema and not os.path.isfile(args.frontmatter_schema):
+        parser.error("The frontmatter schema does not exist.")
+
+    scanner = VaultScanner(args.obsidian_vault_dir, args.ignore)
     obsidian_parser = ObsidianParser(
         obsidian_vault_dir=args.obsidian_vault_dir,
         vault_content_dir=args.export_dir,
         hugo_content_dir=args.hugo_content_dir,
+        jobs=args.jobs,
+        asset_store=AssetStore(args.asset_mode, args.asset_store_dir, args.asset_store_url),
+        remote_fetcher=RemoteFetcher(os.path.join(args.cache_dir, "http") if args.cache_dir else None),
+        metadata_index=MetadataIndex(os.path.join(args.cache_dir, "metadata.sqlite3"), args.obsidian_vault_dir) if args.cache_dir else None,
+        export_filter={"hashtag": args.tag, "fields": fields, "folders": args.folder},
+        scanner=scanner,
+        frontmatter_schema=FrontmatterSchema.load(args.frontmatter_schema) if args.frontmatter_schema else None,
+        graph={"frontmatter": args.backlinks, "data_file": args.graph_data, "related": args.related}
+        if args.backlinks or args.graph_data else None,
+        search_index=SearchIndex(args.search_index, args.search_shards) if args.search_index else None,
+        renderers=renderers,
+        shard=shard,
+        targets=targets,
     )
-    obsidian_parser.process(erase_hugo_content=True)
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler is not None:
+        profiler.enable()
+    plan = None
+    try:
+        if args.plan:
+            try:
+                plan = obsidian_parser.plan()
+            finally:
+                obsidian_parser.close()
+            plan.log()
+        elif args.serve or args.serve_socket:
+            server = ConversionServer(obsidian_parser)
+            server.load()
+            try:
+                if args.serve_socket:
+                    server.serve_socket(args.serve_socket)
+                else:
+                    server.serve(sys.stdin.buffer, sys.stdout.buffer)
+            finally:
+                obsidian_parser.close()
+        elif args.sync:
+            obsidian_parser.sync()
+        elif args.watch:
+            watcher = VaultWatcher(
+                args.obsidian_vault_dir,
+                debounce=args.watch_debounce,
+                exclude=[args.hugo_content_dir] + obsidian_parser.get_content_dirs(),
+                polling=args.watch_polling,
+                scanner=scanner,
+            )
+            obsidian_parser.watch(erase_hugo_content=True, watcher=watcher)
+        else:
+            obsidian_parser.process(erase_hugo_content=True, incremental=args.incremental)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            logger.info("Wrote the profile of the run to %s", args.profile)
+    obsidian_parser.log_summary()
+    if args.metrics_json:
+        obsidian_parser.metrics.write_json(args.metrics_json)
+    if plan is not None and plan.has_changes():
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
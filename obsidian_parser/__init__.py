@@ -1,4 +1,25 @@
-# This line of code will allow shorter imports
-from obsidian_parser.multiplication import Multiplication
-from obsidian_parser.obsidianparser import ObsidianParser
-from obsidian_parser.wikiparser import WikiParser
\ No newline at end of file
+# This will allow shorter imports, the modules are only imported on first use,
+# so importing a single module of the package stays fast.
+import importlib
+
+_EXPORTS = {
+    "Multiplication": "obsidian_parser.multiplication",
+    "ObsidianParser": "obsidian_parser.obsidianparser",
+    "WikiParser": "obsidian_parser.wikiparser",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    """Import the class of a shorter import on first use."""
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    """List the shorter imports too."""
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,105 @@
+"""Content addressed storage for the vault assets of page bundles."""
+import os
+from obsidian_parser.manifest import hash_file
+from obsidian_parser.output import ContentWriter
+
+
+ASSET_MODES = ("copy", "link", "shared")
+
+
+class AssetStore:
+    """
+    Place vault assets into page bundles.
+
+    In ``copy`` mode every bundle gets its own copy of an asset. In ``link``
+    mode each asset is stored once, named after its content hash, and the
+    bundles get a hardlink (or a reflink, or a copy when neither is possible)
+    of the stored file. In ``shared`` mode the asset is only stored once and
+    the pages link to it through the URL the store is published under.
+
+    Each asset is hashed at most once per run.
+
+    :param mode: How assets are placed, one of ``copy``, ``link`` or ``shared``.
+    :type mode: str
+    :param store_dir: The directory assets are stored in for ``link`` and
+        ``shared`` mode.
+    :type store_dir: str
+    :param store_url: The URL the store directory is published under, for
+        ``shared`` mode.
+    :type store_url: str
+    """
+
+    def __init__(self, mode: str = "copy", store_dir: str = None, store_url: str = None):
+        """Initialize AssetStore."""
+        if mode not in ASSET_MODES:
+            raise ValueError(f"Unknown asset mode '{mode}', expected one of {', '.join(ASSET_MODES)}")
+        if mode != "copy" and not store_dir:
+            raise ValueError(f"The '{mode}' asset mode needs a store directory")
+        if mode == "shared" and store_url is None:
+            raise ValueError("The 'shared' asset mode needs a store URL")
+        self.mode = mode
+        self.store_dir = store_dir
+        self.store_url = store_url
+        self.digests: dict[str, str] = {}
+
+    def digest(self, source: str) -> str:
+        """
+        Return the content hash of an asset, reading it once per run.
+
+        :param source: The File URI of the asset.
+        :type source: str
+
+        :return: The hex digest of the asset.
+        :rtype: str
+        """
+        if source not in self.digests:
+            self.digests[source] = hash_file(source)
+        return self.digests[source]
+
+    def reset(self) -> None:
+        """Forget the hashes taken so far, so assets which changed since are hashed again."""
+        self.digests.clear()
+
+    def store(self, source: str, writer: ContentWriter = None) -> str:
+        """
+        Store an asset under its content hash, unless it is stored already.
+
+        :param source: The File URI of the asset.
+        :type source: str
+        :param writer: The writer to store the asset with.
+        :type writer: ContentWriter
+
+        :return: The name of the stored asset.
+        :rtype: str
+        """
+        writer = writer or ContentWriter()
+        name = self.digest(source)[:16] + os.path.splitext(source)[1].lower()
+        writer.makedirs(self.store_dir)
+        writer.store_file(source, os.path.join(self.store_dir, name))
+        return name
+
+    def place(self, source: str, bundle_dir: str, writer: ContentWriter = None) -> str:
+        """
+        Place an asset for a page bundle.
+
+        :param source: The File URI of the asset.
+        :type source: str
+        :param bundle_dir: The page bundle directory.
+        :type bundle_dir: str
+        :param writer: The writer to copy or link the asset with.
+        :type writer: ContentWriter
+
+        :return: The link the page uses for the asset.
+        :rtype: str
+        """
+        writer = writer or ContentWriter()
+        bundle_name = os.path.basename(bundle_dir)
+        asset_name = os.path.basename(source)
+        if self.mode == "copy":
+            writer.copy_file(source, os.path.join(bundle_dir, asset_name))
+            return f"{bundle_name}/{asset_name}"
+        name = self.store(source, writer)
+        if self.mode == "shared":
+            return f"{self.store_url.rstrip('/')}/{name}"
+        writer.link_file(os.path.join(self.store_dir, name), os.path.join(bundle_dir, asset_name))
+        return f"{bundle_name}/{asset_name}"
@@ -0,0 +1,173 @@
+"""Vault wide index resolving embedded attachments the way Obsidian does."""
+import hashlib
+import os
+from typing import Optional
+from urllib.parse import unquote
+from obsidian_parser.instrumentation import logger
+
+
+class AttachmentIndex:
+    """
+    Index of the attachments of a vault, the files which are not notes.
+
+    Obsidian mostly embeds an attachment by its bare name, ``![[diagram.png]]``,
+    wherever the file is stored. An embed is resolved by its path relative to
+    the vault, then relative to the folder of the embedding note, then by its
+    name, or the end of its path, preferring the file closest to the note and
+    then the shortest path when several match. All lookups are dictionary
+    lookups, the vault is only walked while the index is built.
+
+    The embeds which do not resolve, and the names shared by several files,
+    are collected while embeds are resolved so they can be reported in bulk.
+
+    :param obsidian_vault_dir: The Obsidian vault directory.
+    :type obsidian_vault_dir: str
+    """
+
+    def __init__(self, obsidian_vault_dir: str):
+        """Initialize an empty AttachmentIndex."""
+        self.obsidian_vault_dir = obsidian_vault_dir
+        self.paths: dict[str, str] = {}
+        self.names: dict[str, list[str]] = {}
+        self.relpaths: dict[str, str] = {}
+        self.missing: dict[str, set[str]] = {}
+        self.ambiguous: dict[str, list[str]] = {}
+
+    def add(self, path: str) -> None:
+        """
+        Add an attachment to the index.
+
+        :param path: The File URI of the attachment.
+        :type path: str
+        """
+        if path in self.relpaths:
+            return
+        relpath = os.path.relpath(path, self.obsidian_vault_dir).replace(os.sep, "/")
+        key = relpath.lower()
+        self.relpaths[path] = relpath
+        self.paths[key] = path
+        self.names.setdefault(key.rsplit("/", 1)[-1], []).append(path)
+
+    def remove(self, path: str) -> None:
+        """
+        Remove an attachment which was deleted or moved from the index.
+
+        :param path: The File URI of the attachment.
+        :type path: str
+        """
+        relpath = self.relpaths.pop(path, None)
+        if relpath is None:
+            return
+        key = relpath.lower()
+        if self.paths.get(key) == path:
+            del self.paths[key]
+        name = key.rsplit("/", 1)[-1]
+        self.names[name].remove(path)
+        if not self.names[name]:
+            del self.names[name]
+
+    def locate(self, link: str, source: Optional[str] = None) -> list[str]:
+        """
+        Return the attachments an embed may refer to, the best match first.
+
+        Links which do not match as they are are also tried URL decoded, as
+        markdown images encode spaces as ``%20``.
+
+        :param link: The link of the embed.
+        :type link: str
+        :param source: The File URI of the embedding note.
+        :type source: str
+
+        :return: The File URI's of the matching attachments.
+        :rtype: list[str]
+        """
+        candidates = self._locate(link, source)
+        if not candidates and "%" in link:
+            candidates = self._locate(unquote(link), source)
+        return candidates
+
+    def _locate(self, link: str, source: Optional[str]) -> list[str]:
+        """Return the attachments a link may refer to, the best match first."""
+        target = link.strip().replace("\\", "/").lstrip("/").lower()
+        if not target:
+            return []
+        key = os.path.normpath(target).replace(os.sep, "/")
+        if key in self.paths:
+            return [self.paths[key]]
+        source_dir = os.path.dirname(os.path.relpath(source, self.obsidian_vault_dir)).replace(os.sep, "/").lower() if source else ""
+        if source_dir:
+            relative = os.path.normpath(os.path.join(source_dir, target)).replace(os.sep, "/")
+            if relative in self.paths:
+                return [self.paths[relative]]
+        candidates = self.names.get(key.rsplit("/", 1)[-1], [])
+        if "/" in key:
+            candidates = [path for path in candidates if self.relpaths[path].lower().endswith("/" + key)]
+        if len(candidates) > 1:
+            # Like Obsidian, prefer the file closest to the embedding note, then the shortest path.
+            candidates = sorted(candidates, key=lambda path: (
+                -len(os.path.commonpath([source_dir, os.path.dirname(self.relpaths[path].lower())]) or ""),
+                len(self.relpaths[path]),
+                self.relpaths[path],
+            ))
+        return candidates
+
+    def resolve(self, link: str, source: Optional[str] = None) -> Optional[str]:
+        """
+        Resolve an embed to the attachment it refers to.
+
+        :param link: The link of the embed.
+        :type link: str
+        :param source: The File URI of the embedding note.
+        :type source: str
+
+        :return: The File URI of the attachment, or None when the embed does
+            not resolve.
+        :rtype: str
+        """
+        candidates = self.locate(link, source)
+        if not candidates:
+            self.missing.setdefault(link, set()).add(source or "")
+            return None
+        if len(candidates) > 1:
+            self.ambiguous[link] = candidates
+        return candidates[0]
+
+    def signature(self, links: list[str], source: Optional[str] = None) -> str:
+        """
+        Return a digest of where the embeds of a note resolve to.
+
+        The digest changes when an attachment the embeds resolve to is moved,
+        deleted or added, such as a missing one or a closer one of the same
+        name, even though the embedding note itself did not change.
+
+        :param links: The links of the embeds.
+        :type links: list[str]
+        :param source: The File URI of the embedding note.
+        :type source: str
+
+        :return: The hex digest of the embed resolutions.
+        :rtype: str
+        """
+        digest = hashlib.sha256()
+        for link in links:
+            candidates = self.locate(link, source)
+            digest.update(f"{link}\0{self.relpaths[candidates[0]] if candidates else ''}\n".encode())
+        return digest.hexdigest()
+
+    def reset_report(self) -> None:
+        """Forget the missing and ambiguous embeds found so far, so the next report only has the new ones."""
+        self.missing.clear()
+        self.ambiguous.clear()
+
+    def report(self) -> None:
+        """Log the embeds which did not resolve and the ambiguous ones."""
+        if self.missing:
+            logger.warning("Missing attachments (%d):", len(self.missing))
+            for link, sources in sorted(self.missing.items()):
+                notes = ", ".join(sorted(os.path.relpath(source, self.obsidian_vault_dir) if source else "?" for source in sources))
+                logger.warning("  `%s` in %s", link, notes)
+        if self.ambiguous:
+            logger.warning("Ambiguous attachments (%d):", len(self.ambiguous))
+            for link, candidates in sorted(self.ambiguous.items()):
+                paths = ", ".join(self.relpaths[path] for path in candidates)
+                logger.warning("  `%s` matches %s, using the first", link, paths)
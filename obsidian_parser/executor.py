@@ -0,0 +1,115 @@
+"""Parallel execution of the note export."""
+import concurrent.futures
+import logging
+import time
+from obsidian_parser.instrumentation import ThreadLogCapture, logger, replay
+
+
+# The frontmatter schema a process pool worker reformats pages with, set once per worker.
+_worker_schema = None
+_worker_log = ThreadLogCapture()
+
+
+def _init_worker(schema, log_level: int) -> None:
+    """Keep the frontmatter schema of the run in the worker process, and capture its log."""
+    global _worker_schema
+    _worker_schema = schema
+    logger.setLevel(log_level)
+    logger.addFilter(_worker_log)
+
+
+def _reformat_note(note_content: str, fields: dict) -> tuple[str, list[logging.LogRecord], float]:
+    """Reformat a page in a worker process and return the page, log and time taken."""
+    start = time.perf_counter()
+    with _worker_log.capture() as records:
+        note_content = _worker_schema.reformat(note_content, fields)
+    for record in records:
+        # Format the message here, its arguments may not survive pickling.
+        record.msg, record.args = record.getMessage(), None
+    return note_content, records, time.perf_counter() - start
+
+
+class ParallelExecutor:
+    """
+    Export notes in parallel.
+
+    Each note is exported by :meth:`ObsidianParser.process_note` on a thread
+    pool, as reading the note, copying or downloading its assets and writing
+    its page is I/O bound. Reformatting the frontmatter, which is where the
+    YAML work happens, is handed to a process pool. The workers are only
+    sent the frontmatter schema, and each page with the fields to add to its
+    frontmatter. Only the reformatting runs on the processes: tokenizing a
+    note and expanding its embeds need the vault index and the embedded
+    notes, which stay in this process, so they run on the threads. The log
+    records of each note are captured and replayed in the order of the
+    notes, so the log reads the same as that of a serial run.
+
+    The process pool is started by the first run and kept until the executor
+    is closed, so the passes of watch mode do not start the workers again.
+
+    :param parser: The parser to export the notes with.
+    :type parser: ObsidianParser
+    :param jobs: The number of worker processes to use, twice as many threads
+        are used so reading and writing overlaps the reformatting.
+    :type jobs: int
+    """
+
+    def __init__(self, parser, jobs: int):
+        """Initialize ParallelExecutor."""
+        self.parser = parser
+        self.jobs = jobs
+        self.processes = None
+
+    def run(self, notes: list[str]) -> list:
+        """
+        Export the notes.
+
+        :param notes: The File URI's of the notes to export.
+        :type notes: list[str]
+
+        :return: The export result of each note, in the order of the notes.
+        :rtype: list[ExportResult]
+        """
+        log = ThreadLogCapture()
+        results = []
+        if self.processes is None:
+            # Imported here, only parallel runs need multiprocessing. Spawned
+            # workers are safe to start while the thread pool is busy, forked
+            # ones are not.
+            import multiprocessing
+            self.processes = concurrent.futures.ProcessPoolExecutor(
+                self.jobs, mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker,
+                initargs=(self.parser.frontmatter_schema, logger.getEffectiveLevel()),
+            )
+        logger.addFilter(log)
+        try:
+            with concurrent.futures.ThreadPoolExecutor(2 * self.jobs) as threads:
+                exports = [threads.submit(self._export_note, log, self.processes, note) for note in notes]
+                for export in exports:
+                    result, records = export.result()
+                    replay(records)
+                    results.append(result)
+        finally:
+            logger.removeFilter(log)
+        return results
+
+    def close(self) -> None:
+        """Shut the worker processes down, the next run starts them again."""
+        if self.processes is not None:
+            self.processes.shutdown()
+            self.processes = None
+
+    def _export_note(self, log: ThreadLogCapture, processes: "concurrent.futures.ProcessPoolExecutor", note: str):
+        """Export a note, reformatting its page on the process pool."""
+        metrics = self.parser.metrics
+
+        def reformat(note_content: str, fields: dict) -> str:
+            note_content, records, seconds = processes.submit(_reformat_note, note_content, fields).result()
+            metrics.add_time("frontmatter", seconds)
+            # Logged within the capture of this thread, in the order they happened.
+            replay(records)
+            return note_content
+
+        with log.capture() as records:
+            result = self.parser.process_note(note, reformat)
+        return result, records
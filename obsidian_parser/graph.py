@@ -0,0 +1,163 @@
+"""Link graph of the exported notes, for backlinks and related notes."""
+import heapq
+from array import array
+from typing import Iterable
+from obsidian_parser.vaultindex import VaultIndex
+
+
+# Links and tags shared by more notes than this say little about how related
+# two notes are, and would make finding related notes quadratic.
+MAX_FEATURE_NOTES = 200
+
+
+def transpose(offsets: array, targets: array, size: int) -> tuple[array, array]:
+    """
+    Reverse the edges of adjacency lists, with a counting sort.
+
+    The adjacency lists are packed: the edges of node `i` are
+    ``targets[offsets[i]:offsets[i + 1]]``. The reversed lists keep the
+    sources of each node in ascending order.
+
+    :param offsets: The start of the edges of each node, and the end of the last.
+    :type offsets: array
+    :param targets: The target of each edge.
+    :type targets: array
+    :param size: The number of nodes the edges point at.
+    :type size: int
+
+    :return: The offsets and sources of the reversed adjacency lists.
+    :rtype: tuple[array, array]
+    """
+    counts = array("l", [0]) * (size + 1)
+    for target in targets:
+        counts[target + 1] += 1
+    for i in range(size):
+        counts[i + 1] += counts[i]
+    reversed_offsets = array("l", counts)
+    sources = array("l", [0]) * len(targets)
+    for source in range(len(offsets) - 1):
+        for edge in range(offsets[source], offsets[source + 1]):
+            target = targets[edge]
+            sources[counts[target]] = source
+            counts[target] += 1
+    return reversed_offsets, sources
+
+
+class LinkGraph:
+    """
+    The links between the exported notes and the tags they share.
+
+    Each note gets an integer ID in index order. Outgoing links, backlinks,
+    and the tags of each note and the notes of each tag are packed
+    adjacency lists in typed arrays, built from what the vault index
+    extracted while it read each note, so no note is read again. Building the
+    graph and its backlinks takes O(V + E).
+
+    :param notes: The File URI's of the notes, in ID order.
+    :type notes: list[str]
+    """
+
+    def __init__(self, notes: list[str]):
+        """Initialize an empty LinkGraph."""
+        self.notes = notes
+        self.ids = {note: i for i, note in enumerate(notes)}
+        self.link_offsets = array("l", [0])
+        self.link_targets = array("l")
+        self.backlink_offsets = array("l", [0]) * (len(notes) + 1)
+        self.backlink_sources = array("l")
+        self.tags: list[str] = []
+        self.tag_offsets = array("l", [0])
+        self.tag_ids = array("l")
+        self.tag_note_offsets = array("l", [0])
+        self.tag_notes = array("l")
+
+    @classmethod
+    def build(cls, vault_index: VaultIndex) -> "LinkGraph":
+        """
+        Build the graph of the notes of a vault index.
+
+        Wiki links and note embeds are both links. Links which do not resolve
+        to an exported note, links of a note to itself and repeated links are
+        left out.
+
+        :param vault_index: The index of the exported notes.
+        :type vault_index: VaultIndex
+
+        :return: The graph.
+        :rtype: LinkGraph
+        """
+        graph = cls(list(vault_index.relpaths))
+        tag_ids: dict[str, int] = {}
+        for i, note in enumerate(graph.notes):
+            linked = set()
+            for link in vault_index.links.get(note, []) + vault_index.assets.get(note, []):
+                candidates = vault_index.locate(link.partition("#")[0], note)
+                j = graph.ids.get(candidates[0]) if candidates else None
+                if j is not None and j != i and j not in linked:
+                    linked.add(j)
+                    graph.link_targets.append(j)
+            graph.link_offsets.append(len(graph.link_targets))
+            for tag in vault_index.tags.get(note, []):
+                if tag not in tag_ids:
+                    tag_ids[tag] = len(graph.tags)
+                    graph.tags.append(tag)
+                graph.tag_ids.append(tag_ids[tag])
+            graph.tag_offsets.append(len(graph.tag_ids))
+        size = len(graph.notes)
+        graph.backlink_offsets, graph.backlink_sources = transpose(graph.link_offsets, graph.link_targets, size)
+        graph.tag_note_offsets, graph.tag_notes = transpose(graph.tag_offsets, graph.tag_ids, len(graph.tags))
+        return graph
+
+    def links(self, note: str) -> list[str]:
+        """Return the notes a note links to."""
+        i = self.ids[note]
+        return [self.notes[j] for j in self.link_targets[self.link_offsets[i]:self.link_offsets[i + 1]]]
+
+    def backlinks(self, note: str) -> list[str]:
+        """Return the notes linking to a note, in index order."""
+        i = self.ids[note]
+        return [self.notes[j] for j in self.backlink_sources[self.backlink_offsets[i]:self.backlink_offsets[i + 1]]]
+
+    def related(self, note: str, count: int, max_feature_notes: int = MAX_FEATURE_NOTES) -> list[str]:
+        """
+        Return the notes most related to a note.
+
+        A note scores a point for each link between the two notes, each note
+        both link to and each tag both have. Links and tags shared by more
+        than `max_feature_notes` notes are not counted. Ties go to the note
+        first in index order.
+
+        :param note: The File URI of the note.
+        :type note: str
+        :param count: The number of related notes to return.
+        :type count: int
+        :param max_feature_notes: Links and tags of more notes than this are
+            not counted.
+        :type max_feature_notes: int
+
+        :return: The File URI's of the related notes, the most related first.
+        :rtype: list[str]
+        """
+        i = self.ids[note]
+        scores: dict[int, int] = {}
+        targets = self.link_targets[self.link_offsets[i]:self.link_offsets[i + 1]]
+        sources = self.backlink_sources[self.backlink_offsets[i]:self.backlink_offsets[i + 1]]
+        self._score(scores, targets)
+        self._score(scores, sources)
+        for target in targets:
+            self._score(scores, self._slice(self.backlink_offsets, self.backlink_sources, target, max_feature_notes))
+        for tag in self.tag_ids[self.tag_offsets[i]:self.tag_offsets[i + 1]]:
+            self._score(scores, self._slice(self.tag_note_offsets, self.tag_notes, tag, max_feature_notes))
+        scores.pop(i, None)
+        best = heapq.nsmallest(count, scores.items(), key=lambda item: (-item[1], item[0]))
+        return [self.notes[j] for j, _ in best]
+
+    def _slice(self, offsets: array, values: array, i: int, limit: int) -> Iterable[int]:
+        """Return the adjacency list of a node, or nothing when it is longer than limit."""
+        start, end = offsets[i], offsets[i + 1]
+        return values[start:end] if end - start <= limit else ()
+
+    def _score(self, scores: dict[int, int], notes: Iterable[int]) -> None:
+        """Add a point to the score of each note."""
+        for j in notes:
+            scores[j] = scores.get(j, 0) + 1
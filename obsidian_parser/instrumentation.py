@@ -0,0 +1,177 @@
+"""Logging, counters and stage timers of an export run."""
+import contextlib
+import heapq
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+
+
+# The logger of the package, every module logs through it so the output of a
+# note can be captured and replayed in order by the parallel executor.
+logger = logging.getLogger("obsidian_parser")
+
+METRICS_VERSION = 1
+
+
+class Metrics:
+    """
+    Thread safe counters and stage timers of a run.
+
+    Counters count events such as notes processed, bytes read and written and
+    assets copied, downloaded or missing. Stage timers add up the time spent
+    in each stage of the export of a note, and the time spent on each note is
+    kept to find the slowest notes.
+    """
+
+    def __init__(self):
+        """Initialize Metrics."""
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Drop everything counted and timed so far."""
+        with self._lock:
+            self.counters: dict[str, int] = defaultdict(int)
+            self.stages: dict[str, float] = defaultdict(float)
+            self.notes: dict[str, float] = {}
+            self.started = time.perf_counter()
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """
+        Add to a counter.
+
+        :param name: The name of the counter.
+        :type name: str
+        :param amount: The amount to add.
+        :type amount: int
+        """
+        with self._lock:
+            self.counters[name] += amount
+
+    def set(self, name: str, value: int) -> None:
+        """Set a counter to a value counted elsewhere."""
+        with self._lock:
+            self.counters[name] = value
+
+    def add_time(self, stage: str, seconds: float) -> None:
+        """
+        Add time spent in a stage.
+
+        :param stage: The name of the stage.
+        :type stage: str
+        :param seconds: The time spent.
+        :type seconds: float
+        """
+        with self._lock:
+            self.stages[stage] += seconds
+
+    @contextlib.contextmanager
+    def timer(self, stage: str):
+        """Time a block of work as part of a stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
+
+    def record_note(self, note: str, seconds: float) -> None:
+        """Keep the time spent exporting a note."""
+        with self._lock:
+            self.notes[note] = seconds
+
+    def slowest_notes(self, count: int = 10) -> list[tuple[str, float]]:
+        """Return the notes which took the longest to export, slowest first."""
+        with self._lock:
+            return heapq.nlargest(count, self.notes.items(), key=lambda item: item[1])
+
+    def snapshot(self, slowest: int = 10) -> dict:
+        """
+        Return the metrics as a JSON serializable dict.
+
+        :param slowest: The number of slowest notes to include.
+        :type slowest: int
+
+        :return: The counters, stage timings and slowest notes of the run.
+        :rtype: dict
+        """
+        with self._lock:
+            counters = dict(sorted(self.counters.items()))
+            stages = {stage: round(seconds, 6) for stage, seconds in sorted(self.stages.items())}
+            elapsed = time.perf_counter() - self.started
+        return {
+            "version": METRICS_VERSION,
+            "elapsed_seconds": round(elapsed, 6),
+            "counters": counters,
+            "stages": stages,
+            "slowest_notes": [
+                {"note": note, "seconds": round(seconds, 6)} for note, seconds in self.slowest_notes(slowest)
+            ],
+        }
+
+    def write_json(self, path: str) -> None:
+        """
+        Write the metrics to a JSON file.
+
+        :param path: The File URI of the JSON file.
+        :type path: str
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    def log_summary(self, slowest: int = 5) -> None:
+        """
+        Log a summary of the run.
+
+        :param slowest: The number of slowest notes to list.
+        :type slowest: int
+        """
+        snapshot = self.snapshot(slowest)
+        logger.info("Run summary (%.3fs):", snapshot["elapsed_seconds"])
+        for name, value in snapshot["counters"].items():
+            logger.info("  %s: %d", name, value)
+        if snapshot["stages"]:
+            logger.info("  Stages:")
+            for stage, seconds in snapshot["stages"].items():
+                logger.info("    %-12s %.3fs", stage, seconds)
+        if snapshot["slowest_notes"]:
+            logger.info("  Slowest notes:")
+            for note in snapshot["slowest_notes"]:
+                logger.info("    %.3fs %s", note["seconds"], note["note"])
+
+
+class ThreadLogCapture(logging.Filter):
+    """
+    Capture the log records of worker threads, so they can be replayed in order.
+
+    Records logged by a thread outside of :meth:`capture` pass through.
+    """
+
+    def __init__(self):
+        """Initialize ThreadLogCapture."""
+        super().__init__()
+        self.local = threading.local()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Keep the record for the current thread, when it captures."""
+        records = getattr(self.local, "records", None)
+        if records is None:
+            return True
+        records.append(record)
+        return False
+
+    @contextlib.contextmanager
+    def capture(self):
+        """Capture the log records of the current thread."""
+        self.local.records = []
+        try:
+            yield self.local.records
+        finally:
+            self.local.records = None
+
+
+def replay(records: list[logging.LogRecord]) -> None:
+    """Log captured records."""
+    for record in records:
+        logger.handle(record)
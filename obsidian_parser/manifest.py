@@ -0,0 +1,287 @@
+"""Export manifest used for incremental Obsidian to Hugo exports."""
+import hashlib
+import json
+import os
+from typing import Iterable, Optional, TypedDict
+from obsidian_parser.metadata import NoteMetadata
+
+
+MANIFEST_NAME = ".obsidian-parser-manifest.json"
+MANIFEST_VERSION = 2
+
+
+def hash_file(path: str) -> str:
+    """
+    Return the SHA-256 hex digest of a file.
+
+    :param path: The File URI to hash.
+    :type path: str
+
+    :return: The hex digest of the file content.
+    :rtype: str
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExportManifest:
+    """
+    Persistent record of what a previous export produced.
+
+    For every exported note the manifest keeps the content hash of the source
+    note, the page bundle it was written to, the hash of every vault asset
+    it pulled into that bundle and a digest of where its links resolved to. File hashes are cached against the size and
+    mtime of the file, so unchanged files are not re-read between runs. So is
+    what the vault index needs of each note, its links, assets, headings,
+    tags and the frontmatter keys the index looks at, so an incremental run
+    only reads the notes which changed.
+
+    Paths are stored relative to the vault and the Hugo content directory, so
+    the manifest stays valid when both are checked out somewhere else.
+
+    :param path: The File URI of the manifest.
+    :type path: str
+    :param vault_dir: The Obsidian vault directory.
+    :type vault_dir: str
+    :param content_dir: The Hugo content directory.
+    :type content_dir: str
+    """
+
+    FileRecord = TypedDict("FileRecord", {"size": int, "mtime": int, "hash": str})
+    NoteRecord = TypedDict("NoteRecord", {"hash": str, "bundle": str, "assets": dict[str, str], "links": str})
+    IndexRecord = TypedDict("IndexRecord", {"size": int, "mtime": int, "keys": list[str], "metadata": NoteMetadata})
+
+    def __init__(self, path: str, vault_dir: str, content_dir: str):
+        """Initialize an empty manifest."""
+        self.path = path
+        self.vault_dir = vault_dir
+        self.content_dir = content_dir
+        self.files: dict[str, ExportManifest.FileRecord] = {}
+        self.notes: dict[str, ExportManifest.NoteRecord] = {}
+        self.index: dict[str, ExportManifest.IndexRecord] = {}
+        self._hashes: dict[str, str] = {}
+        self._keys: dict[str, str] = {}
+
+    @classmethod
+    def load(cls, path: str, vault_dir: str, content_dir: str) -> "ExportManifest":
+        """
+        Load the manifest from disk.
+
+        A missing, unreadable or outdated manifest yields an empty one, which
+        makes the next export a full one.
+
+        :param path: The File URI of the manifest.
+        :type path: str
+        :param vault_dir: The Obsidian vault directory.
+        :type vault_dir: str
+        :param content_dir: The Hugo content directory.
+        :type content_dir: str
+
+        :return: The loaded manifest.
+        :rtype: ExportManifest
+        """
+        manifest = cls(path, vault_dir, content_dir)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return manifest
+        if data.get("version") == MANIFEST_VERSION:
+            manifest.files = data.get("files", {})
+            manifest.notes = data.get("notes", {})
+            manifest.index = data.get("index", {})
+        return manifest
+
+    def exists(self) -> bool:
+        """Whether the manifest was written by a previous export."""
+        return os.path.isfile(self.path)
+
+    def save(self) -> None:
+        """Write the manifest to disk."""
+        data = {"version": MANIFEST_VERSION, "files": self.files, "notes": self.notes, "index": self.index}
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            # Without indentation the C encoder serializes the whole manifest in one go.
+            f.write(json.dumps(data, sort_keys=True, separators=(",", ":"), default=str))
+        os.replace(tmp_path, self.path)
+
+    def hash(self, path: str, stat: os.stat_result = None) -> str:
+        """
+        Return the content hash of a source file.
+
+        The file is only read when its size or mtime differ from what the
+        manifest recorded, and at most once per run.
+
+        :param path: The File URI to hash.
+        :type path: str
+        :param stat: The stat of the file, when the caller has it already.
+        :type stat: os.stat_result
+
+        :return: The hex digest of the file content, or an empty string if
+            the file does not exist.
+        :rtype: str
+        """
+        key = self._source_key(path)
+        if key in self._hashes:
+            return self._hashes[key]
+        if stat is None:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                return ""
+        record = self.files.get(key)
+        if record and record["size"] == stat.st_size and record["mtime"] == stat.st_mtime_ns:
+            digest = record["hash"]
+        else:
+            digest = hash_file(path)
+            self.files[key] = {"size": stat.st_size, "mtime": stat.st_mtime_ns, "hash": digest}
+        self._hashes[key] = digest
+        return digest
+
+    def metadata(self, note: str, stat: os.stat_result, frontmatter_keys: Iterable[str]) -> Optional[NoteMetadata]:
+        """
+        Return the metadata of a note recorded by a previous run, unless the note changed since.
+
+        :param note: The File URI of the note.
+        :type note: str
+        :param stat: The stat of the note.
+        :type stat: os.stat_result
+        :param frontmatter_keys: The frontmatter keys the metadata must have
+            been scanned for.
+        :type frontmatter_keys: Iterable[str]
+
+        :return: The metadata, or None when the note is to be read.
+        :rtype: NoteMetadata
+        """
+        record = self.index.get(self._source_key(note))
+        if (
+            record and record["size"] == stat.st_size and record["mtime"] == stat.st_mtime_ns
+            and record["keys"] == list(frontmatter_keys)
+        ):
+            return record["metadata"]
+        return None
+
+    def record_metadata(self, note: str, stat: os.stat_result, frontmatter_keys: Iterable[str], metadata: NoteMetadata) -> None:
+        """
+        Record the metadata of a note, for the vault index of the next run.
+
+        Only the frontmatter keys the index looks at are kept.
+
+        :param note: The File URI of the note.
+        :type note: str
+        :param stat: The stat of the note, when it was read.
+        :type stat: os.stat_result
+        :param frontmatter_keys: The frontmatter keys the metadata was scanned for.
+        :type frontmatter_keys: Iterable[str]
+        :param metadata: The metadata of the note.
+        :type metadata: NoteMetadata
+        """
+        keys = list(frontmatter_keys)
+        frontmatter = metadata["frontmatter"]
+        self.index[self._source_key(note)] = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "keys": keys,
+            "metadata": dict(metadata, frontmatter={key: frontmatter[key] for key in keys if key in frontmatter}),
+        }
+
+    def prune_metadata(self, notes: Iterable[str]) -> None:
+        """
+        Forget the metadata of the notes which are gone.
+
+        :param notes: The File URI's of the notes of the vault.
+        :type notes: Iterable[str]
+        """
+        keys = {self._source_key(note) for note in notes}
+        self.index = {key: record for key, record in self.index.items() if key in keys}
+
+    def reset(self) -> None:
+        """Forget the hashes taken so far, so files which changed since are checked again."""
+        self._hashes.clear()
+
+    def is_current(self, note: str, note_hash: str, bundle_dir: str, links: str = "") -> bool:
+        """
+        Check whether the previous export of a note is still up to date.
+
+        :param note: The File URI of the Obsidian note.
+        :type note: str
+        :param note_hash: The current content hash of the note.
+        :type note_hash: str
+        :param bundle_dir: The page bundle directory the note exports to.
+        :type bundle_dir: str
+        :param links: The digest of where the links of the note resolve to.
+        :type links: str
+
+        :return: True if neither the note, its assets nor its link targets changed.
+        :rtype: bool
+        """
+        record = self.notes.get(self._source_key(note))
+        if not record or record["hash"] != note_hash or record["links"] != links:
+            return False
+        if record["bundle"] != self._bundle_key(bundle_dir) or not os.path.isdir(bundle_dir):
+            return False
+        return all(
+            self.hash(os.path.join(self.vault_dir, asset)) == digest
+            for asset, digest in record["assets"].items()
+        )
+
+    def record(self, note: str, note_hash: str, bundle_dir: str, assets: list[str], links: str = "") -> None:
+        """
+        Record the export of a note.
+
+        :param note: The File URI of the Obsidian note.
+        :type note: str
+        :param note_hash: The content hash of the exported note.
+        :type note_hash: str
+        :param bundle_dir: The page bundle directory the note was exported to.
+        :type bundle_dir: str
+        :param assets: The File URI's of the vault assets copied into the bundle.
+        :type assets: list[str]
+        :param links: The digest of where the links of the note resolved to.
+        :type links: str
+        """
+        self.notes[self._source_key(note)] = {
+            "hash": note_hash,
+            "bundle": self._bundle_key(bundle_dir),
+            "assets": {self._source_key(asset): self.hash(asset) for asset in assets},
+            "links": links,
+        }
+
+    def prune(self, notes: set[str]) -> list[str]:
+        """
+        Forget the notes which are no longer exported.
+
+        :param notes: The File URI's of the notes exported by this run.
+        :type notes: set[str]
+
+        :return: The page bundle directories which no exported note owns anymore.
+        :rtype: list[str]
+        """
+        keys = {self._source_key(note) for note in notes}
+        stale = [note for note in self.notes if note not in keys]
+        live_bundles = {record["bundle"] for note, record in self.notes.items() if note in keys}
+        bundles = []
+        for note in stale:
+            bundle_dir = os.path.join(self.content_dir, self.notes.pop(note)["bundle"])
+            if self._bundle_key(bundle_dir) not in live_bundles and bundle_dir not in bundles:
+                bundles.append(bundle_dir)
+        assets = {asset for record in self.notes.values() for asset in record["assets"]}
+        self.files = {
+            key: record for key, record in self.files.items()
+            if key in self.notes or key in assets
+        }
+        return bundles
+
+    def _source_key(self, path: str) -> str:
+        """Return the manifest key of a vault file."""
+        key = self._keys.get(path)
+        if key is None:
+            key = self._keys[path] = os.path.relpath(path, self.vault_dir)
+        return key
+
+    def _bundle_key(self, bundle_dir: str) -> str:
+        """Return the manifest key of a page bundle."""
+        return os.path.relpath(bundle_dir, self.content_dir)
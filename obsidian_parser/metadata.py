@@ -0,0 +1,303 @@
+"""Persistent index of the tags, frontmatter and links of the notes of a vault."""
+import hashlib
+import json
+import os
+import re
+from typing import TYPE_CHECKING, Iterable, Optional, TypedDict, Union
+import yaml
+from obsidian_parser.tokenizer import EMBED, HASHTAG, HEADING, IMAGE, WIKI_LINK, tokenize
+
+if TYPE_CHECKING:
+    import sqlite3
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+
+FRONTMATTER_REGEX = re.compile(r"\A-{3}[ \t]*\r?\n(.*?)^-{3}[ \t]*$\r?\n?", re.DOTALL | re.MULTILINE)
+SCHEMA_VERSION = 1
+
+NoteMetadata = TypedDict("NoteMetadata", {
+    "frontmatter": dict,
+    "tags": list[str],
+    "links": list[str],
+    "assets": list[str],
+    "headings": list[str],
+})
+
+
+def split_frontmatter(note_content: str) -> tuple[Optional[str], int]:
+    """
+    Split the YAML header off a note.
+
+    :param note_content: The content of the note.
+    :type note_content: str
+
+    :return: The YAML header, or None when the note has none, and the offset
+        the body of the note starts at.
+    :rtype: tuple[Optional[str], int]
+    """
+    match = FRONTMATTER_REGEX.match(note_content)
+    if not match:
+        return None, 0
+    return match.group(1), match.end()
+
+
+def load_frontmatter(header: Optional[str]) -> dict:
+    """Parse a YAML header, with the C loader when PyYAML has one."""
+    if not header or not header.strip():
+        return {}
+    metadata = yaml.load(header, Loader=SafeLoader)
+    return metadata if isinstance(metadata, dict) else {}
+
+
+def scan_note(note_content: str, frontmatter_keys: Iterable[str] = None) -> NoteMetadata:
+    """
+    Extract the metadata of a note.
+
+    :param note_content: The content of the note.
+    :type note_content: str
+    :param frontmatter_keys: Only parse the YAML header when it has one of
+        these keys. The whole header is parsed when not given.
+    :type frontmatter_keys: Iterable[str]
+
+    :return: The frontmatter, tags, outgoing links, embedded assets and
+        headings of the note.
+    :rtype: NoteMetadata
+    """
+    header, body_start = split_frontmatter(note_content)
+    if header is not None and frontmatter_keys is not None:
+        keys = re.compile(r"^(?:%s)\s*:" % "|".join(map(re.escape, frontmatter_keys)), re.MULTILINE)
+        if not keys.search(header):
+            header = None
+    metadata = load_frontmatter(header)
+
+    tags = metadata.get("tags") or []
+    if isinstance(tags, str):
+        tags = re.split(r"[,\s]+", tags)
+    tags = [str(tag).lstrip("#").lower() for tag in tags if tag]
+    links, assets, headings = [], [], []
+    for span in tokenize(note_content[body_start:]):
+        if span.kind == HASHTAG:
+            tags.append(span.target.lower())
+        elif span.kind == WIKI_LINK:
+            links.append(span.link)
+        elif span.kind == EMBED:
+            assets.append(span.link)
+        elif span.kind == IMAGE:
+            assets.append(span.target)
+        elif span.kind == HEADING:
+            headings.append(span.heading)
+    return {
+        "frontmatter": metadata,
+        "tags": list(dict.fromkeys(tags)),
+        "links": links,
+        "assets": assets,
+        "headings": headings,
+    }
+
+
+def _field_values(value) -> list[str]:
+    """Return the values a frontmatter field is matched on."""
+    if isinstance(value, list):
+        return [item for element in value for item in _field_values(element)]
+    if isinstance(value, bool):
+        return ["true" if value else "false"]
+    if isinstance(value, dict):
+        return [json.dumps(value, default=str, sort_keys=True)]
+    return [str(value)]
+
+
+class MetadataIndex:
+    """
+    SQLite index of the tags, frontmatter, links and content hash of each note.
+
+    A note is only read again when its size or mtime changed since it was
+    indexed, so selecting notes by tag, frontmatter field or folder does not
+    open the untouched files of the vault.
+
+    :param path: The File URI of the SQLite database, ``:memory:`` keeps the
+        index for the run only.
+    :type path: str
+    :param obsidian_vault_dir: The Obsidian vault directory.
+    :type obsidian_vault_dir: str
+    """
+
+    def __init__(self, path: str, obsidian_vault_dir: str):
+        """Initialize MetadataIndex."""
+        self.path = path
+        self.obsidian_vault_dir = obsidian_vault_dir
+        self._connection: Optional["sqlite3.Connection"] = None
+        self._cache: dict[str, NoteMetadata] = {}
+
+    @property
+    def connection(self) -> "sqlite3.Connection":
+        """The database connection, the schema is created on first use."""
+        if self._connection is None:
+            # Imported on first use, runs without a cache directory do not need it.
+            import sqlite3
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                self._connection.executescript("""
+                    DROP TABLE IF EXISTS notes;
+                    DROP TABLE IF EXISTS tags;
+                    DROP TABLE IF EXISTS fields;
+                    CREATE TABLE notes (
+                        path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, hash TEXT, metadata TEXT
+                    );
+                    CREATE TABLE tags (path TEXT, tag TEXT);
+                    CREATE INDEX tags_tag ON tags (tag);
+                    CREATE INDEX tags_path ON tags (path);
+                    CREATE TABLE fields (path TEXT, key TEXT, value TEXT);
+                    CREATE INDEX fields_key ON fields (key, value);
+                    CREATE INDEX fields_path ON fields (path);
+                """)
+                self._connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        return self._connection
+
+    def close(self) -> None:
+        """Close the database connection."""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def refresh(self, notes: Iterable[Union[str, os.DirEntry]]) -> int:
+        """
+        Bring the index up to date with the given notes.
+
+        Notes whose size and mtime match the index are not read. Notes which
+        are no longer in the list are dropped from the index.
+
+        :param notes: The File URI's of the notes, or their directory entries
+            when the stat of the notes is cached on them.
+        :type notes: Iterable[Union[str, os.DirEntry]]
+
+        :return: The number of notes which were read.
+        :rtype: int
+        """
+        connection = self.connection
+        indexed = {path: (size, mtime) for path, size, mtime in connection.execute("SELECT path, size, mtime FROM notes")}
+        current = set()
+        changed = 0
+        with connection:
+            for note in notes:
+                key = self._key(os.fspath(note))
+                current.add(key)
+                changed += self._index(note, indexed.get(key))
+            for key in set(indexed) - current:
+                self._delete(key)
+        return changed
+
+    def update(self, notes: Iterable[Union[str, os.DirEntry]], removed: Iterable[str] = ()) -> int:
+        """
+        Bring the index up to date with notes which changed, leaving the other notes as they are.
+
+        :param notes: The File URI's of the new or changed notes, or their
+            directory entries.
+        :type notes: Iterable[Union[str, os.DirEntry]]
+        :param removed: The File URI's of the deleted notes.
+        :type removed: Iterable[str]
+
+        :return: The number of notes which were read.
+        :rtype: int
+        """
+        connection = self.connection
+        changed = 0
+        with connection:
+            for note in removed:
+                self._delete(self._key(note))
+            for note in notes:
+                row = connection.execute("SELECT size, mtime FROM notes WHERE path = ?", (self._key(os.fspath(note)),)).fetchone()
+                changed += self._index(note, tuple(row) if row else None)
+        return changed
+
+    def _index(self, note: Union[str, os.DirEntry], indexed: Optional[tuple[int, int]]) -> bool:
+        """Read a note into the index, unless its size and mtime match those indexed, and return whether it was read."""
+        stat = note.stat() if isinstance(note, os.DirEntry) else os.stat(note)
+        if indexed == (stat.st_size, stat.st_mtime_ns):
+            return False
+        note = os.fspath(note)
+        key = self._key(note)
+        with open(note, "rb") as f:
+            content = f.read()
+        metadata = scan_note(content.decode("utf-8", errors="replace"))
+        self._delete(key)
+        self.connection.execute(
+            "INSERT INTO notes VALUES (?, ?, ?, ?, ?)",
+            (key, stat.st_size, stat.st_mtime_ns, hashlib.sha256(content).hexdigest(),
+             json.dumps(metadata, default=str)),
+        )
+        self.connection.executemany("INSERT INTO tags VALUES (?, ?)", [(key, tag) for tag in metadata["tags"]])
+        self.connection.executemany("INSERT INTO fields VALUES (?, ?, ?)", [
+            (key, str(name), value)
+            for name, field in metadata["frontmatter"].items() for value in _field_values(field)
+        ])
+        return True
+
+    def get(self, note: str) -> Optional[NoteMetadata]:
+        """
+        Return the indexed metadata of a note.
+
+        :param note: The File URI of the note.
+        :type note: str
+
+        :return: The metadata, or None when the note is not indexed.
+        :rtype: NoteMetadata
+        """
+        key = self._key(note)
+        if key not in self._cache:
+            row = self.connection.execute("SELECT metadata FROM notes WHERE path = ?", (key,)).fetchone()
+            if not row:
+                return None
+            self._cache[key] = json.loads(row[0])
+        return self._cache[key]
+
+    def select(self, tag: str = None, fields: dict[str, Optional[str]] = None, folders: list[str] = None) -> list[str]:
+        """
+        Return the indexed notes matching all of the given conditions.
+
+        :param tag: A tag the notes must have, with or without `#`.
+        :type tag: str
+        :param fields: Frontmatter fields the notes must have, with the value
+            they must have, or None when any value will do.
+        :type fields: dict[str, Optional[str]]
+        :param folders: Vault relative folders, the notes must be in one of them.
+        :type folders: list[str]
+
+        :return: The File URI's of the matching notes.
+        :rtype: list[str]
+        """
+        query = "SELECT path FROM notes WHERE 1"
+        params = []
+        if tag:
+            query += " AND path IN (SELECT path FROM tags WHERE tag = ?)"
+            params.append(tag.lstrip("#").lower())
+        for name, value in (fields or {}).items():
+            if value is None:
+                query += " AND path IN (SELECT path FROM fields WHERE key = ?)"
+                params.append(name)
+            else:
+                query += " AND path IN (SELECT path FROM fields WHERE key = ? AND value = ?)"
+                params.extend([name, value])
+        if folders:
+            prefixes = [folder.strip("/").replace(os.sep, "/") + "/" for folder in folders]
+            query += " AND (" + " OR ".join("substr(path, 1, ?) = ?" for _ in prefixes) + ")"
+            for prefix in prefixes:
+                params.extend([len(prefix), prefix])
+        rows = self.connection.execute(query + " ORDER BY path", params)
+        return [os.path.join(self.obsidian_vault_dir, *path.split("/")) for path, in rows]
+
+    def _key(self, note: str) -> str:
+        """Return the index key of a note."""
+        return os.path.relpath(note, self.obsidian_vault_dir).replace(os.sep, "/")
+
+    def _delete(self, key: str) -> None:
+        """Drop a note from the index."""
+        self._cache.pop(key, None)
+        for table in ("notes", "tags", "fields"):
+            self.connection.execute(f"DELETE FROM {table} WHERE path = ?", (key,))
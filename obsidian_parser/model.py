@@ -0,0 +1,216 @@
+"""Parsed note model, shared by the renderers of every output target."""
+import os
+import re
+from types import MappingProxyType
+from typing import Mapping, NamedTuple, Optional
+from obsidian_parser.attachments import AttachmentIndex
+from obsidian_parser.metadata import load_frontmatter, split_frontmatter
+from obsidian_parser.remote import is_remote
+from obsidian_parser.tokenizer import EMBED, HASHTAG, HEADING, IMAGE, WIKI_LINK, Span
+from obsidian_parser.transclusion import is_note_target
+from obsidian_parser.vaultindex import VaultIndex, slugify
+
+
+class Link(NamedTuple):
+    """
+    A wiki link of a note, ``[[target#heading|alias]]``.
+
+    :param span: The token of the link.
+    :param target: The link target, without heading.
+    :param heading: The heading or block the link points at.
+    :param alias: The text of the link.
+    :param note: The File URI of the note the link resolves to, None when it
+        does not resolve.
+    """
+
+    span: Span
+    target: str
+    heading: Optional[str]
+    alias: Optional[str]
+    note: Optional[str]
+
+    @property
+    def text(self) -> str:
+        """The text the link is shown with."""
+        return self.alias if self.alias is not None else self.span.link
+
+
+class Embed(NamedTuple):
+    """
+    An embedded asset or markdown image of a note.
+
+    :param span: The token of the embed.
+    :param link: The link of the asset, relative to the vault or a URL.
+    :param text: The alt text.
+    :param asset: The File URI of the vault asset, None for remote assets.
+    """
+
+    span: Span
+    link: str
+    text: str
+    asset: Optional[str]
+
+
+class Heading(NamedTuple):
+    """
+    A heading of a note.
+
+    :param span: The token of the heading, its `#` marks.
+    :param level: The level of the heading.
+    :param text: The text of the heading.
+    :param anchor: The anchor of the heading.
+    """
+
+    span: Span
+    level: int
+    text: str
+    anchor: str
+
+
+class ParsedNote:
+    """
+    A note as it is read, tokenized and has its embedded notes expanded, once for all output targets.
+
+    The records of its links, embeds, headings and frontmatter are derived
+    from the tokens on first use, and kept. The note is immutable, so the
+    renderers of all targets can share it, also across threads.
+
+    :param note: The File URI of the note.
+    :type note: str
+    :param content: The content of the note, with its embedded notes expanded.
+    :type content: str
+    :param spans: The tokens of the content.
+    :type spans: list[Span]
+    :param vault_index: The index the links are resolved with.
+    :type vault_index: VaultIndex
+    :param attachment_index: The index the embedded assets are resolved with.
+    :type attachment_index: AttachmentIndex
+    """
+
+    __slots__ = (
+        "note", "content", "spans", "vault_index", "attachment_index",
+        "_body_start", "_frontmatter", "_links", "_embeds", "_headings", "_tags",
+    )
+
+    def __init__(self, note: str, content: str, spans: list[Span], vault_index: Optional[VaultIndex] = None, attachment_index: Optional[AttachmentIndex] = None):
+        """Initialize ParsedNote."""
+        set_field = object.__setattr__
+        set_field(self, "note", note)
+        set_field(self, "content", content)
+        set_field(self, "spans", tuple(spans))
+        set_field(self, "vault_index", vault_index)
+        set_field(self, "attachment_index", attachment_index)
+        for name in self.__slots__[5:]:
+            set_field(self, name, None)
+
+    def __setattr__(self, name, value):
+        """Refuse to change the note."""
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        """Refuse to change the note."""
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __repr__(self) -> str:
+        """Return the representation of the note."""
+        return f"{type(self).__name__}({self.note!r})"
+
+    def _cache(self, name: str, value):
+        """Keep a derived record."""
+        object.__setattr__(self, name, value)
+        return value
+
+    @property
+    def name(self) -> str:
+        """The name of the note, the name of its Hugo page bundle."""
+        return os.path.basename(self.note).rsplit(".", maxsplit=1)[0]
+
+    @property
+    def body_start(self) -> int:
+        """The offset the body of the note starts at, after its YAML header."""
+        if self._body_start is None:
+            header, body_start = split_frontmatter(self.content)
+            self._cache("_frontmatter", MappingProxyType(load_frontmatter(header)))
+            self._cache("_body_start", body_start)
+        return self._body_start
+
+    @property
+    def frontmatter(self) -> Mapping:
+        """The fields of the YAML header of the note, read only."""
+        if self._frontmatter is None:
+            self.body_start
+        return self._frontmatter
+
+    @property
+    def body(self) -> str:
+        """The content of the note after its YAML header."""
+        return self.content[self.body_start:]
+
+    @property
+    def title(self) -> str:
+        """The title of the note, from its frontmatter, its first top level heading or its name."""
+        if self.frontmatter.get("title"):
+            return str(self.frontmatter["title"])
+        for heading in self.headings:
+            if heading.level == 1:
+                return heading.text
+        return self.name
+
+    @property
+    def links(self) -> tuple[Link, ...]:
+        """The wiki links of the body of the note, with the notes they resolve to."""
+        if self._links is None:
+            links = []
+            for span in self.body_spans():
+                if span.kind == WIKI_LINK or span.kind == EMBED and is_note_target(span.target):
+                    candidates = self.vault_index.locate(span.target, self.note) if self.vault_index is not None else []
+                    links.append(Link(span, span.target, span.heading, span.alias, candidates[0] if candidates else None))
+            self._cache("_links", tuple(links))
+        return self._links
+
+    @property
+    def embeds(self) -> tuple[Embed, ...]:
+        """The embedded assets and markdown images of the body of the note."""
+        if self._embeds is None:
+            embeds = []
+            for span in self.body_spans():
+                if span.kind == IMAGE:
+                    link, text = span.target, span.alias
+                elif span.kind == EMBED and not is_note_target(span.target):
+                    link, text = span.link, span.alias if span.alias is not None else span.link
+                else:
+                    continue
+                asset = None
+                if not is_remote(link) and self.vault_index is not None:
+                    candidates = self.attachment_index.locate(link, self.note) if self.attachment_index is not None else []
+                    asset = candidates[0] if candidates else os.path.join(self.vault_index.obsidian_vault_dir, link)
+                embeds.append(Embed(span, link, text, asset))
+            self._cache("_embeds", tuple(embeds))
+        return self._embeds
+
+    @property
+    def headings(self) -> tuple[Heading, ...]:
+        """The headings of the body of the note."""
+        if self._headings is None:
+            self._cache("_headings", tuple(
+                Heading(span, span.source.count("#"), span.heading, slugify(span.heading))
+                for span in self.body_spans() if span.kind == HEADING
+            ))
+        return self._headings
+
+    @property
+    def tags(self) -> tuple[str, ...]:
+        """The tags of the frontmatter and the hashtags of the body, lower cased, in order."""
+        if self._tags is None:
+            tags = self.frontmatter.get("tags") or []
+            if isinstance(tags, str):
+                tags = re.split(r"[,\s]+", tags)
+            tags = [str(tag).lstrip("#").lower() for tag in tags if tag]
+            tags += [span.target.lower() for span in self.body_spans() if span.kind == HASHTAG]
+            self._cache("_tags", tuple(dict.fromkeys(tags)))
+        return self._tags
+
+    def body_spans(self) -> list[Span]:
+        """Return the tokens of the body of the note."""
+        body_start = self.body_start
+        return [span for span in self.spans if span.start >= body_start]
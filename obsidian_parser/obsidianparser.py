@@ -1,11 +1,31 @@
 """Parser for Obsidian notes."""
+import hashlib
+import json
 import shutil
-import urllib.request
 import os
-import re
-from random import seed,randint
-from typing import TypedDict
-import frontmatter
+import time
+from typing import Callable, TypedDict
+from obsidian_parser.assetstore import AssetStore
+from obsidian_parser.attachments import AttachmentIndex
+from obsidian_parser.executor import ParallelExecutor
+from obsidian_parser.graph import LinkGraph
+from obsidian_parser.instrumentation import Metrics, logger
+from obsidian_parser.manifest import MANIFEST_NAME, ExportManifest
+from obsidian_parser.metadata import MetadataIndex, scan_note
+from obsidian_parser.output import ContentWriter, PlannedWriter
+from obsidian_parser.model import ParsedNote
+from obsidian_parser.plan import ExportPlan
+from obsidian_parser.remote import RemoteFetcher, is_remote
+from obsidian_parser.renderers import Renderer
+from obsidian_parser.scanner import VaultScanner
+from obsidian_parser.search import SearchIndex
+from obsidian_parser.shard import SHARD_MANIFEST_NAME, Shard, ShardManifest
+from obsidian_parser.targets import ExportTarget
+from obsidian_parser.schema import DEFAULT_SCHEMA, FieldSpec, FrontmatterSchema
+from obsidian_parser.transclusion import Transcluder, is_note_target
+from obsidian_parser.tokenizer import EMBED, HASHTAG, IMAGE, WIKI_LINK, Span, splice, tokenize
+from obsidian_parser.vaultindex import INDEX_FRONTMATTER_KEYS, VaultIndex, link_name
+from obsidian_parser.watcher import VaultWatcher
 # from obsidian_parser import WikiParser
 
 
@@ -15,32 +35,715 @@ class ObsidianParser:
     """Obsidian Parser class."""
 
     resourceLink = TypedDict("ResourceLink", {"source": str, "link": str, "text": str})
+    ExportResult = TypedDict("ExportResult", {"note": str, "bundle": str, "assets": list[str]})
+    ExportFilter = TypedDict("ExportFilter", {"hashtag": str, "fields": dict, "folders": list[str]}, total=False)
+    GraphOptions = TypedDict("GraphOptions", {"frontmatter": bool, "data_file": str, "related": int}, total=False)
 
-    def __init__(self, obsidian_vault_dir: str, vault_content_dir: str, hugo_content_dir: str):
+    def __init__(self, obsidian_vault_dir: str, vault_content_dir: str, hugo_content_dir: str, jobs: int = 1, asset_store: AssetStore = None, remote_fetcher: RemoteFetcher = None, metadata_index: MetadataIndex = None, export_filter: ExportFilter = None, scanner: VaultScanner = None, frontmatter_schema: FrontmatterSchema = None, metrics: Metrics = None, graph: GraphOptions = None, search_index: SearchIndex = None, renderers: list[Renderer] = None, shard: Shard = None, targets: list[ExportTarget] = None):
         """Initialize ObsidianParser."""
         self.obsidian_vault_dir = obsidian_vault_dir
         self.vault_content_dir = vault_content_dir
         self.hugo_content_dir = hugo_content_dir
+        self.jobs = jobs or os.cpu_count() or 1
+        self.asset_store = asset_store or AssetStore()
+        self.remote_fetcher = remote_fetcher or RemoteFetcher()
+        self.metadata_index = metadata_index
+        self.export_filter = export_filter or {}
+        self.scanner = scanner or VaultScanner(obsidian_vault_dir)
+        self.note_entries: dict[str, os.DirEntry] = {}
+        self.note_texts: dict[str, str] = {}
+        self.frontmatter_schema = frontmatter_schema or DEFAULT_SCHEMA
+        self.graph_options = graph or {}
+        self.search_index = search_index
+        self.renderers = renderers or []
+        self.shard = shard
+        self.targets = targets or []
+        self.note_targets: dict[str, ExportTarget] = {}
+        if self.graph_options.get("frontmatter"):
+            keys = {field.key for field in self.frontmatter_schema.fields}
+            self.frontmatter_schema = FrontmatterSchema(self.frontmatter_schema.fields + [
+                FieldSpec(key, empty=([],)) for key in ("backlinks", "related") if key not in keys
+            ])
+        self.metrics = metrics or Metrics()
+        self.writer = ContentWriter(self.metrics)
+        self.manifest_path = os.path.join(hugo_content_dir, MANIFEST_NAME)
+        self.vault_index = None
+        self.attachment_index = None
+        self.transcluder = None
+        self.link_graph = None
+        self.executor = None
 
 
-
-    def process(self, erase_hugo_content: bool) -> None:
+    def process(self, erase_hugo_content: bool, incremental: bool = False) -> None:
         """
         Process the obsidian vault and convert it to hugo ready content.
 
-        Delete the hugo content directory and copy the obsidian vault to the
-        hugo content directory, then process the content so that the wiki links
-        are replaced with the hugo links.
+        Copy the obsidian vault to the hugo content directory, then process
+        the content so that the wiki links are replaced with the hugo links.
+        Pages and assets whose bytes did not change are left untouched. When
+        erasing, the files the export did not write are deleted afterwards,
+        which leaves the same tree as wiping the directory up front.
+
+        In incremental mode the export manifest of the previous run takes the
+        place of the wipe: only new or changed notes are exported, and the
+        bundles of deleted or renamed notes are removed. The hugo content
+        directory is only erased when there is no manifest to go by yet.
 
         :param erase_hugo_content: Whether to erase the hugo content directory.
         :type erase_hugo_content: bool
+        :param incremental: Whether to only export the notes which changed.
+        :type incremental: bool
+        """
+        try:
+            if incremental:
+                self.process_incremental(erase_hugo_content)
+                return
+            self.writer.reset()
+            if self.search_index is not None:
+                self.search_index.begin(incremental=False)
+            notes = self.get_notes_to_export(**self.export_filter)
+            self.build_vault_index(notes)
+            notes = self.select_shard(notes)
+            self.export_notes(notes)
+            self.save_search_index(notes)
+            if erase_hugo_content:
+                self.remove_stale_files()
+            self.save_shard_manifest(notes)
+            self.vault_index.report()
+            self.attachment_index.report()
+        finally:
+            self.close()
+
+
+    def plan(self) -> ExportPlan:
+        """
+        Work out what an export would change in the hugo content directory, without changing it.
+
+        The whole export runs as usual, but the pages are kept in memory and
+        the copies and links are only recorded. The result is compared with
+        the hugo content directory: files which do not exist yet are to be
+        created, files whose content differs updated, and files which are not
+        part of the export any more deleted. The export manifest is kept.
+
+        :return: The plan, to log or apply.
+        :rtype: ExportPlan
+        """
+        writer = self.writer
+        self.writer = PlannedWriter()
+        try:
+            if self.search_index is not None:
+                self.search_index.begin(incremental=False)
+            notes = self.get_notes_to_export(**self.export_filter)
+            self.build_vault_index(notes)
+            notes = self.select_shard(notes)
+            self.export_notes(notes)
+            self.save_search_index(notes)
+            self.vault_index.report()
+            self.attachment_index.report()
+            keep = [self.manifest_path, os.path.join(self.hugo_content_dir, SHARD_MANIFEST_NAME)]
+            directories = self.get_content_dirs() + [renderer.output_dir for renderer in self.renderers]
+            return ExportPlan.compute(self.writer, self.hugo_content_dir, keep=keep, directories=directories)
+        finally:
+            self.writer = writer
+
+
+    def sync(self) -> ExportPlan:
         """
+        Bring the hugo content directory up to date with the minimal set of changes.
+
+        Unlike :meth:`process`, which wipes the directory and writes every
+        file again, only the files of the plan are written or deleted, so the
+        files which did not change keep their modification times.
+
+        :return: The plan that was applied.
+        :rtype: ExportPlan
+        """
+        try:
+            plan = self.plan()
+            plan.log()
+            plan.apply(self.writer)
+            return plan
+        finally:
+            self.close()
+
+
+    def close(self) -> None:
+        """Wait for the remote downloads, and close the worker processes and the metadata index."""
+        self.remote_fetcher.close()
+        if self.executor is not None:
+            self.executor.close()
+        if self.metadata_index is not None:
+            self.metadata_index.close()
+
+
+    def process_incremental(self, erase_hugo_content: bool, manifest: ExportManifest = None) -> ExportManifest:
+        """
+        Export the notes which changed since the previous run.
+
+        :param erase_hugo_content: Whether to erase the hugo content directory
+            when no manifest exists yet.
+        :type erase_hugo_content: bool
+        :param manifest: The manifest kept from a previous pass, it is loaded
+            from the hugo content directory when not given.
+        :type manifest: ExportManifest
+
+        :return: The updated manifest.
+        :rtype: ExportManifest
+        """
+        if manifest is None:
+            manifest = ExportManifest.load(self.manifest_path, self.obsidian_vault_dir, self.hugo_content_dir)
+        erase_hugo_content = erase_hugo_content and not manifest.exists()
+        self.writer.reset()
+        if self.search_index is not None:
+            self.search_index.begin(incremental=True)
+        notes = self.get_notes_to_export(**self.export_filter)
+        self.build_vault_index(notes, manifest)
+        notes = self.select_shard(notes)
+        note_hashes = self.check_notes(notes, manifest)
+        self.export_changed_notes(note_hashes, manifest, prune=not erase_hugo_content)
+        self.save_search_index(notes, set(note_hashes))
         if erase_hugo_content:
-            self.clear_hugo_content_dir()
-        notes = self.get_notes_to_export(None)
+            self.remove_stale_files()
+        self.remove_stale_bundles(notes, manifest)
+        if not erase_hugo_content:
+            self.remove_stale_pages(notes)
+        manifest.save()
+        self.save_shard_manifest(notes)
+        self.metrics.count("notes_skipped", len(notes) - len(note_hashes))
+        logger.info("Skipped %d unchanged note(s)", len(notes) - len(note_hashes))
+        self.vault_index.report()
+        self.attachment_index.report()
+        return manifest
+
+
+    def process_changes(self, changes: set[str], manifest: ExportManifest) -> ExportManifest:
+        """
+        Export what changed files of the vault affect, keeping the indexes of the previous pass.
+
+        Only the changed files are read: the notes, the metadata index, the
+        vault index and the attachment index are updated with them rather
+        than built again. The changed notes, the notes linking to them or to
+        the changed attachments, and the notes embedding them, directly or
+        through other embeds, are checked against the manifest, the others
+        are left alone. The manifest is only written when a note was exported
+        or removed.
+
+        With a link graph, whose backlinks and related notes any change may
+        affect, and when the whole vault changed, such as when the watcher
+        lost track of the changes, every note is checked instead.
+
+        :param changes: The File URI's of the changed files and directories.
+        :type changes: set[str]
+        :param manifest: The manifest of the previous pass.
+        :type manifest: ExportManifest
+
+        :return: The updated manifest.
+        :rtype: ExportManifest
+        """
+        vault_dir = os.path.abspath(self.obsidian_vault_dir)
+        if self.vault_index is None or self.graph_options or any(os.path.abspath(path) == vault_dir for path in changes):
+            return self.process_incremental(False, manifest)
+        self.writer.reset()
+        self.vault_index.reset_report()
+        self.attachment_index.reset_report()
+        if self.search_index is not None:
+            self.search_index.begin(incremental=True)
+        updated, removed, names = self.apply_changes(changes)
+        left = []
+        if updated or removed:
+            if self.metadata_index is not None:
+                self.metadata_index.update([entry if entry is not None else note for note, entry in updated.items()], removed)
+            selected = self.select_notes(list(self.note_entries), **self.export_filter)
+            if self.targets:
+                selected = self.route_notes(selected)
+            selection = set(selected)
+            left = [note for note in self.vault_index.relpaths if note not in selection]
+            for note in left + [note for note in updated if note in selection and note in self.vault_index.relpaths]:
+                names.update(self.vault_index.get_names(note))
+                self.vault_index.remove_note(note)
+            for note in selected:
+                if note not in self.vault_index.relpaths:
+                    self.index_note(note, manifest)
+                    names.update(self.vault_index.get_names(note))
+
+        affected = self.vault_index.linking_notes(names) | set(updated)
+        pending, seen = set(names), set()
+        while pending:
+            # Notes embedding a note which embeds a changed one change too.
+            seen |= pending
+            embedding = self.transcluder.embedding_notes(pending) - affected
+            affected |= embedding
+            pending = {name for note in embedding for name in self.vault_index.get_names(note)} - seen
+        notes = [
+            note for note in self.note_entries
+            if note in affected and note in self.vault_index.relpaths
+            and (self.shard is None or self.shard.owns(self.get_page_name(note)))
+        ] if affected else []
+        note_hashes = self.check_notes(notes, manifest)
+        skipped = len(notes) - len(note_hashes)
+        self.export_changed_notes(note_hashes, manifest, prune=True)
+        if note_hashes or left:
+            notes = self.select_shard(list(self.vault_index.relpaths))
+            self.save_search_index(notes, set(note_hashes))
+            if left:
+                manifest.prune_metadata(self.vault_index.relpaths)
+                self.remove_stale_bundles(notes, manifest)
+                self.remove_stale_pages(notes)
+            manifest.save()
+            self.save_shard_manifest(notes)
+        self.metrics.count("notes_skipped", skipped)
+        logger.info("Skipped %d unchanged note(s) of %d affected", skipped, skipped + len(note_hashes))
+        self.vault_index.report()
+        self.attachment_index.report()
+        return manifest
+
+
+    def apply_changes(self, changes: set[str]) -> tuple[dict[str, os.DirEntry], set[str], set[str]]:
+        """
+        Update the scanned notes, the attachment index and the embedded notes with changed files of the vault.
+
+        :param changes: The File URI's of the changed files and directories.
+        :type changes: set[str]
+
+        :return: The new or changed notes of the exported folder, with their
+            directory entry when they were scanned, the deleted notes, and the
+            names of the changed notes and attachments, as
+            :func:`~obsidian_parser.vaultindex.link_name` returns them.
+        :rtype: tuple[dict[str, os.DirEntry], set[str], set[str]]
+        """
+        content_dir = os.path.join(self.obsidian_vault_dir, self.vault_content_dir)
+        output_dirs = self.get_output_dirs()
+        updated, removed, names, vault_notes = {}, set(), set(), []
+        for path in changes:
+            vault_path = self.get_scan_path(path, self.obsidian_vault_dir)
+            is_dir = os.path.isdir(path)
+            if vault_path is None or (os.path.abspath(path) + os.sep).startswith(output_dirs) or self.scanner.ignored(vault_path, is_dir):
+                continue
+            note_path = self.get_scan_path(path, content_dir)
+            if is_dir:
+                # A new or moved directory, whatever it holds is new.
+                for entry in self.scanner.scan(vault_path, attachments=True):
+                    if not os.path.abspath(entry.path).startswith(output_dirs):
+                        self.attachment_index.add(entry.path)
+                        names.add(link_name(entry.name))
+                vault_notes.append(vault_path)
+                vault_notes.extend(entry.path for entry in self.scanner.scan(vault_path))
+                if note_path is not None:
+                    updated.update((entry.path, entry) for entry in self.scanner.scan(note_path))
+            elif os.path.isfile(path):
+                names.add(link_name(os.path.basename(path)))
+                if not path.endswith(self.scanner.extensions):
+                    self.attachment_index.add(vault_path)
+                    continue
+                vault_notes.append(vault_path)
+                if note_path is not None:
+                    updated[note_path] = None
+            else:
+                # A deleted file or directory.
+                names.add(link_name(os.path.basename(path)))
+                vault_notes.append(vault_path)
+                prefix = vault_path + os.sep
+                for attachment in [attachment for attachment in self.attachment_index.relpaths if attachment == vault_path or attachment.startswith(prefix)]:
+                    self.attachment_index.remove(attachment)
+                    names.add(link_name(os.path.basename(attachment)))
+                if note_path is not None:
+                    prefix = note_path + os.sep
+                    removed.update(note for note in self.note_entries if note == note_path or note.startswith(prefix))
+        names.update(link_name(os.path.basename(note)) for note in self.transcluder.forget(vault_notes))
+        for note in removed:
+            self.note_entries.pop(note, None)
+            updated.pop(note, None)
+        # A changed note is stat'ed again, rather than by a stale directory entry.
+        self.note_entries.update(updated)
+        names.update(link_name(os.path.basename(note)) for note in removed)
+        return updated, removed, names
+
+
+    def check_notes(self, notes: list[str], manifest: ExportManifest) -> dict[str, tuple[str, str]]:
+        """
+        Return the notes whose export is not up to date with the note, its assets and its links.
+
+        :param notes: The File URI's of the notes to check.
+        :type notes: list[str]
+        :param manifest: The manifest of the previous run.
+        :type manifest: ExportManifest
+
+        :return: The File URI's of the notes to export, mapped to their
+            content hash and link signature.
+        :rtype: dict[str, tuple[str, str]]
+        """
+        note_hashes = {}
         for note in notes:
-            self.process_note(note)
-        
+            entry = self.note_entries.get(note)
+            note_hash = manifest.hash(note, entry.stat() if entry is not None else None)
+            links = self.get_link_signature(note)
+            if manifest.is_current(note, note_hash, self.get_page_bundle_dir(note), links):
+                continue
+            note_hashes[note] = (note_hash, links)
+        return note_hashes
+
+
+    def export_changed_notes(self, note_hashes: dict[str, tuple[str, str]], manifest: ExportManifest, prune: bool) -> None:
+        """
+        Export the notes which changed, and record them in the manifest.
+
+        :param note_hashes: The File URI's of the notes to export, mapped to
+            their content hash and link signature.
+        :type note_hashes: dict[str, tuple[str, str]]
+        :param manifest: The manifest to record the exports in.
+        :type manifest: ExportManifest
+        :param prune: Whether to drop the assets the notes no longer embed
+            from their page bundles.
+        :type prune: bool
+        """
+        self.prefetch_remote_assets(list(note_hashes))
+        for result in self.export_notes(list(note_hashes)):
+            note_hash, links = note_hashes[result["note"]]
+            manifest.record(result["note"], note_hash, result["bundle"], result["assets"], links)
+            if prune:
+                # Drop the assets the note no longer embeds.
+                self.writer.prune(result["bundle"])
+
+
+    def remove_stale_bundles(self, notes: list[str], manifest: ExportManifest) -> None:
+        """
+        Delete the page bundles of the notes which are no longer exported, such as deleted or renamed ones.
+
+        :param notes: The File URI's of the exported notes.
+        :type notes: list[str]
+        :param manifest: The manifest of the previous run.
+        :type manifest: ExportManifest
+        """
+        for bundle_dir in manifest.prune(set(notes)):
+            logger.info("Removing stale Hugo Bundle: `%s`", bundle_dir)
+            self.metrics.count("bundles_removed")
+            shutil.rmtree(bundle_dir, ignore_errors=True)
+
+
+    def remove_stale_pages(self, notes: list[str]) -> None:
+        """
+        Delete the pages of the renderers whose notes are no longer exported.
+
+        :param notes: The File URI's of the exported notes.
+        :type notes: list[str]
+        """
+        for renderer in self.renderers:
+            for path in renderer.remove_stale_pages(self, notes):
+                logger.info("Removing stale %s page: `%s`", renderer.name, path)
+                self.metrics.count("files_removed")
+
+
+    def watch(self, erase_hugo_content: bool, watcher: VaultWatcher = None) -> None:
+        """
+        Export the vault, then keep exporting what changes until interrupted.
+
+        The parser stays warm between passes: the metadata, vault and
+        attachment indexes, the export manifest and the remote asset downloads
+        are kept in memory, and each pass updates them with the changed files
+        only. A pass then checks the changed notes and the notes linking to or
+        embedding them or the changed attachments, see :meth:`process_changes`,
+        and only exports those whose page would change.
+
+        :param erase_hugo_content: Whether to erase the hugo content directory
+            when no manifest exists yet.
+        :type erase_hugo_content: bool
+        :param watcher: The watcher of the vault, one watching the whole vault
+            is created when not given.
+        :type watcher: VaultWatcher
+        """
+        if self.metadata_index is None:
+            self.metadata_index = MetadataIndex(":memory:", self.obsidian_vault_dir)
+        if watcher is None:
+            watcher = VaultWatcher(self.obsidian_vault_dir, exclude=[self.hugo_content_dir] + self.get_content_dirs(), scanner=self.scanner)
+        try:
+            # The watcher is started first, so changes made during the first export are picked up.
+            manifest = self.process_incremental(erase_hugo_content)
+            logger.info("Watching `%s` for changes...", self.obsidian_vault_dir)
+            for changes in watcher:
+                start = time.perf_counter()
+                logger.info("Detected %d changed file(s)", len(changes))
+                manifest.reset()
+                self.asset_store.reset()
+                manifest = self.process_changes(changes, manifest)
+                logger.info("Updated in %.0f ms", (time.perf_counter() - start) * 1000)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            watcher.close()
+            self.close()
+
+
+    def export_notes(self, notes: list[str]) -> list[ExportResult]:
+        """
+        Export the given notes, in parallel when more than one job is configured.
+
+        :param notes: The File URI's of the notes to export.
+        :type notes: list[str]
+
+        :return: The export result of each note, in the order of the notes.
+        :rtype: list[ExportResult]
+        """
+        self.prefetch_remote_assets(notes)
+        try:
+            if self.jobs > 1 and len(notes) > 1:
+                if self.executor is None:
+                    self.executor = ParallelExecutor(self, self.jobs)
+                return self.executor.run(notes)
+            return [self.process_note(note) for note in notes]
+        finally:
+            # The notes read by the vault index are only kept for their export.
+            self.note_texts.clear()
+
+
+
+    def save_search_index(self, notes: list[str], exported: set[str] = None) -> None:
+        """
+        Write the search index of the exported pages, when one is configured.
+
+        :param notes: The File URI's of all exported notes.
+        :type notes: list[str]
+        :param exported: The File URI's of the notes exported by this run,
+            when it skipped the others. Without a search index of the previous
+            run to update, the pages of the skipped notes are read back.
+        :type exported: set[str]
+        """
+        if self.search_index is None:
+            return
+        with self.metrics.timer("search"):
+            if exported is not None and not self.search_index.loaded:
+                for note in notes:
+                    hugo_page = os.path.join(self.get_page_bundle_dir(note), "index.md")
+                    if note not in exported and os.path.isfile(hugo_page):
+                        with open(hugo_page, "r", encoding="utf-8") as f:
+                            self.search_index.add(self.get_page_url(note), f.read())
+            self.search_index.save([self.get_page_url(note) for note in notes], self.writer)
+        logger.info("Wrote the search index of %d page(s) to `%s`", len(self.search_index.docs), self.search_index.path)
+
+
+    def index_page(self, note: str, page_content: str) -> None:
+        """
+        Add a page to the search index, when one is configured.
+
+        :param note: The File URI of the note the page is exported from.
+        :type note: str
+        :param page_content: The content of the page.
+        :type page_content: str
+        """
+        if self.search_index is not None:
+            with self.metrics.timer("search"):
+                self.search_index.add(self.get_page_url(note), page_content)
+
+
+    def build_vault_index(self, notes: list[str], manifest: ExportManifest = None) -> VaultIndex:
+        """
+        Index the notes to export, so wiki links resolve to their page bundles and embedded notes can be expanded.
+
+        :param notes: The File URI's of the notes to export.
+        :type notes: list[str]
+        :param manifest: The manifest of the previous run, the metadata of the
+            notes which did not change since is taken from it.
+        :type manifest: ExportManifest
+
+        :return: The vault index, also kept for the rest of the run.
+        :rtype: VaultIndex
+        """
+        logger.info("Indexing notes...")
+        # Related notes share tags, so the tags of the frontmatter are needed too.
+        frontmatter_keys = INDEX_FRONTMATTER_KEYS + ("tags",) if self.graph_options.get("related") else INDEX_FRONTMATTER_KEYS
+        with self.metrics.timer("index"):
+            self.vault_index = VaultIndex(self.obsidian_vault_dir, self.vault_content_dir, frontmatter_keys)
+            for note in notes:
+                self.index_note(note, manifest)
+            if manifest is not None:
+                manifest.prune_metadata(notes)
+            self.build_attachment_index()
+        self.transcluder = Transcluder(self.vault_index, self.scanner, self.read_note)
+        if self.graph_options:
+            self.build_link_graph()
+        return self.vault_index
+
+
+    def index_note(self, note: str, manifest: ExportManifest = None) -> None:
+        """
+        Add a note to the vault index, from the metadata index or the manifest when they have the note.
+
+        A note which is read is kept until the notes are exported, so it is
+        only read once.
+
+        :param note: The File URI of the note.
+        :type note: str
+        :param manifest: The manifest of the previous run, the metadata of the
+            note is recorded in it when it is read.
+        :type manifest: ExportManifest
+        """
+        metadata = self.metadata_index.get(note) if self.metadata_index is not None else None
+        frontmatter_keys = self.vault_index.frontmatter_keys
+        if metadata is None and manifest is not None:
+            entry = self.note_entries.get(note)
+            stat = entry.stat() if entry is not None else os.stat(note)
+            metadata = manifest.metadata(note, stat, frontmatter_keys)
+            if metadata is None:
+                metadata = scan_note(self.read_indexed_note(note), frontmatter_keys)
+                manifest.record_metadata(note, stat, frontmatter_keys, metadata)
+        elif metadata is None:
+            metadata = scan_note(self.read_indexed_note(note), frontmatter_keys)
+        section = self.note_targets[note].url if note in self.note_targets else None
+        self.vault_index.add_metadata(note, metadata, self.get_page_bundle_dir(note), section)
+
+
+    def read_indexed_note(self, note: str) -> str:
+        """Read a note for the vault index, and keep it for its export."""
+        note_content = self.read_note(note)
+        self.note_texts[note] = note_content
+        return note_content
+
+
+    def build_attachment_index(self) -> AttachmentIndex:
+        """
+        Index the attachments of the vault, so embeds resolve by their name the way Obsidian does.
+
+        This walks the whole vault a second time, apart from the scan of the
+        notes, as attachments are embedded from anywhere in the vault while
+        the notes are only looked for in the exported folder. The output
+        directories of the export are left out in case they are inside the
+        vault.
+
+        :return: The attachment index, also kept for the rest of the run.
+        :rtype: AttachmentIndex
+        """
+        self.attachment_index = AttachmentIndex(self.obsidian_vault_dir)
+        output_dirs = self.get_output_dirs()
+        for entry in self.scanner.scan(self.obsidian_vault_dir, attachments=True):
+            if not os.path.abspath(entry.path).startswith(output_dirs):
+                self.attachment_index.add(entry.path)
+        logger.info("  Indexed %d attachment(s)", len(self.attachment_index.relpaths))
+        return self.attachment_index
+
+
+    def build_link_graph(self) -> LinkGraph:
+        """
+        Build the link graph of the indexed notes, and write its data file when configured.
+
+        :return: The link graph, also kept for the rest of the run.
+        :rtype: LinkGraph
+        """
+        with self.metrics.timer("graph"):
+            self.link_graph = LinkGraph.build(self.vault_index)
+        logger.info("Linked %d notes by %d links", len(self.link_graph.notes), len(self.link_graph.link_targets))
+        data_file = self.graph_options.get("data_file")
+        if data_file:
+            pages = {}
+            for note in self.link_graph.notes:
+                pages[self.get_page_name(note)] = self.get_graph_fields(note, always=True)
+            self.writer.makedirs(os.path.dirname(os.path.abspath(data_file)))
+            self.writer.write_text(data_file, json.dumps({"version": 1, "pages": pages}, separators=(",", ":")))
+            logger.info("Wrote the link graph to `%s`", data_file)
+        return self.link_graph
+
+
+    def get_graph_fields(self, note: str, always: bool = False) -> dict:
+        """
+        Return the backlinks and related notes of a note, by the names of their page bundles.
+
+        :param note: The File URI of the note.
+        :type note: str
+        :param always: Whether to return them also when they do not go into
+            the frontmatter.
+        :type always: bool
+
+        :return: The backlinks and, when configured, the related notes.
+        :rtype: dict
+        """
+        if self.link_graph is None or note not in self.link_graph.ids or not (always or self.graph_options.get("frontmatter")):
+            return {}
+        fields = {"backlinks": [self.get_page_name(source) for source in self.link_graph.backlinks(note)]}
+        if self.graph_options.get("related"):
+            fields["related"] = [
+                self.get_page_name(related) for related in self.link_graph.related(note, self.graph_options["related"])
+            ]
+        return fields
+
+
+    def get_link_signature(self, note: str) -> str:
+        """
+        Return a digest of what the page of a note depends on besides the note itself.
+
+        That is where its links and embedded assets resolve to, the notes it
+        embeds, when they go into the frontmatter its backlinks and related
+        notes, and the output targets it is rendered to besides its Hugo page.
+
+        :param note: The File URI of the note.
+        :type note: str
+
+        :return: The signature.
+        :rtype: str
+        """
+        parts = [self.vault_index.link_signature(note), self.transcluder.signature(note)]
+        assets = [link for link in self.vault_index.assets.get(note, []) if not is_remote(link)]
+        if assets and self.attachment_index is not None:
+            parts.append(self.attachment_index.signature(assets, note))
+        fields = self.get_graph_fields(note)
+        if fields:
+            parts.append(hashlib.sha256(json.dumps(fields).encode()).hexdigest())
+        if self.renderers:
+            targets = [[renderer.name, renderer.output_dir] for renderer in self.renderers]
+            parts.append(hashlib.sha256(json.dumps(targets).encode()).hexdigest())
+        return ":".join(part for part in parts if part)
+
+
+    def select_shard(self, notes: list[str]) -> list[str]:
+        """
+        Return the notes of the shard this run exports.
+
+        All notes are indexed by every shard, so links to the notes of other
+        shards resolve the same way as in a single export.
+
+        :param notes: The File URI's of the notes to export.
+        :type notes: list[str]
+
+        :return: The File URI's of the notes of the shard, all of them when
+            the export is not sharded.
+        :rtype: list[str]
+        """
+        if self.shard is None:
+            return notes
+        selected = [note for note in notes if self.shard.owns(self.get_page_name(note))]
+        logger.info("Exporting shard %s: %d of %d note(s)", self.shard, len(selected), len(notes))
+        return selected
+
+
+    def save_shard_manifest(self, notes: list[str]) -> None:
+        """
+        Write the manifest of the shard this run exported, for the merge of the shards.
+
+        :param notes: The File URI's of the notes of the shard.
+        :type notes: list[str]
+        """
+        if self.shard is not None:
+            ShardManifest.build(self.shard, self, notes).save(os.path.join(self.hugo_content_dir, SHARD_MANIFEST_NAME))
+
+
+    def prefetch_remote_assets(self, notes: list[str]) -> None:
+        """
+        Start downloading the remote assets of the given notes concurrently.
+
+        :param notes: The File URI's of the notes to export.
+        :type notes: list[str]
+        """
+        if self.vault_index is None:
+            return
+        self.remote_fetcher.prefetch(
+            link for note in notes for link in self.vault_index.assets.get(note, []) if is_remote(link)
+        )
+
+
+    def remove_stale_files(self) -> None:
+        """Delete the files in the Hugo content folder, and in the output directories of the renderers, which the export did not write."""
+        logger.info("Removing stale files from the hugo content folder...")
+        for directory in self.get_content_dirs() + [renderer.output_dir for renderer in self.renderers]:
+            for path in self.writer.prune(directory):
+                logger.debug("  Removed `%s`", path)
+                self.metrics.count("files_removed")
 
 
     def clear_hugo_content_dir(self) -> None:
@@ -49,52 +752,373 @@ class ObsidianParser:
 
         NOTE: The folder itself gets deleted and recreated.
         """
-        print("Clearing hugo content folder...")
+        logger.info("Clearing hugo content folder...")
         shutil.rmtree(self.hugo_content_dir)
         os.makedirs(self.hugo_content_dir, exist_ok=True)
 
 
-    def get_notes_to_export(self, hashtag: str) -> list[str]:
+    def get_notes_to_export(self, hashtag: str = None, fields: dict = None, folders: list[str] = None) -> list[str]:
         """
         Check the Obsidian vault, and return a list of notes to export.
 
         If a hashtag is provided, only notes with that hashtag will be returned.
+        Frontmatter fields and folders narrow the selection down further. The
+        selection is answered by the metadata index, so only the notes which
+        changed since they were indexed are read. With export targets the
+        selected notes are routed to their targets, and the notes no target
+        takes are left out.
 
         :param hashtag: The hashtag to filter by.
         :type hashtag: str
+        :param fields: Frontmatter fields the notes must have, mapped to the
+            value they must have, or None when any value will do.
+        :type fields: dict
+        :param folders: Folders within the exported vault folder, the notes
+            must be in one of them.
+        :type folders: list[str]
 
         :return: A list of notes URI's to export.
         :rtype: list[str]
         """
-        print("Enumerating Note to process...")
-        notes_list = []
-        # Get list of all notes in the vault.
-        for root, dirs, files in os.walk(os.path.join(self.obsidian_vault_dir, self.vault_content_dir)):
-            for file in files:
-                if file.endswith(".md"):
-                    if hashtag:
-                        #TODO: the file needs to be read to check for the hashtag.
-                        tags = self.get_note_hashtags(os.path.join(root, file))
-                        if hashtag in tags:
-                            notes_list.append(os.path.join(root, file))  # type: ignore
-                    else:
-                        notes_list.append(os.path.join(root, file))
-                    
+        logger.info("Enumerating Note to process...")
+        # Get list of all notes in the vault, the stat of each note is cached on its entry.
+        with self.metrics.timer("scan"):
+            self.note_entries = {
+                entry.path: entry
+                for entry in self.scanner.scan(os.path.join(self.obsidian_vault_dir, self.vault_content_dir))
+            }
+        notes_list = list(self.note_entries)
+
+        filters = [(hashtag, fields, folders)] + [(target.hashtag, target.fields, target.folders) for target in self.targets]
+        if not any(any(selection) for selection in filters):
+            if self.metadata_index is not None:
+                self.refresh_metadata_index()
+        else:
+            if self.metadata_index is None:
+                self.metadata_index = MetadataIndex(":memory:", self.obsidian_vault_dir)
+            logger.info("  Read %d new or changed note(s) into the metadata index", self.refresh_metadata_index())
+        notes_list = self.select_notes(notes_list, hashtag, fields, folders)
+        if self.targets:
+            notes_list = self.route_notes(notes_list)
         return notes_list
 
 
-    def process_note(self, note: str) -> None:
+    def select_notes(self, notes: list[str], hashtag: str = None, fields: dict = None, folders: list[str] = None) -> list[str]:
+        """
+        Return the notes matching a hashtag, frontmatter fields and folders, from the metadata index.
+
+        :param notes: The File URI's of the notes to select from.
+        :type notes: list[str]
+        :param hashtag: The hashtag to filter by.
+        :type hashtag: str
+        :param fields: Frontmatter fields the notes must have.
+        :type fields: dict
+        :param folders: Folders within the exported vault folder.
+        :type folders: list[str]
+
+        :return: The File URI's of the matching notes, in order.
+        :rtype: list[str]
+        """
+        if not (hashtag or fields or folders):
+            return notes
+        matches = {
+            os.path.normpath(note) for note in self.metadata_index.select(
+                hashtag, fields, [os.path.normpath(os.path.join(self.vault_content_dir, folder)) for folder in folders or []]
+            )
+        }
+        return [note for note in notes if os.path.normpath(note) in matches]
+
+
+    def route_notes(self, notes: list[str]) -> list[str]:
+        """
+        Route the notes to the first export target each of them matches.
+
+        :param notes: The File URI's of the selected notes.
+        :type notes: list[str]
+
+        :return: The File URI's of the notes a target takes, in order.
+        :rtype: list[str]
+        """
+        self.note_targets = {}
+        for target in self.targets:
+            selected = [
+                note for note in self.select_notes(notes, target.hashtag, target.fields, target.folders)
+                if note not in self.note_targets
+            ]
+            self.note_targets.update((note, target) for note in selected)
+            logger.info("  %d note(s) for `%s`", len(selected), target.output_dir(self.hugo_content_dir))
+        skipped = len(notes) - len(self.note_targets)
+        if skipped:
+            logger.info("  %d note(s) match no export target", skipped)
+        return [note for note in notes if note in self.note_targets]
+
+
+    def get_content_dirs(self) -> list[str]:
+        """Return the directories the export writes its pages to, those of the export targets or the hugo content directory."""
+        if not self.targets:
+            return [self.hugo_content_dir]
+        return list(dict.fromkeys(target.output_dir(self.hugo_content_dir) for target in self.targets))
+
+
+    def get_output_dirs(self) -> tuple[str, ...]:
+        """Return the directories the export writes to, as absolute paths ending with a separator, to match the paths within them."""
+        return tuple(
+            os.path.abspath(directory) + os.sep
+            for directory in [self.hugo_content_dir] + self.get_content_dirs() + [renderer.output_dir for renderer in self.renderers]
+        )
+
+
+    def get_scan_path(self, path: str, directory: str) -> str:
+        """
+        Return a path the way a scan of a directory names it.
+
+        :param path: The File URI.
+        :type path: str
+        :param directory: The scanned directory.
+        :type directory: str
+
+        :return: The path within the directory, None when it is not within it.
+        :rtype: str
+        """
+        relpath = os.path.relpath(os.path.abspath(path), os.path.abspath(directory))
+        if relpath == os.pardir or relpath.startswith(os.pardir + os.sep):
+            return None
+        return directory if relpath == os.curdir else os.path.join(directory, relpath)
+
+
+    def refresh_metadata_index(self) -> int:
+        """
+        Bring the metadata index up to date with the scanned notes.
+
+        :return: The number of new or changed notes read into the index.
+        :rtype: int
+        """
+        changed = self.metadata_index.refresh(self.note_entries.values())
+        self.metrics.count("metadata_cache_hits", len(self.note_entries) - changed)
+        return changed
+
+
+    def log_summary(self) -> None:
+        """Log the counters and stage timings of the run, with the cache hits of the remote fetcher."""
+        self.metrics.set("remote_cache_hits", self.remote_fetcher.cache_hits)
+        self.metrics.set("remote_downloads", self.remote_fetcher.downloads)
+        self.metrics.log_summary()
+
+
+    def process_note(self, note: str, reformat: Callable[[str, dict], str] = None) -> ExportResult:
         """
         Process a single note.
 
+        The note is read and parsed once, run through the asset and
+        reformatting stages in memory, and written to the page bundle once.
+        The same parsed note is rendered to the other output targets.
+
         :param note: The note to process.
         :type note: str
+        :param reformat: Reformats the page in place of :meth:`reformat_note`,
+            such as on a worker process, and accounts for its own time.
+        :type reformat: Callable[[str, dict], str]
+
+        :return: The page bundle the note was exported to and the vault assets
+            copied into it.
+        :rtype: ExportResult
+        """
+        logger.debug("Processing note: %s", note)
+        start = time.perf_counter()
+        parsed = self.parse_note(note)
+        page_bundle_dir, note_content, assets = self.render_page(parsed, reformat)
+        self.index_page(note, note_content)
+        with self.metrics.timer("write"):
+            self.write_page(page_bundle_dir, note_content, note)
+        self.render_targets(parsed)
+        self.metrics.count("notes_processed")
+        self.metrics.record_note(note, time.perf_counter() - start)
+        return {"note": note, "bundle": page_bundle_dir, "assets": assets}
+
+
+    def convert_note(self, note: str, note_content: str = None) -> tuple[str, str, list[str]]:
+        """
+        Convert a note into the content of its Hugo page, without writing the page.
+
+        The assets of the note are placed into its page bundle by the writer.
+
+        :param note: The File URI of the note.
+        :type note: str
+        :param note_content: The content of the note, it is read from the
+            note when not given.
+        :type note_content: str
+
+        :return: The page bundle directory, the content of the page and the
+            File URI's of the vault assets placed into the bundle.
+        :rtype: tuple[str, str, list[str]]
+        """
+        return self.render_page(self.parse_note(note, note_content))
+
+
+    def parse_note(self, note: str, note_content: str = None) -> ParsedNote:
+        """
+        Parse a note once, for the Hugo page and every other output target.
+
+        The note is read and tokenized, and the notes and sections it embeds
+        are expanded, after which the expanded note is tokenized again.
+
+        :param note: The File URI of the note.
+        :type note: str
+        :param note_content: The content of the note, it is read from the
+            note when not given.
+        :type note_content: str
+
+        :return: The parsed note.
+        :rtype: ParsedNote
+        """
+        if note_content is None:
+            note_content = self.note_texts.pop(note, None)
+        if note_content is None:
+            with self.metrics.timer("transfer"):
+                note_content = self.read_note(note)
+        with self.metrics.timer("tokenize"):
+            spans = tokenize(note_content)
+        if self.transcluder is not None:
+            with self.metrics.timer("embeds"):
+                expanded = self.transcluder.expand(note_content, note, spans)
+            if expanded is not None:
+                note_content = expanded
+                with self.metrics.timer("tokenize"):
+                    spans = tokenize(note_content)
+        return ParsedNote(note, note_content, spans, self.vault_index, self.attachment_index)
+
+
+    def render_page(self, parsed: ParsedNote, reformat: Callable[[str, dict], str] = None) -> tuple[str, str, list[str]]:
+        """
+        Render a parsed note into the content of its Hugo page, without writing the page.
+
+        :param parsed: The parsed note.
+        :type parsed: ParsedNote
+        :param reformat: Reformats the page in place of :meth:`reformat_note`,
+            and accounts for its own time.
+        :type reformat: Callable[[str, dict], str]
+
+        :return: The page bundle directory, the content of the page and the
+            File URI's of the vault assets placed into the bundle.
+        :rtype: tuple[str, str, list[str]]
+        """
+        with self.metrics.timer("transfer"):
+            page_bundle_dir = self.create_page_bundle(parsed.note)
+        note_content, assets = self.rewrite_links(parsed, page_bundle_dir)
+        fields = self.get_graph_fields(parsed.note)
+        if reformat is not None:
+            return page_bundle_dir, reformat(note_content, fields), assets
+        with self.metrics.timer("frontmatter"):
+            note_content = self.reformat_note(note_content, fields)
+        return page_bundle_dir, note_content, assets
+
+
+    def render_targets(self, parsed: ParsedNote) -> None:
+        """
+        Render a parsed note to the output targets besides the Hugo content directory.
+
+        :param parsed: The parsed note.
+        :type parsed: ParsedNote
+        """
+        for renderer in self.renderers:
+            with self.metrics.timer("render"):
+                renderer.render(self, parsed)
+
+
+    def get_page_bundle_dir(self, note: str) -> str:
+        """
+        Return the Hugo page bundle directory for an Obsidian note.
+
+        :param note: The File URI of the Obsidian note.
+        :type note: str
+
+        :return: The page bundle directory.
+        :rtype: str
+        """
+        target = self.note_targets.get(note)
+        return os.path.join(
+            target.output_dir(self.hugo_content_dir) if target is not None else self.hugo_content_dir,
+            os.path.basename(note).rsplit('.', maxsplit=1)[0]
+        )
+
+
+    def get_page_name(self, note: str) -> str:
+        """Return the name of the Hugo page bundle of an Obsidian note."""
+        return os.path.basename(self.get_page_bundle_dir(note))
+
+
+    def get_page_url(self, note: str) -> str:
+        """Return the URL of the page of an indexed note, from the root of the site unless it is published elsewhere."""
+        url = self.vault_index.page_url(note)
+        return "/" + url[3:] if url.startswith("../") else url
+
+
+    def create_page_bundle(self, note: str) -> str:
         """
-        print(f"Processing note: {note}")
-        hugo_page = self.transfer_obsidian_note(note)
-        self.retrieve_bundle_assets(hugo_page)
-        self.reformat_article(hugo_page)
+        Create the Hugo page bundle directory for an Obsidian note.
 
+        :param note: The File URI of the Obsidian note.
+        :type note: str
+
+        :return: The page bundle directory.
+        :rtype: str
+        """
+        page_bundle_dir = self.get_page_bundle_dir(note)
+        self.writer.makedirs(page_bundle_dir)
+        logger.debug("  Created Hugo Bundle: `%s`", page_bundle_dir)
+        return page_bundle_dir
+
+
+    def read_note(self, note: str) -> str:
+        """
+        Read the content of an Obsidian note.
+
+        :param note: The File URI of the Obsidian note.
+        :type note: str
+
+        :return: The content of the note.
+        :rtype: str
+        """
+        with open(note, "r", encoding="utf-8") as f:
+            self.metrics.count("bytes_read", os.fstat(f.fileno()).st_size)
+            return f.read()
+
+
+    def write_page(self, page_bundle_dir: str, note_content: str, note: str = None) -> str:
+        """
+        Write the content of a Hugo page into its page bundle, unless it is current.
+
+        The page and its bundle get the modification time of the note.
+
+        :param page_bundle_dir: The page bundle directory.
+        :type page_bundle_dir: str
+        :param note_content: The content of the Hugo page.
+        :type note_content: str
+        :param note: The File URI of the Obsidian note the page is exported from.
+        :type note: str
+
+        :return: The File URI of the Hugo page.
+        :rtype: str
+        """
+        hugo_page = os.path.join(page_bundle_dir, "index.md")
+        mtime = self.get_note_mtime(note) if note is not None else None
+        self.metrics.count("bytes_written", self.writer.write_text(hugo_page, note_content, mtime))
+        self.writer.set_dir_mtime(page_bundle_dir, hugo_page)
+        return hugo_page
+
+
+    def get_note_mtime(self, note: str) -> float:
+        """
+        Return the modification time of an Obsidian note, from the scan when it was scanned.
+
+        :param note: The File URI of the Obsidian note.
+        :type note: str
+
+        :return: The modification time.
+        :rtype: float
+        """
+        entry = self.note_entries.get(note)
+        return entry.stat().st_mtime if entry is not None else os.stat(note).st_mtime
 
 
     def transfer_obsidian_note(self, note:str) -> str:
@@ -108,115 +1132,195 @@ class ObsidianParser:
         :return: The File URI of the Hugo page bundle.
         :rtype: str
         """
-        # Create the page bundle directory.
-        page_bundle_dir = os.path.join(
-            self.hugo_content_dir,
-            os.path.basename(note).rsplit('.', maxsplit=1)[0]
-        )
-        os.makedirs(page_bundle_dir, exist_ok=True)
-        # Copy the markdown file.
-        shutil.copy(
-            os.path.join(note),
-            os.path.join(page_bundle_dir, "index.md"),
-        )
-        print(f"  Created Hugo Bundle: `{page_bundle_dir}`")
-
-        return os.path.join(page_bundle_dir, "index.md")
+        page_bundle_dir = self.create_page_bundle(note)
+        hugo_page = os.path.join(page_bundle_dir, "index.md")
+        self.writer.copy_file(note, hugo_page)
+        return hugo_page
 
 
 
     def get_note_hashtags(self, text: str) -> list[str]:
         """Get all hashtags from the given text and return a list of them."""
-        hashtag_regex = r"#(\w+)"
-        hashtag_list = re.findall(hashtag_regex, text)
-        return hashtag_list
+        return [span.target for span in tokenize(text) if span.kind == HASHTAG]
+
 
-        
-    
     def get_note_images(self, text: str) -> list[resourceLink]:
-        """Find all image links in the given text and return a list of them."""
-        image_links = []
-    
-        # Find all image links in the text
-        # Wiki link: [[image.png]] or [[image.png|text]]
-        image_link_regex = r"!\[\[(.*?)\]\]"  
-        for match in re.finditer(image_link_regex, text):
-            out = {
-                "source": match.group(),
-            }
-    
-            if "|" in match.group(1):
-                out["link"], out["text"] = match.group(1).split("|")
-            else:
-                out["link"] = match.group(1)
-                out["text"] = match.group(1)
-    
-            image_links.append(out)
-
-        # Markdown Link: ![image.png](image.png)
-        image_link_regex = r"!\[(.*)\]\((.*)\)"  # HTML Image Link
-        for match in re.finditer(image_link_regex, text):
-            out = {
-                "source": match.group(),
-            }
-    
-            out["link"] = match.group(2)
-            out["text"] = match.group(1)
-    
-            image_links.append(out)
-    
-        return image_links
+        """Find all image links in the given text and return a list of them, embedded notes are not images."""
+        return [
+            self.get_resource_link(span) for span in tokenize(text)
+            if span.kind == IMAGE or span.kind == EMBED and not is_note_target(span.target)
+        ]
+
 
+    def get_resource_link(self, span: Span) -> resourceLink:
+        """
+        Return the resource link view of an embed or image span.
 
-    seed(1)
+        Wiki link: ![[image.png]] or ![[image.png|text]]
+        Markdown Link: ![image.png](image.png)
+        """
+        if span.kind == IMAGE:
+            return {"source": span.source, "link": span.target, "text": span.alias}
+        text = span.alias if span.alias is not None else span.link
+        return {"source": span.source, "link": span.link, "text": text}
 
-    def retrieve_bundle_assets(self, hugo_page: str) -> None:
-        """Retrieve the assets from the Obsidian Note and copy them to the Hugo Page Bundle."""
-        hugo_bundle_dir = os.path.dirname(hugo_page)
-        print(f"  Retrieving vault assets for Hugo bundle")
 
-        # Read the file.
-        with open(hugo_page, "r") as note:
+    def retrieve_bundle_assets(self, hugo_page: str) -> list[str]:
+        """
+        Retrieve the assets from the Obsidian Note and copy them to the Hugo Page Bundle.
+
+        :param hugo_page: The File URI of the Hugo page.
+        :type hugo_page: str
+
+        :return: The File URI's of the vault assets copied into the bundle.
+        :rtype: list[str]
+        """
+        with open(hugo_page, "r", encoding="utf-8") as note:
             note_content = note.read()
-        # Get the assets from the Obsidian Note.
-        
-        links = self.get_note_images(note_content)
+        note_content, vault_assets = self.bundle_note_assets(note_content, os.path.dirname(hugo_page))
+        self.writer.write_text(hugo_page, note_content)
+        return vault_assets
+
+
+    def bundle_note_assets(self, note_content: str, hugo_bundle_dir: str) -> tuple[str, list[str]]:
+        """
+        Copy the assets of a note into its page bundle and point the links at them.
+
+        :param note_content: The content of the note.
+        :type note_content: str
+        :param hugo_bundle_dir: The page bundle directory.
+        :type hugo_bundle_dir: str
+
+        :return: The updated note content and the File URI's of the vault
+            assets copied into the bundle.
+        :rtype: tuple[str, list[str]]
+        """
+        replacements, vault_assets = self.collect_bundle_assets(tokenize(note_content), hugo_bundle_dir)
+        return splice(note_content, replacements), vault_assets
+
+
+    def rewrite_note_links(self, note_content: str, hugo_bundle_dir: str, note: str = None) -> tuple[str, list[str]]:
+        """
+        Bundle the assets of a note and replace its wiki links in one pass.
+
+        The note is parsed first, see :meth:`parse_note`.
 
-        for link in links:
+        :param note_content: The content of the note.
+        :type note_content: str
+        :param hugo_bundle_dir: The page bundle directory.
+        :type hugo_bundle_dir: str
+        :param note: The File URI of the note, links are resolved relative to it.
+        :type note: str
+
+        :return: The updated note content and the File URI's of the vault
+            assets copied into the bundle.
+        :rtype: tuple[str, list[str]]
+        """
+        return self.rewrite_links(self.parse_note(note, note_content), hugo_bundle_dir)
+
+
+    def rewrite_links(self, parsed: ParsedNote, hugo_bundle_dir: str) -> tuple[str, list[str]]:
+        """
+        Bundle the assets of a parsed note and replace its wiki links in one pass.
+
+        The asset and wiki link replacements are spliced into the content
+        together.
+
+        :param parsed: The parsed note.
+        :type parsed: ParsedNote
+        :param hugo_bundle_dir: The page bundle directory.
+        :type hugo_bundle_dir: str
+
+        :return: The updated note content and the File URI's of the vault
+            assets copied into the bundle.
+        :rtype: tuple[str, list[str]]
+        """
+        with self.metrics.timer("assets"):
+            replacements, vault_assets = self.collect_bundle_assets(parsed.spans, hugo_bundle_dir, parsed.note)
+        with self.metrics.timer("links"):
+            replacements += self.collect_wiki_links(parsed.spans, parsed.note)
+            return splice(parsed.content, replacements), vault_assets
+
+
+    def collect_bundle_assets(self, spans: list[Span], hugo_bundle_dir: str, note: str = None) -> tuple[list[tuple[Span, str]], list[str]]:
+        """
+        Copy the assets embedded in a note into its page bundle.
+
+        Every asset is retrieved once, however often the note embeds it.
+        Vault assets are looked up in the attachment index, the missing ones
+        are reported together at the end of the export.
+
+        :param spans: The tokens of the note.
+        :type spans: list[Span]
+        :param hugo_bundle_dir: The page bundle directory.
+        :type hugo_bundle_dir: str
+        :param note: The File URI of the note, assets are resolved relative to it.
+        :type note: str
+
+        :return: The replacement of each embed and image span, and the File
+            URI's of the vault assets copied into the bundle.
+        :rtype: tuple[list[tuple[Span, str]], list[str]]
+        """
+        vault_assets = []
+        replacements = []
+        bundled = {}
+        logger.debug("  Retrieving vault assets for Hugo bundle")
+        hugo_bundle_name = os.path.basename(hugo_bundle_dir)
+
+        for span in spans:
+            if span.kind not in (EMBED, IMAGE) or span.kind == EMBED and is_note_target(span.target):
+                continue
+            link = self.get_resource_link(span)
+            if link["link"] in bundled:
+                asset_link = bundled[link["link"]]
             # Copy the Asset to the Hugo Page Bundle.
-            if ("http" not in link["link"]):
-                image_source_path = os.path.join(self.obsidian_vault_dir, link["link"])
-                print(f"    Transferring image {image_source_path}")
+            elif not is_remote(link["link"]):
+                image_source_path = self.get_asset_path(link["link"], note)
+                logger.debug("    Transferring image %s", image_source_path)
                 try:
-                    shutil.copy(image_source_path, os.path.join(hugo_bundle_dir))
-                    link["link"] = os.path.basename(link["link"])
+                    asset_link = self.asset_store.place(image_source_path, hugo_bundle_dir, self.writer)
+                    vault_assets.append(image_source_path)
+                    self.metrics.count("assets_copied")
                 except FileNotFoundError:
-                    print(f"    Error: Vault Image not found '{image_source_path}', skipped...")
-                    link["link"] = "opps-missing-image.png"
+                    log = logger.debug if self.attachment_index is not None else logger.warning
+                    log("    Error: Vault Image not found '%s', skipped...", image_source_path)
+                    self.metrics.count("assets_missing")
+                    asset_link = f"{hugo_bundle_name}/opps-missing-image.png"
             else:
-                print(f"    Downloading image '{link['link']}'")
-                asset_name = 'web' + str(randint(0,10000)) +'_' + link['link'].split("/")[-1]
-                asset_uri = os.path.join(os.path.join(hugo_bundle_dir),asset_name)
+                logger.debug("    Downloading image '%s'", link["link"])
                 try:
-                    with urllib.request.urlopen(link['link']) as responese:
-                        with open(asset_uri,'wb') as asset:
-                            shutil.copyfileobj(responese, asset)
-                    link["link"] = asset_name
+                    asset_name = self.remote_fetcher.save(link["link"], hugo_bundle_dir, self.writer)
+                    self.metrics.count("assets_downloaded")
                 except Exception as e:
-                    print(f"    Error: Downloading image '{link['link']}' failed, {e} ")
-                    link["link"] = "opps-missing-image.png"
-                    
+                    logger.warning("    Error: Downloading image '%s' failed, %s ", link["link"], e)
+                    self.metrics.count("assets_missing")
+                    asset_name = "opps-missing-image.png"
+                asset_link = f"{hugo_bundle_name}/{asset_name}"
+            bundled[link["link"]] = asset_link
+
             # Update the link in the Hugo Page.
-            hugo_bundle_name = os.path.basename(hugo_bundle_dir)
-            hugo_link = f'![{link["text"]}]({hugo_bundle_name}/{link["link"]})' # HTML Link
-            hugo_link = f'![[{hugo_bundle_name}/{link["link"]}|{link["text"]}]]' # Wiki Link
-            wiki_link = link["source"]
-            note_content = note_content.replace(wiki_link, hugo_link)
+            replacements.append((span, f'![{link["text"]}]({asset_link})'))
 
-            # Write the Updated Page content.
-            with open(os.path.join(hugo_page), "w", encoding = "utf-8") as f:
-                        f.write(note_content)
-            
+        return replacements, vault_assets
+
+    def get_asset_path(self, link: str, note: str = None) -> str:
+        """
+        Return the File URI of a vault asset embedded by a note.
+
+        :param link: The link of the embed.
+        :type link: str
+        :param note: The File URI of the embedding note.
+        :type note: str
+
+        :return: The File URI of the attachment the link resolves to, the
+            link relative to the vault when it does not resolve.
+        :rtype: str
+        """
+        if self.attachment_index is not None:
+            asset = self.attachment_index.resolve(link, note)
+            if asset is not None:
+                return asset
+        return os.path.join(self.obsidian_vault_dir, link)
 
     WikiLink = TypedDict("WikiLink", {"wiki_link": str, "link": str, "text": str})
 
@@ -228,39 +1332,45 @@ class ObsidianParser:
         - link: the extracted link
         - text: the possible extracted text
         """
-        wiki_links = []
-        wiki_link_regex = r"\[\[(.*?)\]\]"
-        for match in re.finditer(wiki_link_regex, text):
-            out = {
-                "wiki_link": match.group(),
-            }
+        return [self.get_wiki_link(span) for span in tokenize(text) if span.kind == WIKI_LINK]
 
 
-            if "|" in match.group(1):
-                out["link"], out["text"] = match.group(1).split("|")
-            else:
-                out["link"] = match.group(1)
-                out["text"] = match.group(1)
+    def get_wiki_link(self, span: Span) -> WikiLink:
+        """
+        Return the wiki link view of a wiki link span.
+        """
+        out = {
+            "wiki_link": span.source,
+            "link": span.link,
+            "text": span.alias if span.alias is not None else span.link,
+        }
 
-            # Check the Links resolve correctly
-            if out["link"].startswith(self.vault_content_dir):
-                out["link"] = out["link"][len(self.vault_content_dir) + 1 :]
+        # Check the Links resolve correctly
+        if out["link"].startswith(self.vault_content_dir + "/"):
+            out["link"] = out["link"][len(self.vault_content_dir) + 1 :]
 
-            # if the link ends with `_index` remove it
-            if out["link"].endswith("_index"):
-                out["link"] = out["link"][:-6]
+        # if the link ends with `_index` remove it
+        if out["link"].endswith("_index"):
+            out["link"] = out["link"][:-6]
 
-            if out["text"].startswith(self.vault_content_dir):
-                out["text"] = out["text"][len(self.vault_content_dir) + 1 :]
+        if out["text"].startswith(self.vault_content_dir + "/"):
+            out["text"] = out["text"][len(self.vault_content_dir) + 1 :]
 
-            wiki_links.append(out)
-        return wiki_links
+        return out
 
 
-    def wiki_link_to_hugo_link(self, wiki_link: WikiLink) -> str:
+    def wiki_link_to_hugo_link(self, wiki_link: WikiLink, note: str = None) -> str:
         """
         Convert the wiki link into a hugo link.
+
+        With a vault index the link points at the URL of the page bundle it
+        resolves to. Links the index cannot resolve keep the local link.
         """
+        if self.vault_index is not None:
+            url = self.vault_index.resolve(wiki_link["link"], note)
+            if url is not None:
+                return f'[{wiki_link["text"]}]({url})'
+
         # if the links contains a link to a heading, convert the heading part to
         # lower case and replace spaces by minus
 
@@ -280,72 +1390,62 @@ class ObsidianParser:
         """
         Replace all wiki links in the given text with hugo links.
         """
-        links = self.get_wiki_links(text)
-        for link in links:
-            hugo_link = self.wiki_link_to_hugo_link(link)
-            text = text.replace(link["wiki_link"], hugo_link)
-        return text
+        return splice(text, self.collect_wiki_links(tokenize(text)))
 
 
-    def check_frontmatter(self, hugo_page: str):
-        post = frontmatter.loads(hugo_page)
+    def collect_wiki_links(self, spans: list[Span], note: str = None) -> list[tuple[Span, str]]:
+        """
+        Return the hugo link replacing each wiki link span.
+        """
+        return [
+            (span, self.wiki_link_to_hugo_link(self.get_wiki_link(span), note))
+            for span in spans if span.kind == WIKI_LINK
+        ]
 
-        post_body = post.content
-        #first_heading = re.search(r"^# (.*)", post.content, re.MULTILINE)
-        title_heading = re.search(r"^# (.*)", post.content, re.MULTILINE)
-        if title_heading:
-            title_heading = title_heading.group(1)
-            print('First Match = {}'.format(title_heading))
-            post_body = post_body.replace(f'# {title_heading}\n', '')
-        else:
-            print('Not Found')
 
+    def check_frontmatter(self, hugo_page: str, fields: dict = None) -> str:
+        """
+        Replace the frontmatter of a page with the one the frontmatter schema emits.
 
-        newpost  = f"---\n"
-        
-        newpost += f"title: {post['title']}\n" if 'title' in post.keys() else  f"title: {title_heading}\n"
-        newpost += f"type: {post['type']}\n" if 'type' in post.keys() else  f"type: article \n"
-        newpost += f"layout: {post['layout']}\n" if 'layout' in post.keys() else  f"layout: post \n"
-        if 'description' in post.keys(): newpost += f"description: {post['description']}\n"
-        if 'date' in post.keys(): newpost += f"date: {post['date']}\n"
-        if 'years' in post.keys(): newpost += f"year: {post['years']}\n"
-        if 'series' in post.keys(): newpost += f"series: {post['series']}\n"
-        newpost += f"categories: {post['categories']}\n" if 'categories' in post.keys() else  f"categories: ['todo'] \n"
-        if 'tags' in post.keys(): 
-            newpost += f"tags: {post['tags']}\n" if post['tags'] != [] else  f"tags: ['untagged'] \n"
-        else:
-            newpost += f"tags: ['untagged'] \n"
-        if 'authors' in post.keys(): 
-            newpost += f"authors: {post['authors']}\n" if post['authors'] != [] else  f"authors: ['damian'] \n"
-        else:
-            newpost += f"authors: ['damian'] \n"
-        newpost += f"draft: {post['draft']}\n" if 'draft' in post.keys() else  f"draft: false \n"
-        if 'lastmod' in post.keys(): newpost += f"lastmod: {post['lastmod']}\n"
-        if 'url' in post.keys(): newpost += f"url: {post['url']}\n"
-        # featuredImage: {bundle}/{imageName}.png 
-        if 'image' in post.keys(): newpost += f"image: {post['image']}\n"
-        if 'image_caption' in post.keys(): newpost += f"image_caption: {post['image_caption']}\n"
-        newpost += f"toc: {post['toc']}\n" if 'toc' in post.keys() else  f"toc: false \n"
-        newpost += f"featured: {post['featured']}\n" if 'featured' in post.keys() else  f"featured: false \n"
-        newpost += f"comments: {post['comments']}\n" if 'comments' in post.keys() else  f"comments: false \n"
-        newpost += f"---\n\n"
-        newpost += post_body
-        return newpost
+        The first `# ` heading of the page is removed from the body, it is the
+        title of the page unless the frontmatter has one.
+
+        :param hugo_page: The content of the page.
+        :type hugo_page: str
+        :param fields: Fields to add to the frontmatter of the note, such as
+            its backlinks.
+        :type fields: dict
+
+        :return: The content of the page with its new frontmatter.
+        :rtype: str
+        """
+        return self.frontmatter_schema.reformat(hugo_page, fields)
 
     def reformat_article(self, hugo_page: str) -> None:
         """Reformat the Hugo Page."""
-        print(f"  Reformatting Hugo page")
-
         # Read the file.
-        with open(hugo_page, "r") as note:
+        with open(hugo_page, "r", encoding="utf-8") as note:
             note_content = note.read()
 
         # Replace wiki links with Hugo links.
-        #TODO: This creates a ref which includes the complete local uri and not the hugo ref
         note_content = self.replace_wiki_links(note_content)
-        tags = self.get_note_hashtags(note_content)
-        note_content = self.check_frontmatter(note_content)
+        note_content = self.reformat_note(note_content)
 
         # Write the Updated Page content.
-        with open(os.path.join(hugo_page), "w", encoding = "utf-8") as f:
-            f.write(note_content)
\ No newline at end of file
+        self.writer.write_text(hugo_page, note_content)
+
+
+    def reformat_note(self, note_content: str, fields: dict = None) -> str:
+        """
+        Reformat the frontmatter of a note for a Hugo page.
+
+        :param note_content: The content of the note, with its links already
+            rewritten.
+        :type note_content: str
+        :param fields: Fields to add to the frontmatter of the note.
+        :type fields: dict
+
+        :return: The content of the Hugo page.
+        :rtype: str
+        """
+        return self.check_frontmatter(note_content, fields)
@@ -0,0 +1,313 @@
+"""Writers of the files an export produces."""
+import filecmp
+import os
+import shutil
+import threading
+from typing import Iterable, NamedTuple, Optional
+
+
+# ioctl request cloning a file on copy-on-write filesystems (Linux FICLONE).
+FICLONE = 0x40049409
+
+
+def reflink(source: str, target: str) -> bool:
+    """
+    Clone a file on a copy-on-write filesystem.
+
+    :param source: The File URI of the file to clone.
+    :type source: str
+    :param target: The File URI of the clone.
+    :type target: str
+
+    :return: Whether the clone was created.
+    :rtype: bool
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        with open(source, "rb") as src, open(target, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        return True
+    except OSError:
+        if os.path.exists(target):
+            os.remove(target)
+        return False
+
+
+class ContentWriter:
+    """
+    Write the directories, pages and assets of an export to disk.
+
+    A file whose bytes would not change is left untouched, so its
+    modification time is kept for Hugo, rsync and the deploy to go by. A file
+    which changed is written next to its target and renamed into place, so
+    readers never see it half written. Its modification time is taken from
+    its source, unless that would not move it forward.
+
+    Every file the writer writes or leaves untouched is remembered, so the
+    files an export no longer produces can be pruned afterwards.
+
+    :param metrics: The metrics to count the written and unchanged files in.
+    :type metrics: Metrics
+    """
+
+    def __init__(self, metrics=None):
+        """Initialize ContentWriter."""
+        self.metrics = metrics
+        self.touched: set[str] = set()
+        self._lock = threading.Lock()
+
+    def reset(self) -> None:
+        """Forget the files touched so far."""
+        with self._lock:
+            self.touched.clear()
+
+    def makedirs(self, path: str) -> None:
+        """
+        Create a directory and its parents.
+
+        :param path: The directory.
+        :type path: str
+        """
+        os.makedirs(path, exist_ok=True)
+
+    def write_text(self, path: str, content: str, mtime: float = None) -> int:
+        """
+        Write a page, unless it has this content already.
+
+        :param path: The File URI of the page.
+        :type path: str
+        :param content: The content of the page.
+        :type content: str
+        :param mtime: The modification time of the source of the page.
+        :type mtime: float
+
+        :return: The size of the page in bytes.
+        :rtype: int
+        """
+        data = content.replace("\n", os.linesep).encode("utf-8")
+        self.write_bytes(path, data, mtime)
+        return len(data)
+
+    def write_bytes(self, path: str, data: bytes, mtime: float = None) -> None:
+        """
+        Write a file, unless it has this content already.
+
+        :param path: The File URI of the file.
+        :type path: str
+        :param data: The content of the file.
+        :type data: bytes
+        :param mtime: The modification time of the source of the file.
+        :type mtime: float
+        """
+        previous = self._touch(path)
+        if previous is not None and previous.st_size == len(data):
+            with open(path, "rb") as f:
+                if f.read() == data:
+                    return self._count("files_unchanged")
+        tmp_path = self._tmp_path(path)
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        self._replace(tmp_path, path, mtime, previous)
+
+    def copy_file(self, source: str, target: str, mtime: float = None) -> None:
+        """
+        Copy a file with its permission bits, unless the copy is current.
+
+        :param source: The File URI of the file to copy.
+        :type source: str
+        :param target: The File URI of the copy.
+        :type target: str
+        :param mtime: The modification time of the copy, that of the source
+            when not given.
+        :type mtime: float
+        """
+        previous = self._touch(target)
+        if previous is not None and filecmp.cmp(source, target, shallow=False):
+            return self._count("files_unchanged")
+        tmp_path = self._tmp_path(target)
+        shutil.copy(source, tmp_path)
+        self._replace(tmp_path, target, os.stat(source).st_mtime if mtime is None else mtime, previous)
+
+    def store_file(self, source: str, target: str) -> None:
+        """
+        Copy a file to a content addressed name, unless it is stored already.
+
+        :param source: The File URI of the file to store.
+        :type source: str
+        :param target: The File URI of the stored file.
+        :type target: str
+        """
+        if self._touch(target) is not None:
+            return
+        tmp_path = self._tmp_path(target)
+        shutil.copyfile(source, tmp_path)
+        self._replace(tmp_path, target, None, None)
+
+    def link_file(self, source: str, target: str) -> None:
+        """
+        Hardlink a file, or reflink or copy it when it cannot be hardlinked.
+
+        A link which is in place already is left untouched.
+
+        :param source: The File URI of the file to link.
+        :type source: str
+        :param target: The File URI of the link.
+        :type target: str
+        """
+        if self._touch(target) is not None and os.path.samefile(source, target):
+            return self._count("files_unchanged")
+        tmp_path = self._tmp_path(target)
+        try:
+            os.link(source, tmp_path)
+        except OSError:
+            if not reflink(source, tmp_path):
+                shutil.copyfile(source, tmp_path)
+        # The link shares its modification time with the stored file.
+        self._replace(tmp_path, target, None, None)
+
+    def set_dir_mtime(self, directory: str, path: str) -> None:
+        """
+        Give a directory the modification time of a file in it, when it differs.
+
+        :param directory: The directory.
+        :type directory: str
+        :param path: The File URI of the file.
+        :type path: str
+        """
+        mtime = os.stat(path).st_mtime_ns
+        if os.stat(directory).st_mtime_ns != mtime:
+            os.utime(directory, ns=(mtime, mtime))
+
+    def prune(self, directory: str, keep: Iterable[str] = ()) -> list[str]:
+        """
+        Delete the files below a directory which were not touched, and the directories left empty.
+
+        :param directory: The directory to prune.
+        :type directory: str
+        :param keep: The File URI's of files to keep, even when not touched.
+        :type keep: Iterable[str]
+
+        :return: The File URI's of the deleted files.
+        :rtype: list[str]
+        """
+        kept = self.touched | {os.path.normpath(path) for path in keep}
+        removed = []
+        for dirpath, _, files in os.walk(directory):
+            for file in files:
+                path = os.path.normpath(os.path.join(dirpath, file))
+                if path not in kept:
+                    os.remove(path)
+                    removed.append(path)
+        remove_empty_dirs(directory)
+        return removed
+
+    def _touch(self, path: str) -> Optional[os.stat_result]:
+        """Remember a file as part of the export, and return its stat when it exists."""
+        with self._lock:
+            self.touched.add(os.path.normpath(path))
+        try:
+            return os.stat(path)
+        except FileNotFoundError:
+            return None
+
+    def _tmp_path(self, path: str) -> str:
+        """Return a File URI next to a target to write it under, unique to the thread."""
+        return f"{path}.{threading.get_ident()}.tmp"
+
+    def _replace(self, tmp_path: str, path: str, mtime: Optional[float], previous: Optional[os.stat_result]) -> None:
+        """Rename a written file into place, giving it the modification time of its source."""
+        if mtime is not None and (previous is None or mtime > previous.st_mtime):
+            os.utime(tmp_path, (mtime, mtime))
+        os.replace(tmp_path, path)
+        self._count("files_written")
+
+    def _count(self, name: str) -> None:
+        """Count a written or unchanged file."""
+        if self.metrics is not None:
+            self.metrics.count(name)
+
+
+def remove_empty_dirs(directory: str, keep: Iterable[str] = ()) -> None:
+    """
+    Remove the empty directories below a directory, deepest first.
+
+    :param directory: The directory.
+    :type directory: str
+    :param keep: The directories to keep, even when empty.
+    :type keep: Iterable[str]
+    """
+    kept = {os.path.normpath(path) for path in keep} | {os.path.normpath(directory)}
+    for dirpath, _, _ in sorted(os.walk(directory), reverse=True):
+        if os.path.normpath(dirpath) not in kept and not os.listdir(dirpath):
+            os.rmdir(dirpath)
+
+
+class PlannedFile(NamedTuple):
+    """
+    A file an export would write, with either its content or the file it is
+    copied or linked from. The origin is the file holding the bytes the file
+    will have, which differs from the source when the source is only planned
+    as well.
+    """
+
+    content: Optional[bytes] = None
+    source: Optional[str] = None
+    link: bool = False
+    origin: Optional[str] = None
+    mtime: Optional[float] = None
+
+
+class PlannedWriter(ContentWriter):
+    """
+    Record the files an export would write, without writing anything.
+
+    Pages are kept in memory, copied and linked files by the File URI of
+    their source.
+    """
+
+    def __init__(self):
+        """Initialize PlannedWriter."""
+        super().__init__()
+        self.files: dict[str, PlannedFile] = {}
+        self.dirs: set[str] = set()
+
+    def makedirs(self, path: str) -> None:
+        """Record a directory."""
+        with self._lock:
+            self.dirs.add(os.path.normpath(path))
+
+    def write_bytes(self, path: str, data: bytes, mtime: float = None) -> None:
+        """Record a file."""
+        with self._lock:
+            self.files[os.path.normpath(path)] = PlannedFile(content=data, mtime=mtime)
+
+    def copy_file(self, source: str, target: str, mtime: float = None) -> None:
+        """Record a copy."""
+        self._record(source, target, link=False, mtime=mtime)
+
+    def store_file(self, source: str, target: str) -> None:
+        """Record a stored file, also when it is stored already."""
+        self._record(source, target, link=False)
+
+    def link_file(self, source: str, target: str) -> None:
+        """Record a link."""
+        self._record(source, target, link=True)
+
+    def set_dir_mtime(self, directory: str, path: str) -> None:
+        """Leave the directories alone, the plan only writes files."""
+
+    def _record(self, source: str, target: str, link: bool, mtime: float = None) -> None:
+        """Record a file taken from another, which may itself only be planned."""
+        with self._lock:
+            planned = self.files.get(os.path.normpath(source))
+            if planned is not None and planned.content is not None:
+                self.files[os.path.normpath(target)] = PlannedFile(content=planned.content, mtime=mtime)
+            else:
+                if planned is None:
+                    # Fail the way the copy would, when there is nothing to copy.
+                    os.stat(source)
+                origin = planned.origin if planned is not None else source
+                self.files[os.path.normpath(target)] = PlannedFile(source=source, link=link, origin=origin, mtime=mtime)
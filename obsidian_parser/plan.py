@@ -0,0 +1,138 @@
+"""Plan the changes an export makes to the Hugo content directory."""
+import filecmp
+import os
+from typing import Iterable
+from obsidian_parser.instrumentation import logger
+from obsidian_parser.output import ContentWriter, PlannedFile, PlannedWriter, remove_empty_dirs
+
+
+class ExportPlan:
+    """
+    The difference between the tree an export produces and the one on disk.
+
+    Files are created when they do not exist yet, updated when their content
+    differs, and deleted when they exist below the directories the export
+    writes to, the hugo content directory or those of the export targets and
+    of the renderers, but are not part of the export. Files the export would write unchanged are
+    left alone.
+
+    :param planned: The writer the export was recorded with.
+    :type planned: PlannedWriter
+    :param hugo_content_dir: The Hugo content directory.
+    :type hugo_content_dir: str
+    """
+
+    def __init__(self, planned: PlannedWriter, hugo_content_dir: str):
+        """Initialize ExportPlan."""
+        self.planned = planned
+        self.hugo_content_dir = hugo_content_dir
+        self.create: list[str] = []
+        self.update: list[str] = []
+        self.delete: list[str] = []
+        self.unchanged = 0
+        self.directories: list[str] = [hugo_content_dir]
+
+    @classmethod
+    def compute(cls, planned: PlannedWriter, hugo_content_dir: str, keep: Iterable[str] = (), directories: Iterable[str] = None) -> "ExportPlan":
+        """
+        Compare the planned files with the files on disk.
+
+        :param planned: The writer the export was recorded with.
+        :type planned: PlannedWriter
+        :param hugo_content_dir: The Hugo content directory.
+        :type hugo_content_dir: str
+        :param keep: The File URI's of files below the hugo content directory
+            which are not part of the export but must not be deleted, such as
+            the export manifest.
+        :type keep: Iterable[str]
+        :param directories: The directories the export writes to, to look for
+            files to delete in, the hugo content directory when not given.
+        :type directories: Iterable[str]
+
+        :return: The plan.
+        :rtype: ExportPlan
+        """
+        plan = cls(planned, hugo_content_dir)
+        for path, planned_file in planned.files.items():
+            if not os.path.isfile(path):
+                plan.create.append(path)
+            elif not is_current(path, planned_file):
+                plan.update.append(path)
+            else:
+                plan.unchanged += 1
+        kept = {os.path.normpath(path) for path in keep}
+        plan.directories = list(directories or [hugo_content_dir])
+        delete = set()
+        for directory in plan.directories:
+            for dirpath, _, files in os.walk(directory):
+                for file in files:
+                    path = os.path.normpath(os.path.join(dirpath, file))
+                    if path not in planned.files and path not in kept:
+                        delete.add(path)
+        plan.create.sort()
+        plan.update.sort()
+        plan.delete = sorted(delete)
+        return plan
+
+    def has_changes(self) -> bool:
+        """Return whether applying the plan changes anything."""
+        return bool(self.create or self.update or self.delete)
+
+    def log(self) -> None:
+        """Log the plan, a line per file to create (+), update (~) or delete (-)."""
+        for sign, paths in (("+", self.create), ("~", self.update), ("-", self.delete)):
+            for path in paths:
+                logger.info("%s %s", sign, os.path.relpath(path, self.hugo_content_dir))
+        logger.info(
+            "Plan: %d to create, %d to update, %d to delete, %d unchanged",
+            len(self.create), len(self.update), len(self.delete), self.unchanged,
+        )
+
+    def apply(self, writer: ContentWriter = None) -> None:
+        """
+        Make the changes of the plan, and nothing else.
+
+        Files are written in the order the export recorded them, so a file
+        linked from the asset store is stored before it is linked. Directories
+        left empty by the deletes are removed, in each directory the export
+        writes to.
+
+        :param writer: The writer to make the changes with.
+        :type writer: ContentWriter
+        """
+        writer = writer or ContentWriter()
+        changed = set(self.create) | set(self.update)
+        for path, planned_file in self.planned.files.items():
+            if path not in changed:
+                continue
+            writer.makedirs(os.path.dirname(path))
+            if planned_file.content is not None:
+                writer.write_bytes(path, planned_file.content, planned_file.mtime)
+            elif planned_file.link:
+                writer.link_file(planned_file.source, path)
+            else:
+                writer.copy_file(planned_file.source, path, planned_file.mtime)
+        for path in self.delete:
+            os.remove(path)
+        for directory in self.directories:
+            remove_empty_dirs(directory, keep=self.planned.dirs)
+
+
+def is_current(path: str, planned_file: PlannedFile) -> bool:
+    """
+    Return whether a file on disk already has the content a planned file would get.
+
+    :param path: The File URI of the file on disk.
+    :type path: str
+    :param planned_file: The planned file.
+    :type planned_file: PlannedFile
+
+    :return: Whether the file is current.
+    :rtype: bool
+    """
+    if planned_file.content is not None:
+        if os.path.getsize(path) != len(planned_file.content):
+            return False
+        with open(path, "rb") as f:
+            return f.read() == planned_file.content
+    return filecmp.cmp(planned_file.origin, path, shallow=False)
@@ -0,0 +1,246 @@
+"""Concurrent, cached download of remote assets."""
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Iterable, Optional
+from urllib.parse import unquote, urljoin, urlsplit
+from obsidian_parser.output import ContentWriter
+
+if TYPE_CHECKING:
+    import http.client
+
+
+ASSET_NAME_REGEX = re.compile(r"[^\w.\-]")
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+
+def is_remote(link: str) -> bool:
+    """Whether a link points at a remote asset."""
+    return link.startswith(("http://", "https://"))
+
+
+class FetchError(Exception):
+    """A remote asset could not be downloaded."""
+
+
+class RemoteFetcher:
+    """
+    Download the remote assets of a run concurrently.
+
+    Downloads run on a bounded thread pool, each thread keeps one connection
+    per host open for reuse. Every download has a timeout and a size limit.
+    Responses are kept in an on-disk cache keyed by URL and revalidated with
+    their ETag or Last-Modified date, so unchanged assets are not downloaded
+    again on the next run. Without a cache directory the cache only lives for
+    the run. Assets are named after a hash of their URL, so a page links the
+    same asset name on every run.
+
+    :param cache_dir: The directory of the HTTP cache.
+    :type cache_dir: str
+    :param workers: The number of concurrent downloads.
+    :type workers: int
+    :param timeout: The timeout of each request in seconds.
+    :type timeout: float
+    :param max_size: The maximum size of an asset in bytes.
+    :type max_size: int
+    """
+
+    def __init__(self, cache_dir: str = None, workers: int = 8, timeout: float = 10.0, max_size: int = 20 * 1024 * 1024):
+        """Initialize RemoteFetcher."""
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.timeout = timeout
+        self.max_size = max_size
+        self.cache_hits = 0
+        self.downloads = 0
+        self._init_run_state()
+
+    def _init_run_state(self) -> None:
+        """Reset the pool, connections and downloads of the run."""
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._futures: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._run_dir: Optional[str] = None
+
+    def asset_name(self, url: str) -> str:
+        """
+        Return the deterministic asset name of a remote asset.
+
+        :param url: The URL of the asset.
+        :type url: str
+
+        :return: The file name of the asset in a page bundle.
+        :rtype: str
+        """
+        basename = unquote(urlsplit(url).path.rstrip("/").rsplit("/", 1)[-1])
+        basename = ASSET_NAME_REGEX.sub("-", basename) or "asset"
+        return f"web{hashlib.sha256(url.encode()).hexdigest()[:12]}_{basename}"
+
+    def prefetch(self, urls: Iterable[str]) -> None:
+        """
+        Start downloading remote assets in the background.
+
+        :param urls: The URLs of the assets.
+        :type urls: Iterable[str]
+        """
+        for url in urls:
+            self.fetch(url)
+
+    def fetch(self, url: str) -> Future:
+        """
+        Download a remote asset, at most once per run.
+
+        :param url: The URL of the asset.
+        :type url: str
+
+        :return: A future of the File URI of the downloaded asset.
+        :rtype: Future
+        """
+        with self._lock:
+            if url not in self._futures:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="fetch")
+                self._futures[url] = self._pool.submit(self._download, url)
+            return self._futures[url]
+
+    def save(self, url: str, bundle_dir: str, writer: ContentWriter = None) -> str:
+        """
+        Place a remote asset into a page bundle.
+
+        :param url: The URL of the asset.
+        :type url: str
+        :param bundle_dir: The page bundle directory.
+        :type bundle_dir: str
+        :param writer: The writer to copy the asset with.
+        :type writer: ContentWriter
+
+        :return: The name of the asset in the page bundle.
+        :rtype: str
+        """
+        asset_name = self.asset_name(url)
+        writer = writer or ContentWriter()
+        writer.copy_file(self.fetch(url).result(), os.path.join(bundle_dir, asset_name))
+        return asset_name
+
+    def close(self) -> None:
+        """Wait for the downloads, close the connections and drop the run cache."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+        if self._run_dir is not None:
+            shutil.rmtree(self._run_dir, ignore_errors=True)
+        self._init_run_state()
+
+    def _cache_path(self, url: str) -> str:
+        """Return the cache path, without extension, of a URL."""
+        if self.cache_dir:
+            cache_dir = self.cache_dir
+        else:
+            with self._lock:
+                if self._run_dir is None:
+                    self._run_dir = tempfile.mkdtemp(prefix="obsidian-parser-http-")
+            cache_dir = self._run_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        return os.path.join(cache_dir, hashlib.sha256(url.encode()).hexdigest())
+
+    def _connection(self, scheme: str, netloc: str) -> "http.client.HTTPConnection":
+        """Return the connection of the current thread to a host."""
+        # Imported on first use, it is slow to import and most runs download nothing.
+        import http.client
+        connections = getattr(self._local, "connections", None)
+        if connections is None:
+            connections = self._local.connections = {}
+        if (scheme, netloc) not in connections:
+            connection_class = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            connections[(scheme, netloc)] = connection_class(netloc, timeout=self.timeout)
+        return connections[(scheme, netloc)]
+
+    def _download(self, url: str) -> str:
+        """Download an asset into the cache, revalidating a cached copy."""
+        import http.client
+        cache_path = self._cache_path(url)
+        body_path = cache_path + ".body"
+        meta = {}
+        if os.path.isfile(body_path):
+            try:
+                with open(cache_path + ".json", "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+            except (FileNotFoundError, ValueError):
+                meta = {}
+        headers = {"User-Agent": "obsidian-parser"}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        try:
+            status, response_headers = self._request(url, headers, body_path + ".tmp")
+        except (OSError, http.client.HTTPException):
+            # Serve a cached copy when the host cannot be reached.
+            if meta:
+                with self._lock:
+                    self.cache_hits += 1
+                return body_path
+            raise
+        if status == 304:
+            with self._lock:
+                self.cache_hits += 1
+            return body_path
+        with self._lock:
+            self.downloads += 1
+        os.replace(body_path + ".tmp", body_path)
+        meta = {
+            "url": url,
+            "etag": response_headers.get("ETag"),
+            "last_modified": response_headers.get("Last-Modified"),
+        }
+        with open(cache_path + ".json", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        return body_path
+
+    def _request(self, url: str, headers: dict, target: str, redirects: int = 5):
+        """Request a URL, following redirects, and stream a 200 body into target."""
+        import http.client
+        parts = urlsplit(url)
+        connection = self._connection(parts.scheme, parts.netloc)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        try:
+            connection.request("GET", path, headers=headers)
+            response = connection.getresponse()
+        except (OSError, http.client.HTTPException):
+            # A kept-alive connection may have been closed by the host, retry once on a new one.
+            connection.close()
+            connection.request("GET", path, headers=headers)
+            response = connection.getresponse()
+        try:
+            if response.status in REDIRECT_CODES and response.getheader("Location") and redirects:
+                response.read()
+                return self._request(urljoin(url, response.getheader("Location")), headers, target, redirects - 1)
+            if response.status == 304:
+                response.read()
+                return 304, response.headers
+            if response.status != 200:
+                response.read()
+                raise FetchError(f"HTTP {response.status} {response.reason}")
+            length = response.getheader("Content-Length")
+            if length and int(length) > self.max_size:
+                raise FetchError(f"asset of {length} bytes exceeds the limit of {self.max_size} bytes")
+            size = 0
+            with open(target, "wb") as f:
+                for chunk in iter(lambda: response.read(1 << 16), b""):
+                    size += len(chunk)
+                    if size > self.max_size:
+                        raise FetchError(f"asset exceeds the limit of {self.max_size} bytes")
+                    f.write(chunk)
+            return 200, response.headers
+        except BaseException:
+            connection.close()
+            if os.path.exists(target):
+                os.remove(target)
+            raise
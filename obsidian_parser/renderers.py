@@ -0,0 +1,175 @@
+"""Renderers of the output targets besides the Hugo content directory."""
+import json
+import os
+from abc import ABC, abstractmethod
+from urllib.parse import quote
+from obsidian_parser.instrumentation import logger
+from obsidian_parser.model import ParsedNote
+from obsidian_parser.tokenizer import splice
+from obsidian_parser.vaultindex import slugify
+
+
+class Renderer(ABC):
+    """
+    An output target the parsed notes are rendered to, besides the Hugo content directory.
+
+    Each note is parsed once, and the same parsed note is handed to every
+    renderer of the run. A renderer writes through the writer of the parser,
+    so unchanged files are left alone, and the files a full export did not
+    write are removed from its output directory. A renderer implements
+    `render` and `page_path`, it cannot be created otherwise.
+
+    :param output_dir: The directory to render the notes into.
+    :type output_dir: str
+    """
+
+    name = ""
+    page_extension = ""
+
+    def __init__(self, output_dir: str):
+        """Initialize Renderer."""
+        self.output_dir = output_dir
+
+    @abstractmethod
+    def render(self, parser, parsed: ParsedNote) -> None:
+        """
+        Render a note.
+
+        :param parser: The parser of the run.
+        :type parser: ObsidianParser
+        :param parsed: The parsed note.
+        :type parsed: ParsedNote
+        """
+
+    @abstractmethod
+    def page_path(self, parser, note: str) -> str:
+        """
+        Return the File URI a note is rendered to.
+
+        :param parser: The parser of the run.
+        :type parser: ObsidianParser
+        :param note: The File URI of the note.
+        :type note: str
+
+        :return: The File URI of the page.
+        :rtype: str
+        """
+
+    def remove_stale_pages(self, parser, notes: list[str]) -> list[str]:
+        """
+        Delete the pages of the notes which are no longer exported.
+
+        :param parser: The parser of the run.
+        :type parser: ObsidianParser
+        :param notes: The File URI's of the exported notes.
+        :type notes: list[str]
+
+        :return: The File URI's of the deleted pages.
+        :rtype: list[str]
+        """
+        pages = {os.path.normpath(self.page_path(parser, note)) for note in notes}
+        removed = []
+        for dirpath, _, files in os.walk(self.output_dir):
+            for file in files:
+                path = os.path.normpath(os.path.join(dirpath, file))
+                if file.endswith(self.page_extension) and path not in pages:
+                    os.remove(path)
+                    removed.append(path)
+        return removed
+
+
+class MarkdownRenderer(Renderer):
+    """
+    Plain Markdown mirror of the exported notes.
+
+    The notes keep their place in the vault and their frontmatter. Wiki links
+    become relative Markdown links to the mirrored notes, links which do not
+    resolve become their text, and embedded vault assets are copied into the
+    mirror at their place in the vault.
+    """
+
+    name = "markdown"
+    page_extension = ".md"
+
+    def page_path(self, parser, note: str) -> str:
+        """Return the File URI a note is mirrored to, its place in the vault below the output directory."""
+        return os.path.join(self.output_dir, os.path.relpath(note, parser.obsidian_vault_dir))
+
+    def render(self, parser, parsed: ParsedNote) -> None:
+        """Mirror a note."""
+        page = self.page_path(parser, parsed.note)
+        page_dir = os.path.dirname(page)
+        replacements = []
+        for link in parsed.links:
+            if link.note is None:
+                replacements.append((link.span, link.text))
+                continue
+            url = "" if link.note == parsed.note else quote(os.path.relpath(self.page_path(parser, link.note), page_dir))
+            heading = (link.heading or "").rsplit("#", 1)[-1]
+            if heading and not heading.startswith("^"):
+                url += "#" + slugify(heading)
+            url = url or quote(os.path.basename(page))
+            replacements.append((link.span, f"[{link.text}]({url})"))
+        copied = set()
+        for embed in parsed.embeds:
+            url = embed.link
+            if embed.asset is not None:
+                target = os.path.join(self.output_dir, os.path.relpath(embed.asset, parser.obsidian_vault_dir))
+                url = quote(os.path.relpath(target, page_dir))
+                if target not in copied:
+                    copied.add(target)
+                    if os.path.isfile(embed.asset):
+                        parser.writer.makedirs(os.path.dirname(target))
+                        parser.writer.copy_file(embed.asset, target)
+                    else:
+                        logger.debug("    Vault asset `%s` not found, not mirrored", embed.asset)
+            replacements.append((embed.span, f"![{embed.text}]({url})"))
+        parser.writer.makedirs(page_dir)
+        parser.writer.write_text(page, splice(parsed.content, replacements), parser.get_note_mtime(parsed.note))
+
+
+class JsonRenderer(Renderer):
+    """
+    JSON document of each exported note, for services reading the vault.
+
+    Each note is written to ``<page name>.json`` with its title, frontmatter,
+    tags, headings, links, embedded assets and Markdown body.
+    """
+
+    name = "json"
+    page_extension = ".json"
+
+    def page_path(self, parser, note: str) -> str:
+        """Return the File URI of the document of a note, named after its Hugo page bundle."""
+        return os.path.join(self.output_dir, parser.get_page_name(note) + self.page_extension)
+
+    def render(self, parser, parsed: ParsedNote) -> None:
+        """Write the document of a note."""
+        document = {
+            "name": parsed.name,
+            "path": os.path.relpath(parsed.note, parser.obsidian_vault_dir),
+            "title": parsed.title,
+            "frontmatter": dict(parsed.frontmatter),
+            "tags": list(parsed.tags),
+            "headings": [{"level": heading.level, "text": heading.text, "anchor": heading.anchor} for heading in parsed.headings],
+            "links": [
+                {
+                    "target": link.target,
+                    "heading": link.heading,
+                    "text": link.text,
+                    "page": parser.get_page_name(link.note) if link.note is not None else None,
+                }
+                for link in parsed.links
+            ],
+            "assets": [embed.link for embed in parsed.embeds],
+            "body": parsed.body,
+        }
+        parser.writer.makedirs(self.output_dir)
+        parser.writer.write_text(
+            self.page_path(parser, parsed.note),
+            json.dumps(document, ensure_ascii=False, indent=1, default=str) + "\n",
+            parser.get_note_mtime(parsed.note),
+        )
+
+
+RENDERERS = {renderer.name: renderer for renderer in (MarkdownRenderer, JsonRenderer)}
@@ -0,0 +1,148 @@
+"""Streaming scan of the notes of an Obsidian vault."""
+import fnmatch
+import os
+from typing import Iterable, Iterator, NamedTuple
+
+
+IGNORED_DIRS = (".obsidian", ".trash", ".git")
+EXPORTIGNORE_NAME = ".exportignore"
+
+
+class IgnorePattern(NamedTuple):
+    """A glob of paths the scanner skips."""
+
+    glob: str
+    dir_only: bool
+    anchored: bool
+
+
+def parse_ignore_patterns(lines: Iterable[str]) -> list[IgnorePattern]:
+    """
+    Parse ignore globs, in the format of a `.exportignore` file.
+
+    Empty lines and lines starting with `#` are skipped. A glob ending in `/`
+    only matches directories. A glob containing `/` is matched against the
+    vault relative path, any other glob against the file or directory name.
+
+    :param lines: The globs.
+    :type lines: Iterable[str]
+
+    :return: The parsed globs.
+    :rtype: list[IgnorePattern]
+    """
+    patterns = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if line:
+            patterns.append(IgnorePattern(line.lstrip("/"), dir_only, "/" in line))
+    return patterns
+
+
+class VaultScanner:
+    """
+    Find the notes of a vault with `os.scandir`, skipping ignored directories.
+
+    The `.obsidian`, `.trash` and `.git` directories are never entered, and
+    neither is anything matching the ignore globs or the globs of the
+    `.exportignore` file at the root of the vault. Notes are yielded as
+    directory entries while the scan goes on, their stat is fetched at most
+    once and cached on the entry.
+
+    :param obsidian_vault_dir: The Obsidian vault directory.
+    :type obsidian_vault_dir: str
+    :param ignore: Globs of the files and directories to skip.
+    :type ignore: Iterable[str]
+    :param extensions: The file extensions of the notes.
+    :type extensions: tuple[str, ...]
+    """
+
+    def __init__(self, obsidian_vault_dir: str, ignore: Iterable[str] = None, extensions: tuple[str, ...] = (".md",)):
+        """Initialize VaultScanner."""
+        self.obsidian_vault_dir = obsidian_vault_dir
+        self.extensions = extensions
+        self.patterns = parse_ignore_patterns(ignore or [])
+        ignore_file = os.path.join(obsidian_vault_dir, EXPORTIGNORE_NAME)
+        if os.path.isfile(ignore_file):
+            with open(ignore_file, "r", encoding="utf-8") as f:
+                self.patterns += parse_ignore_patterns(f)
+        # The globs which apply to files, most vaults have none.
+        self.file_patterns = [pattern for pattern in self.patterns if not pattern.dir_only]
+
+    def scan(self, directory: str, attachments: bool = False) -> Iterator[os.DirEntry]:
+        """
+        Yield the notes in a directory of the vault, in `os.walk` order.
+
+        :param directory: The directory to scan.
+        :type directory: str
+        :param attachments: Whether to yield the attachments, the files which
+            are not notes, instead.
+        :type attachments: bool
+
+        :return: The directory entries of the notes.
+        :rtype: Iterator[os.DirEntry]
+        """
+        # The vault relative path of each directory is kept along with it, so
+        # the ignore globs are matched without a relpath per entry.
+        relpath = os.path.relpath(directory, self.obsidian_vault_dir).replace(os.sep, "/")
+        stack = [(directory, "" if relpath == os.curdir else relpath + "/")]
+        while stack:
+            current, prefix = stack.pop()
+            try:
+                with os.scandir(current) as scan:
+                    entries = list(scan)
+            except OSError:
+                continue
+            subdirs = []
+            for entry in entries:
+                name = entry.name
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    if name in IGNORED_DIRS or entry.is_symlink():
+                        continue
+                    if self.patterns and self._matches(prefix + name, name, self.patterns):
+                        continue
+                    subdirs.append((entry.path, prefix + name + "/"))
+                elif name.endswith(self.extensions) != attachments:
+                    if self.file_patterns and self._matches(prefix + name, name, self.file_patterns):
+                        continue
+                    yield entry
+            stack.extend(reversed(subdirs))
+
+    def ignored(self, path: str, is_dir: bool = False, parents: bool = True) -> bool:
+        """
+        Whether a path of the vault is ignored.
+
+        :param path: The path.
+        :type path: str
+        :param is_dir: Whether the path is a directory.
+        :type is_dir: bool
+        :param parents: Whether to check the parent directories as well.
+        :type parents: bool
+
+        :return: True if the path, or one of its parents, is ignored.
+        :rtype: bool
+        """
+        parts = os.path.relpath(path, self.obsidian_vault_dir).split(os.sep)
+        if parts[0] in (os.curdir, os.pardir):
+            return False
+        first = 0 if parents else len(parts) - 1
+        for index in range(first, len(parts)):
+            relpath = "/".join(parts[:index + 1])
+            if is_dir or index < len(parts) - 1:
+                if parts[index] in IGNORED_DIRS or self._matches(relpath, parts[index], self.patterns):
+                    return True
+            elif self._matches(relpath, parts[index], self.file_patterns):
+                return True
+        return False
+
+    @staticmethod
+    def _matches(relpath: str, name: str, patterns: list[IgnorePattern]) -> bool:
+        """Whether a vault relative path matches one of the ignore globs."""
+        return any(fnmatch.fnmatch(relpath if pattern.anchored else name, pattern.glob) for pattern in patterns)
@@ -0,0 +1,179 @@
+"""Frontmatter of Hugo pages, emitted from a configurable schema."""
+import re
+from typing import NamedTuple, Optional
+import frontmatter
+import yaml
+from obsidian_parser.instrumentation import logger
+from obsidian_parser.metadata import load_frontmatter
+
+
+YAML_BOUNDARY = re.compile(r"^-{3,}\s*$", re.MULTILINE)
+JSON_BOUNDARY = re.compile(r"^(?:{|})$", re.MULTILINE)
+TITLE_REGEX = re.compile(r"^# (.*)", re.MULTILINE)
+
+
+def parse_frontmatter(note_content: str) -> tuple[dict, str]:
+    """
+    Split a note into its frontmatter and its body.
+
+    The header is located by offset and the YAML is only parsed when there is
+    a header, with the C loader when PyYAML has one. The result is the same as
+    the one of `frontmatter.parse`: line endings are normalized, and both the
+    note and its body are stripped.
+
+    :param note_content: The content of the note.
+    :type note_content: str
+
+    :return: The frontmatter and the body of the note.
+    :rtype: tuple[dict, str]
+    """
+    text = note_content.replace("\r\n", "\n").strip()
+    start = YAML_BOUNDARY.match(text)
+    if start is None:
+        if JSON_BOUNDARY.match(text):
+            return frontmatter.parse(text)
+        return {}, text
+    end = YAML_BOUNDARY.search(text, start.end())
+    if end is None:
+        return {}, text
+    return load_frontmatter(text[start.end():end.start()]), text[end.end():].strip()
+
+
+class FieldSpec(NamedTuple):
+    """
+    A field of the frontmatter of a Hugo page.
+
+    The field is emitted as ``key: value`` with the value of the `source`
+    field of the note. When the note does not have the source field, or its
+    value is one of the `empty` values, the `default` text is emitted as is,
+    or the first heading of the note when `from_heading` is set. Without a
+    default the field is left out.
+    """
+
+    key: str
+    source: Optional[str] = None
+    default: Optional[str] = None
+    empty: tuple = ()
+    from_heading: bool = False
+
+
+class FrontmatterSchema:
+    """
+    The fields of the frontmatter of the Hugo pages, in the order they are emitted.
+
+    :param fields: The fields.
+    :type fields: list[FieldSpec]
+    """
+
+    def __init__(self, fields: list[FieldSpec]):
+        """Initialize FrontmatterSchema."""
+        self.fields = fields
+
+    @classmethod
+    def load(cls, path: str) -> "FrontmatterSchema":
+        """
+        Load a schema from a YAML file.
+
+        The file holds a list of fields, each a mapping with a `key` and
+        optionally a `source`, a `default`, a list of `empty` values and
+        `from_heading`. Defaults are emitted as they are written, so a list
+        default is written as the text ``"['todo']"``.
+
+        :param path: The File URI of the schema.
+        :type path: str
+
+        :return: The schema.
+        :rtype: FrontmatterSchema
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            fields = yaml.safe_load(f) or []
+        if not isinstance(fields, list):
+            raise ValueError(f"The frontmatter schema `{path}` is not a list of fields")
+        return cls([
+            FieldSpec(
+                key=str(field["key"]),
+                source=field.get("source"),
+                default=None if field.get("default") is None else str(field["default"]),
+                empty=tuple(field.get("empty") or ()),
+                from_heading=bool(field.get("from_heading")),
+            )
+            for field in fields
+        ])
+
+    def emit(self, metadata: dict, heading: Optional[str]) -> str:
+        """
+        Emit the frontmatter of a Hugo page.
+
+        :param metadata: The frontmatter of the note.
+        :type metadata: dict
+        :param heading: The first heading of the note.
+        :type heading: Optional[str]
+
+        :return: The frontmatter, with its delimiters.
+        :rtype: str
+        """
+        lines = ["---\n"]
+        for field in self.fields:
+            source = field.source or field.key
+            if source in metadata and not any(metadata[source] == value for value in field.empty):
+                lines.append(f"{field.key}: {metadata[source]}\n")
+            elif field.from_heading:
+                lines.append(f"{field.key}: {heading}\n")
+            elif field.default is not None:
+                lines.append(f"{field.key}: {field.default}\n")
+        lines.append("---\n\n")
+        return "".join(lines)
+
+    def reformat(self, hugo_page: str, fields: Optional[dict] = None) -> str:
+        """
+        Replace the frontmatter of a page with the one the schema emits.
+
+        The first `# ` heading of the page is removed from the body, it is the
+        title of the page unless the frontmatter has one.
+
+        :param hugo_page: The content of the page.
+        :type hugo_page: str
+        :param fields: Fields to add to the frontmatter of the page, such as
+            its backlinks.
+        :type fields: Optional[dict]
+
+        :return: The content of the page with its new frontmatter.
+        :rtype: str
+        """
+        logger.debug("  Reformatting Hugo page")
+        metadata, post_body = parse_frontmatter(hugo_page)
+        if fields:
+            metadata.update(fields)
+        title_heading = TITLE_REGEX.search(post_body)
+        if title_heading:
+            logger.debug("First Match = %s", title_heading.group(1))
+            if post_body.startswith("\n", title_heading.end()):
+                post_body = post_body[:title_heading.start()] + post_body[title_heading.end() + 1:]
+            title_heading = title_heading.group(1)
+        else:
+            logger.debug("Not Found")
+        return self.emit(metadata, title_heading) + post_body
+
+
+# The frontmatter the Hugo theme of the site expects. The defaults keep their
+# trailing space, so pages stay the same as they always were.
+DEFAULT_SCHEMA = FrontmatterSchema([
+    FieldSpec("title", from_heading=True),
+    FieldSpec("type", default="article "),
+    FieldSpec("layout", default="post "),
+    FieldSpec("description"),
+    FieldSpec("date"),
+    FieldSpec("year", source="years"),
+    FieldSpec("series"),
+    FieldSpec("categories", default="['todo'] "),
+    FieldSpec("tags", default="['untagged'] ", empty=([],)),
+    FieldSpec("authors", default="['damian'] ", empty=([],)),
+    FieldSpec("draft", default="false "),
+    FieldSpec("lastmod"),
+    FieldSpec("url"),
+    FieldSpec("image"),
+    FieldSpec("image_caption"),
+    FieldSpec("toc", default="false "),
+    FieldSpec("featured", default="false "),
+    FieldSpec("comments", default="false "),
+])
@@ -0,0 +1,222 @@
+"""Sharded full-text search index of the exported pages."""
+import gzip
+import json
+import os
+import re
+import threading
+import zlib
+from typing import Iterable, Optional
+from obsidian_parser.metadata import split_frontmatter
+from obsidian_parser.output import ContentWriter
+from obsidian_parser.tokenizer import CODE, tokenize
+
+
+SEARCH_INDEX_VERSION = 2
+DOCS_NAME = "index.json.gz"
+SHARD_NAME = "terms-{:03d}.json.gz"
+
+WORD_REGEX = re.compile(r"\w{2,}")
+# The text of links and images is indexed, their URLs are not.
+LINK_TARGET_REGEX = re.compile(r"(\]\([^)\n]*\))")
+TITLE_REGEX = re.compile(r"^title: (.*?)\s*$", re.MULTILINE)
+
+
+def shard_of(term: str, shards: int) -> int:
+    """
+    Return the shard a term is kept in.
+
+    :param term: The term.
+    :type term: str
+    :param shards: The number of shards.
+    :type shards: int
+
+    :return: The number of the shard.
+    :rtype: int
+    """
+    return zlib.crc32(term.encode("utf-8")) % shards
+
+
+def index_terms(page: str) -> dict[str, list[int]]:
+    """
+    Return the terms of a page, with the positions they occur at.
+
+    The frontmatter, fenced code blocks, inline code and the URLs of links
+    and images are left out.
+
+    :param page: The content of the page.
+    :type page: str
+
+    :return: Each term, lower cased, with the positions of its occurrences.
+    :rtype: dict[str, list[int]]
+    """
+    body = page[split_frontmatter(page)[1]:]
+    parts = []
+    position = 0
+    for span in tokenize(body):
+        if span.kind == CODE:
+            parts.append(body[position:span.start])
+            position = span.end
+    parts.append(body[position:])
+    text = LINK_TARGET_REGEX.sub("]", " ".join(parts))
+    terms: dict[str, list[int]] = {}
+    for position, match in enumerate(WORD_REGEX.finditer(text.lower())):
+        terms.setdefault(match.group(), []).append(position)
+    return terms
+
+
+class SearchIndex:
+    """
+    Inverted index of the terms of the exported pages, for a client side search.
+
+    Each page gets an integer ID, and each term maps to its postings: the
+    pages it occurs in with the positions it occurs at. The terms are spread
+    over a fixed number of shards by the CRC-32 of the term, so a client
+    only fetches the shards of the terms it searches for. The shards and the
+    table of pages are written as gzip compressed JSON:
+
+    - ``index.json.gz``: the version, the number of shards and the page,
+      title of each page ID. Pages go by their URL, so pages of the same
+      name in different sections are told apart.
+    - ``terms-NNN.json.gz``: each term of the shard with its postings, a list
+      of ``[page ID, position, position delta, ...]``.
+
+    An incremental run loads the index of the previous run and only
+    tokenizes the pages it exports again; shards which did not change are
+    not written.
+
+    :param path: The directory to write the index to.
+    :type path: str
+    :param shards: The number of shards.
+    :type shards: int
+    """
+
+    def __init__(self, path: str, shards: int = 16):
+        """Initialize SearchIndex."""
+        if shards < 1:
+            raise ValueError("The search index needs at least one shard")
+        self.path = path
+        self.shards = shards
+        self.docs: dict[str, tuple[int, str]] = {}
+        self.postings: dict[str, dict[int, list[int]]] = {}
+        self.pending: dict[str, tuple[str, dict[str, list[int]]]] = {}
+        self.loaded = False
+        self._lock = threading.Lock()
+
+    def begin(self, incremental: bool) -> None:
+        """
+        Start a run.
+
+        :param incremental: Whether the run only exports changed pages, the
+            index of the previous run is loaded then, unless it is in memory
+            already.
+        :type incremental: bool
+        """
+        if incremental and self.loaded:
+            return
+        self.docs, self.postings, self.pending = {}, {}, {}
+        self.loaded = incremental and self.load()
+
+    def load(self) -> bool:
+        """
+        Load the index written by a previous run.
+
+        :return: Whether there was an index with the same number of shards to load.
+        :rtype: bool
+        """
+        try:
+            with gzip.open(os.path.join(self.path, DOCS_NAME), "rt", encoding="utf-8") as f:
+                docs = json.load(f)
+            if docs.get("version") != SEARCH_INDEX_VERSION or docs.get("shards") != self.shards:
+                return False
+            postings = {}
+            for shard in range(self.shards):
+                with gzip.open(os.path.join(self.path, SHARD_NAME.format(shard)), "rt", encoding="utf-8") as f:
+                    for term, entries in json.load(f).items():
+                        postings[term] = {entry[0]: _undelta(entry[1:]) for entry in entries}
+        except (OSError, ValueError, KeyError, IndexError):
+            return False
+        self.docs = {page: (int(doc_id), title) for doc_id, (page, title) in docs["docs"].items()}
+        self.postings = postings
+        return True
+
+    def add(self, page: str, content: str) -> None:
+        """
+        Index a page, replacing what was indexed for it before.
+
+        :param page: The URL of the page.
+        :type page: str
+        :param content: The content of the page, with its frontmatter.
+        :type content: str
+        """
+        title = TITLE_REGEX.search(content[:split_frontmatter(content)[1]])
+        terms = index_terms(content)
+        with self._lock:
+            self.pending[page] = (title.group(1) if title else page, terms)
+
+    def save(self, pages: Iterable[str], writer: Optional[ContentWriter] = None) -> None:
+        """
+        Write the index.
+
+        The pages indexed during this run replace their previous postings,
+        and the pages which are no longer exported are dropped. New pages get
+        the next free IDs in the order of their URL's, so the index does not
+        depend on the order the pages were exported in.
+
+        :param pages: The URL's of all exported pages.
+        :type pages: Iterable[str]
+        :param writer: The writer to write the files with.
+        :type writer: ContentWriter
+        """
+        writer = writer or ContentWriter()
+        pages = set(pages)
+        dropped = {doc_id for page, (doc_id, _) in self.docs.items() if page not in pages or page in self.pending}
+        if dropped:
+            for term in list(self.postings):
+                entries = self.postings[term]
+                for doc_id in dropped.intersection(entries):
+                    del entries[doc_id]
+                if not entries:
+                    del self.postings[term]
+        docs = {page: doc for page, doc in self.docs.items() if page in pages}
+        next_id = max((doc_id for doc_id, _ in docs.values()), default=-1) + 1
+        for page in sorted(self.pending):
+            if page not in pages:
+                continue
+            title, terms = self.pending[page]
+            doc_id = docs[page][0] if page in docs else next_id
+            next_id = max(next_id, doc_id + 1)
+            docs[page] = (doc_id, title)
+            for term, positions in terms.items():
+                self.postings.setdefault(term, {})[doc_id] = positions
+        self.docs, self.pending, self.loaded = docs, {}, True
+
+        shards: list[dict] = [{} for _ in range(self.shards)]
+        for term, entries in self.postings.items():
+            shards[shard_of(term, self.shards)][term] = [
+                [doc_id] + _delta(entries[doc_id]) for doc_id in sorted(entries)
+            ]
+        writer.makedirs(self.path)
+        table = {str(doc_id): [page, title] for page, (doc_id, title) in sorted(docs.items(), key=lambda item: item[1][0])}
+        self._write(writer, DOCS_NAME, {"version": SEARCH_INDEX_VERSION, "shards": self.shards, "hash": "crc32", "docs": table})
+        for shard, terms in enumerate(shards):
+            self._write(writer, SHARD_NAME.format(shard), terms)
+
+    def _write(self, writer: ContentWriter, name: str, data: dict) -> None:
+        """Write a gzip compressed JSON file, the same bytes for the same data."""
+        payload = json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        writer.write_bytes(os.path.join(self.path, name), gzip.compress(payload, mtime=0))
+
+
+def _delta(positions: list[int]) -> list[int]:
+    """Encode ascending positions as the first and the differences to the one before."""
+    return positions[:1] + [position - before for before, position in zip(positions, positions[1:])]
+
+
+def _undelta(deltas: list[int]) -> list[int]:
+    """Decode delta encoded positions."""
+    positions = []
+    total = 0
+    for delta in deltas:
+        total += delta
+        positions.append(total)
+    return positions
@@ -0,0 +1,152 @@
+"""Conversion server, converting notes on request with the parser kept warm."""
+import json
+import os
+import socketserver
+import time
+from typing import BinaryIO, TypedDict
+import yaml
+from obsidian_parser.instrumentation import logger
+from obsidian_parser.obsidianparser import ObsidianParser
+from obsidian_parser.output import PlannedWriter
+
+
+class ConversionServer:
+    """
+    Convert notes on request, speaking JSON lines.
+
+    The notes of the vault are scanned and indexed once, when the server
+    starts, and the vault index, the embedded notes and the compiled
+    patterns are kept for all the requests that follow, an embedded note is
+    only read again once it changed. Each request is a
+    JSON object on a line of its own, and is answered with one:
+
+    - ``{"note": "blog/post.md"}`` converts a note of the vault, the path is
+      relative to the vault or absolute.
+    - ``{"note": "blog/post.md", "text": "..."}`` converts the given text as
+      the content of the note, such as unsaved changes. The note does not need
+      to exist, links resolve relative to it.
+    - ``{"reload": true}`` scans and indexes the vault again.
+
+    The response holds the name of the page, the converted markdown and the
+    File URI's of the vault assets the page bundles, or an ``error``. The
+    ``id`` of a request, when given, is sent back with its response. Nothing
+    is written to the hugo content directory.
+
+    :param parser: The parser to convert the notes with.
+    :type parser: ObsidianParser
+    """
+
+    Request = TypedDict("Request", {"id": object, "note": str, "text": str, "reload": bool}, total=False)
+    Response = TypedDict("Response", {"id": object, "page": str, "content": str, "assets": list[str], "notes": int, "error": str}, total=False)
+
+    def __init__(self, parser: ObsidianParser):
+        """Initialize ConversionServer."""
+        self.parser = parser
+        self.notes: list[str] = []
+
+    def load(self) -> None:
+        """Scan and index the notes of the vault."""
+        start = time.perf_counter()
+        self.notes = self.parser.get_notes_to_export(**self.parser.export_filter)
+        self.parser.build_vault_index(self.notes)
+        # The notes are read again when requested, they may have changed by then.
+        self.parser.note_texts.clear()
+        logger.info("Indexed %d note(s) in %.0f ms", len(self.notes), (time.perf_counter() - start) * 1000)
+
+    def handle(self, request: Request) -> Response:
+        """
+        Answer a request.
+
+        :param request: The request.
+        :type request: Request
+
+        :return: The response.
+        :rtype: Response
+        """
+        response: ConversionServer.Response = {"id": request["id"]} if "id" in request else {}
+        try:
+            if request.get("reload"):
+                self.load()
+                response["notes"] = len(self.notes)
+            else:
+                response.update(self.convert(request))
+        except (OSError, ValueError, TypeError, yaml.YAMLError) as e:
+            logger.warning("Request failed: %s", e)
+            response["error"] = str(e)
+        return response
+
+    def convert(self, request: Request) -> Response:
+        """
+        Convert the note of a request.
+
+        :param request: The request, with the note and optionally its text.
+        :type request: Request
+
+        :return: The name of the page, its content and its vault assets.
+        :rtype: Response
+        """
+        note = request.get("note")
+        if not isinstance(note, str) or not note:
+            raise ValueError("A request needs the path of a note")
+        note = os.path.normpath(os.path.join(self.parser.obsidian_vault_dir, note))
+        self.parser.transcluder.refresh()
+        writer = self.parser.writer
+        # The assets are only recorded, the hugo content directory is left alone.
+        self.parser.writer = PlannedWriter()
+        try:
+            page_bundle_dir, content, assets = self.parser.convert_note(note, request.get("text"))
+        finally:
+            self.parser.writer = writer
+        return {"page": os.path.basename(page_bundle_dir), "content": content, "assets": assets}
+
+    def serve(self, infile: BinaryIO, outfile: BinaryIO) -> None:
+        """
+        Answer the requests read from a stream, until it ends.
+
+        :param infile: The stream to read the requests from, one per line.
+        :type infile: BinaryIO
+        :param outfile: The stream to write the responses to, one per line.
+        :type outfile: BinaryIO
+        """
+        for line in infile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                response = {"error": f"Invalid request: {e}"}
+            else:
+                response = self.handle(request) if isinstance(request, dict) else {"error": "A request must be an object"}
+            outfile.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+            outfile.flush()
+
+    def serve_socket(self, path: str) -> None:
+        """
+        Answer the requests of the clients of a Unix socket, until interrupted.
+
+        The clients are served one at a time, each until it closes its
+        connection.
+
+        :param path: The path of the socket, a stale socket is replaced.
+        :type path: str
+        """
+        if os.path.exists(path):
+            os.remove(path)
+        server = socketserver.UnixStreamServer(path, _ConnectionHandler)
+        server.conversion_server = self
+        logger.info("Listening on `%s`", path)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            os.remove(path)
+
+
+class _ConnectionHandler(socketserver.StreamRequestHandler):
+    """Answer the requests of a client of the socket."""
+
+    def handle(self):
+        """Serve the connection until the client closes it."""
+        self.server.conversion_server.serve(self.rfile, self.wfile)
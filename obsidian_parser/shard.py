@@ -0,0 +1,282 @@
+"""Sharded exports, split over several runners and merged afterwards."""
+import filecmp
+import hashlib
+import json
+import os
+import zlib
+from typing import NamedTuple, Optional, TypedDict
+from obsidian_parser.instrumentation import logger
+from obsidian_parser.manifest import MANIFEST_NAME
+from obsidian_parser.output import ContentWriter
+from obsidian_parser.vaultindex import VaultIndex
+
+
+SHARD_MANIFEST_NAME = ".obsidian-parser-shard.json"
+SHARD_MANIFEST_VERSION = 1
+# The manifests of an export, and those left half written, are not part of the merged content.
+MANIFEST_NAMES = tuple(name + suffix for name in (SHARD_MANIFEST_NAME, MANIFEST_NAME) for suffix in ("", ".tmp"))
+
+
+class Shard(NamedTuple):
+    """
+    A slice of the notes of an export, shard `index` of `count`, counted from 1.
+
+    The notes are assigned to the shards by the CRC-32 of the name of their
+    page bundle, which is the same on every runner and every run. Notes
+    sharing a page bundle end up in the same shard.
+    """
+
+    index: int
+    count: int
+
+    @classmethod
+    def parse(cls, text: str) -> "Shard":
+        """
+        Parse a shard given as ``i/N``.
+
+        :param text: The shard.
+        :type text: str
+
+        :return: The shard.
+        :rtype: Shard
+        """
+        index, separator, count = text.partition("/")
+        try:
+            shard = cls(int(index), int(count))
+        except ValueError:
+            shard = None
+        if not separator or shard is None or not 1 <= shard.index <= shard.count:
+            raise ValueError(f"The shard `{text}` is not i/N, with i from 1 to N")
+        return shard
+
+    def owns(self, page_name: str) -> bool:
+        """Return whether the page bundle of a note is exported by this shard."""
+        return zlib.crc32(page_name.encode("utf-8")) % self.count == self.index - 1
+
+    def __str__(self) -> str:
+        """Return the shard as ``i/N``."""
+        return f"{self.index}/{self.count}"
+
+
+def vault_digest(vault_index: VaultIndex) -> str:
+    """
+    Return a digest of the notes of a vault index.
+
+    Shards exported from different states of the vault, which cannot be
+    merged, have different digests.
+
+    :param vault_index: The index of the exported notes.
+    :type vault_index: VaultIndex
+
+    :return: The hex digest of the paths of the notes.
+    :rtype: str
+    """
+    return hashlib.sha256("\n".join(sorted(vault_index.relpaths.values())).encode("utf-8")).hexdigest()
+
+
+class ShardManifest:
+    """
+    What a shard of an export produced, written into its hugo content directory.
+
+    For every page bundle of the shard the manifest keeps the note it was
+    exported from and the page bundles its links point at, which may belong
+    to other shards. It also lists every file of the shard, relative to its
+    hugo content directory, along with the directories the shard wrote to:
+    the hugo content directory, and the content directories of the export
+    targets and the output directories of the renderers outside of it, which
+    the merge expects in the same place relative to the hugo content
+    directory of each shard.
+
+    :param shard: The shard.
+    :type shard: Shard
+    :param vault: The digest of the notes of the vault, see `vault_digest`.
+    :type vault: str
+    """
+
+    PageRecord = TypedDict("PageRecord", {"note": str, "links": list[str]})
+
+    def __init__(self, shard: Shard, vault: str):
+        """Initialize an empty ShardManifest."""
+        self.shard = shard
+        self.vault = vault
+        self.pages: dict[str, ShardManifest.PageRecord] = {}
+        self.files: list[str] = []
+        self.directories: list[str] = ["."]
+
+    @classmethod
+    def build(cls, shard: Shard, parser, notes: list[str]) -> "ShardManifest":
+        """
+        Record the export of a shard.
+
+        :param shard: The shard.
+        :type shard: Shard
+        :param parser: The parser which exported the shard.
+        :type parser: ObsidianParser
+        :param notes: The File URI's of the notes of the shard.
+        :type notes: list[str]
+
+        :return: The manifest.
+        :rtype: ShardManifest
+        """
+        vault_index = parser.vault_index
+        manifest = cls(shard, vault_digest(vault_index))
+        for note in notes:
+            links = set()
+            for link in vault_index.links.get(note, []):
+                candidates = vault_index.locate(link.partition("#")[0], note)
+                if candidates and candidates[0] != note:
+                    links.add(parser.get_page_name(candidates[0]))
+            manifest.pages[parser.get_page_name(note)] = {
+                "note": os.path.relpath(note, parser.obsidian_vault_dir).replace(os.sep, "/"),
+                "links": sorted(links),
+            }
+        hugo_content_dir = parser.hugo_content_dir
+        output_dirs = parser.get_output_dirs()
+        # Directories within another output directory are listed with it.
+        output_dirs = [
+            directory for directory in output_dirs
+            if not any(directory != other and directory.startswith(other) for other in output_dirs)
+        ]
+        manifest.directories = sorted(
+            os.path.relpath(directory, os.path.abspath(hugo_content_dir)).replace(os.sep, "/") for directory in output_dirs
+        )
+        manifest.files = sorted(
+            file for directory in output_dirs for file in list_files(directory, os.path.abspath(hugo_content_dir))
+        )
+        return manifest
+
+    @classmethod
+    def load(cls, path: str) -> "ShardManifest":
+        """
+        Load the manifest of a shard.
+
+        :param path: The File URI of the manifest.
+        :type path: str
+
+        :return: The manifest.
+        :rtype: ShardManifest
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != SHARD_MANIFEST_VERSION:
+            raise ValueError(f"The shard manifest `{path}` has an unknown version")
+        manifest = cls(Shard(*data["shard"]), data["vault"])
+        manifest.pages = data["pages"]
+        manifest.files = data["files"]
+        manifest.directories = data.get("directories", ["."])
+        return manifest
+
+    def save(self, path: str) -> None:
+        """Write the manifest, atomically, so a shard killed while writing it does not leave a truncated one."""
+        data = {
+            "version": SHARD_MANIFEST_VERSION,
+            "shard": list(self.shard),
+            "vault": self.vault,
+            "pages": self.pages,
+            "files": self.files,
+            "directories": self.directories,
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, path)
+
+
+def list_files(directory: str, root: str = None) -> list[str]:
+    """Return the files below a directory, relative to it or to the root, without the manifests of the export."""
+    files = []
+    for dirpath, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.relpath(os.path.join(dirpath, name), root or directory).replace(os.sep, "/")
+            if path not in MANIFEST_NAMES:
+                files.append(path)
+    return sorted(files)
+
+
+MergeResult = TypedDict("MergeResult", {"pages": int, "files": int, "shared": int, "broken_links": list[tuple[str, str]]})
+
+
+def merge_shards(shard_dirs: list[str], hugo_content_dir: str, writer: Optional[ContentWriter] = None) -> MergeResult:
+    """
+    Merge the hugo content directories of the shards of an export.
+
+    The shards must all be there, and exported from the same notes. A file
+    several shards produced, such as a shared asset, is written once when
+    their copies are the same, and is a conflict otherwise. Links pointing
+    at page bundles no shard produced are reported. Files of the hugo
+    content directory no shard produced are removed. The files the shards
+    wrote outside of their hugo content directories, for export targets and
+    renderers, are merged into the same place relative to the hugo content
+    directory, and those directories are pruned the same way.
+
+    :param shard_dirs: The hugo content directories of the shards.
+    :type shard_dirs: list[str]
+    :param hugo_content_dir: The hugo content directory to merge into.
+    :type hugo_content_dir: str
+    :param writer: The writer to write the merged files with.
+    :type writer: ContentWriter
+
+    :raise ValueError: When shards are missing, exported from different notes
+        or conflict.
+
+    :return: The number of pages, files and files produced by several
+        shards, and the broken links as page, target pairs.
+    :rtype: MergeResult
+    """
+    writer = writer or ContentWriter()
+    manifests = {}
+    for shard_dir in shard_dirs:
+        path = os.path.join(shard_dir, SHARD_MANIFEST_NAME)
+        if not os.path.isfile(path):
+            raise ValueError(f"`{shard_dir}` is not the output of a sharded export, it has no {SHARD_MANIFEST_NAME}")
+        manifests[shard_dir] = ShardManifest.load(path)
+    counts = {manifest.shard.count for manifest in manifests.values()}
+    if len(counts) != 1:
+        raise ValueError(f"The shards are of different exports, split {' and '.join(map(str, sorted(counts)))} ways")
+    count = counts.pop()
+    indexes = sorted(manifest.shard.index for manifest in manifests.values())
+    if indexes != list(range(1, count + 1)):
+        missing = sorted(set(range(1, count + 1)) - set(indexes))
+        repeated = sorted({index for index in indexes if indexes.count(index) > 1})
+        raise ValueError(f"The shards do not add up to {count}, missing {missing}, repeated {repeated}")
+    if len({manifest.vault for manifest in manifests.values()}) != 1:
+        raise ValueError("The shards were exported from different notes")
+
+    sources: dict[str, str] = {}
+    shared = 0
+    conflicts = []
+    for shard_dir, manifest in manifests.items():
+        for file in manifest.files:
+            source = os.path.normpath(os.path.join(shard_dir, file))
+            if file not in sources:
+                sources[file] = source
+            elif filecmp.cmp(sources[file], source, shallow=False):
+                shared += 1
+            else:
+                conflicts.append(file)
+    if conflicts:
+        raise ValueError(f"The shards produced different copies of {', '.join(sorted(set(conflicts)))}")
+
+    pages = {page for manifest in manifests.values() for page in manifest.pages}
+    broken_links = sorted(
+        (page, target)
+        for manifest in manifests.values() for page, record in manifest.pages.items()
+        for target in record["links"] if target not in pages
+    )
+    for page, target in broken_links:
+        logger.warning("Broken link: `%s` links to `%s`, which no shard exported", page, target)
+
+    writer.makedirs(hugo_content_dir)
+    for file, source in sorted(sources.items()):
+        target = os.path.normpath(os.path.join(hugo_content_dir, file))
+        writer.makedirs(os.path.dirname(target))
+        writer.copy_file(source, target)
+    directories = sorted({directory for manifest in manifests.values() for directory in manifest.directories})
+    for directory in directories:
+        for path in writer.prune(os.path.normpath(os.path.join(hugo_content_dir, directory))):
+            logger.debug("  Removed `%s`", path)
+    logger.info(
+        "Merged %d shard(s) into `%s`: %d page(s), %d file(s), %d shared file(s) written once",
+        count, hugo_content_dir, len(pages), len(sources), shared,
+    )
+    return {"pages": len(pages), "files": len(sources), "shared": shared, "broken_links": broken_links}
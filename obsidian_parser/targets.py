@@ -0,0 +1,104 @@
+"""Export targets, routing the notes of a single vault scan to several content directories."""
+import os
+from typing import NamedTuple, Optional
+import yaml
+from obsidian_parser.vaultindex import urlize
+
+
+class ExportTarget(NamedTuple):
+    """
+    A destination of the export, and the notes exported into it.
+
+    The destination is the `section` directory of the `content_dir` of the
+    target, the hugo content directory of the export when the target has
+    none, such as the content directory of another site. The notes are
+    selected by folders of the exported vault folder, a tag and frontmatter
+    fields, like the export filter of a single export. A target without any
+    of them takes every note. The notes are matched against the targets in
+    order, and each note is exported to the first target it matches only.
+
+    Links between the notes of a target stay relative, links to the notes of
+    another target use the `base_url` of that target, by default the path of
+    its section from the root of the site.
+    """
+
+    section: str = ""
+    folders: tuple[str, ...] = ()
+    hashtag: Optional[str] = None
+    fields: Optional[dict] = None
+    content_dir: Optional[str] = None
+    base_url: Optional[str] = None
+
+    @property
+    def url(self) -> str:
+        """The URL the pages of the target are published under, which links from the other targets use."""
+        if self.base_url:
+            return self.base_url.rstrip("/") + "/"
+        return "/" + "".join(urlize(part) + "/" for part in self.section.split("/") if part)
+
+    def output_dir(self, hugo_content_dir: str) -> str:
+        """
+        Return the directory the notes of the target are exported to.
+
+        :param hugo_content_dir: The hugo content directory of the export.
+        :type hugo_content_dir: str
+
+        :return: The directory of the section.
+        :rtype: str
+        """
+        return os.path.normpath(os.path.join(self.content_dir or hugo_content_dir, self.section))
+
+
+def field_value(value) -> Optional[str]:
+    """Return the text a frontmatter field of a target is matched with, YAML booleans as they are indexed."""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def load_targets(path: str) -> list[ExportTarget]:
+    """
+    Load the export targets from a YAML file.
+
+    The file holds a list of targets, each a mapping with the `section`
+    directory, relative to the hugo content directory, or a `content_dir` of
+    its own, relative to the file, or both. A target optionally has the `url`
+    its pages are published under, a `folder` or a list of them, a `tag`, and
+    `where`, a mapping of frontmatter fields to the value they must have,
+    null when any value will do.
+
+    :param path: The File URI of the targets.
+    :type path: str
+
+    :raise ValueError: When the file is not a list of targets.
+
+    :return: The targets, in order.
+    :rtype: list[ExportTarget]
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        entries = yaml.safe_load(f) or []
+    if not isinstance(entries, list):
+        raise ValueError(f"The export targets `{path}` are not a list of targets")
+    targets = []
+    for entry in entries:
+        if not isinstance(entry, dict) or not (entry.get("section") or entry.get("content_dir")):
+            raise ValueError(f"The export targets `{path}` have a target without a section or content directory: {entry!r}")
+        section = os.path.normpath(str(entry.get("section") or ".")).replace(os.sep, "/")
+        if os.path.isabs(section) or section.split("/")[0] == ".." or section == "." and not entry.get("content_dir"):
+            raise ValueError(f"The section `{entry['section']}` is not a directory of the content directory")
+        content_dir = None
+        if entry.get("content_dir"):
+            content_dir = os.path.join(os.path.dirname(os.path.abspath(path)), str(entry["content_dir"]))
+        folders = entry.get("folder") or []
+        where = entry.get("where") or {}
+        targets.append(ExportTarget(
+            section="" if section == "." else section,
+            folders=tuple(str(folder) for folder in ([folders] if isinstance(folders, str) else folders)),
+            hashtag=str(entry["tag"]) if entry.get("tag") else None,
+            fields={str(key): field_value(value) for key, value in where.items()} or None,
+            content_dir=content_dir,
+            base_url=str(entry["url"]) if entry.get("url") else None,
+        ))
+    return targets
@@ -0,0 +1,121 @@
+"""Single pass tokenizer for the links, embeds and hashtags of a note."""
+import re
+from typing import NamedTuple, Optional
+
+
+CODE = "code"
+EMBED = "embed"
+IMAGE = "image"
+WIKI_LINK = "wikilink"
+HASHTAG = "hashtag"
+HEADING = "heading"
+
+# One alternation walks the note once. Code is matched first so that the
+# links and hashtags inside fenced blocks and inline code are left alone.
+# A heading only consumes its `#` marks, its text is captured by lookahead so
+# the links and hashtags within the heading are still found.
+TOKEN_REGEX = re.compile(
+    r"(?P<fence>^[ ]{0,3}(?P<fence_mark>`{3,}|~{3,})[^\n]*(?:\n|\Z)"
+    r"(?s:.*?)(?:^[ ]{0,3}(?P=fence_mark)[ \t]*$|\Z))"
+    r"|(?P<inline_code>(?P<ticks>`+)(?!`)[^\n]*?(?<!`)(?P=ticks)(?!`))"
+    r"|!\[\[(?P<embed>.*?)\]\]"
+    r"|!\[(?P<image_alt>[^\]\n]*)\]\((?P<image_src>[^)\n]*)\)"
+    r"|\[\[(?P<wikilink>.*?)\]\]"
+    r"|^(?P<heading_marks>#{1,6})[ \t]+(?=(?P<heading>[^\n]*?)[ \t]*#*[ \t]*$)"
+    r"|(?<![\w&#])#(?P<hashtag>\w+)",
+    re.MULTILINE,
+)
+
+
+class Span(NamedTuple):
+    """
+    A token found in the text of a note.
+
+    For wiki links and embeds the target, heading and alias are parsed from
+    ``[[target#heading|alias]]``. Markdown images carry the image source as
+    target and the alt text as alias, hashtags the tag name as target.
+    Headings span their `#` marks only and carry their text as heading.
+    """
+
+    start: int
+    end: int
+    kind: str
+    source: str
+    target: str = ""
+    heading: Optional[str] = None
+    alias: Optional[str] = None
+
+    @property
+    def link(self) -> str:
+        """The link of a wiki link or embed, without the alias."""
+        if self.heading is None:
+            return self.target
+        return f"{self.target}#{self.heading}"
+
+
+def _split_wiki_link(inner: str) -> tuple[str, Optional[str], Optional[str]]:
+    """Split the inner text of a wiki link into target, heading and alias."""
+    alias = None
+    if "|" in inner:
+        inner, alias = inner.split("|", 1)
+    heading = None
+    if "#" in inner:
+        inner, heading = inner.split("#", 1)
+    return inner, heading, alias
+
+
+def tokenize(text: str) -> list[Span]:
+    """
+    Walk the text of a note once and return its tokens in document order.
+
+    :param text: The text of the note.
+    :type text: str
+
+    :return: The code, link, embed, image, heading and hashtag spans of the
+        text.
+    :rtype: list[Span]
+    """
+    spans = []
+    for match in TOKEN_REGEX.finditer(text):
+        kind = match.lastgroup
+        start, end = match.span()
+        if kind in ("fence", "inline_code"):
+            spans.append(Span(start, end, CODE, match.group()))
+        elif kind == "embed" or kind == "wikilink":
+            target, heading, alias = _split_wiki_link(match.group(kind))
+            spans.append(Span(
+                start, end, EMBED if kind == "embed" else WIKI_LINK, match.group(),
+                target, heading, alias,
+            ))
+        elif kind == "heading":
+            spans.append(Span(start, end, HEADING, match.group(), "", match.group("heading")))
+        elif kind == "image_src":
+            spans.append(Span(
+                start, end, IMAGE, match.group(),
+                match.group("image_src"), None, match.group("image_alt"),
+            ))
+        else:
+            spans.append(Span(start, end, HASHTAG, match.group(), match.group("hashtag")))
+    return spans
+
+
+def splice(text: str, replacements: list[tuple[Span, str]]) -> str:
+    """
+    Replace spans of a text in a single output pass.
+
+    :param text: The text the spans were found in.
+    :type text: str
+    :param replacements: The spans to replace with their replacement text.
+    :type replacements: list[tuple[Span, str]]
+
+    :return: The text with the spans replaced.
+    :rtype: str
+    """
+    parts = []
+    position = 0
+    for span, replacement in sorted(replacements, key=lambda item: item[0].start):
+        parts.append(text[position:span.start])
+        parts.append(replacement)
+        position = span.end
+    parts.append(text[position:])
+    return "".join(parts)
@@ -0,0 +1,338 @@
+"""Expansion of the notes and sections embedded into notes, `![[Note#Section]]`."""
+import hashlib
+import os
+import re
+import threading
+from typing import Callable, Iterable, Optional
+from obsidian_parser.instrumentation import logger
+from obsidian_parser.metadata import split_frontmatter
+from obsidian_parser.scanner import VaultScanner
+from obsidian_parser.tokenizer import EMBED, HEADING, Span, splice, tokenize
+from obsidian_parser.vaultindex import VaultIndex, link_name, slugify
+
+
+# Embeds of targets with these extensions are notes, the others are assets.
+NOTE_EXTENSIONS = ("", ".md")
+
+EMPTY_METADATA = {"frontmatter": {}, "tags": [], "links": [], "assets": [], "headings": []}
+
+
+def is_note_target(target: str) -> bool:
+    """
+    Return whether an embed target names a note rather than an asset.
+
+    :param target: The embed target, without heading.
+    :type target: str
+
+    :return: Whether the target is a note.
+    :rtype: bool
+    """
+    return os.path.splitext(target)[1].lower() in NOTE_EXTENSIONS
+
+
+def find_section(body: str, heading: str) -> Optional[str]:
+    """
+    Return a section of a note, from its heading up to the next heading of the same or a higher level.
+
+    A block reference, `^block`, returns the paragraph ending with that
+    block id, without the id.
+
+    :param body: The body of the note.
+    :type body: str
+    :param heading: The heading of the section, `Chapter#Section` for
+        nested headings, or the block reference.
+    :type heading: str
+
+    :return: The section, or None when the note has no such section.
+    :rtype: str
+    """
+    heading = heading.rsplit("#", 1)[-1]
+    if heading.startswith("^"):
+        match = re.search(rf"[ \t]+\^{re.escape(heading[1:])}[ \t]*$", body, re.MULTILINE)
+        if match is None:
+            return None
+        start = body.rfind("\n\n", 0, match.start())
+        return body[start + 2 if start >= 0 else 0:match.start()]
+    anchor = slugify(heading)
+    start = level = None
+    for span in tokenize(body):
+        if span.kind != HEADING:
+            continue
+        span_level = len(span.source.strip())
+        if level is None:
+            if slugify(span.heading) == anchor:
+                start, level = span.start, span_level
+        elif span_level <= level:
+            return body[start:span.start]
+    return body[start:] if level is not None else None
+
+
+class Transcluder:
+    """
+    Expand the notes and sections a note embeds, the way Obsidian shows them.
+
+    Embedded notes are found like wiki links are, among the exported notes
+    first and then among all notes of the vault, so shared snippets do not
+    need to be exported themselves. The rendered body of each note and
+    section is kept for the rest of the run, so a snippet embedded by
+    hundreds of notes is read and expanded once. An embed which would embed
+    itself, directly or through other embeds, is cut and left as a wiki link.
+
+    :param vault_index: The index of the exported notes.
+    :type vault_index: VaultIndex
+    :param scanner: The scanner to find the other notes of the vault with.
+    :type scanner: VaultScanner
+    :param read: Returns the content of a note.
+    :type read: Callable[[str], str]
+    """
+
+    def __init__(self, vault_index: VaultIndex, scanner: VaultScanner, read: Callable[[str], str]):
+        """Initialize Transcluder."""
+        self.vault_index = vault_index
+        self.scanner = scanner
+        self.read = read
+        self.rendered: dict[tuple[str, Optional[str]], Optional[str]] = {}
+        self.contents: dict[str, str] = {}
+        self.mtimes: dict[str, int] = {}
+        self.embedders: dict[str, set[str]] = {}
+        self._vault_notes = None
+        self._lock = threading.Lock()
+
+    def expand(self, note_content: str, note: str = None, spans: list[Span] = None) -> Optional[str]:
+        """
+        Replace the notes and sections a note embeds with their content.
+
+        :param note_content: The content of the note.
+        :type note_content: str
+        :param note: The File URI of the note.
+        :type note: str
+        :param spans: The tokens of the note, when tokenized already.
+        :type spans: list[Span]
+
+        :return: The expanded content, or None when the note embeds no notes.
+        :rtype: str
+        """
+        spans = tokenize(note_content) if spans is None else spans
+        replacements, _ = self._expand(spans, ((note, None),))
+        if not replacements:
+            return None
+        return splice(note_content, replacements)
+
+    def render(self, note: str, heading: Optional[str], stack: tuple) -> tuple[Optional[str], bool]:
+        """
+        Return the body of a note or one of its sections, with its own embeds expanded.
+
+        :param note: The File URI of the note.
+        :type note: str
+        :param heading: The heading of the section, or None for the whole note.
+        :type heading: Optional[str]
+        :param stack: The notes and sections being expanded, outermost first.
+        :type stack: tuple
+
+        :return: The rendered body, or None when the section does not exist,
+            and whether an embed cycle was cut while rendering it.
+        :rtype: tuple[Optional[str], bool]
+        """
+        key = (note, heading)
+        with self._lock:
+            if key in self.rendered:
+                return self.rendered[key], False
+        logger.debug("    Embedding `%s`", note if heading is None else f"{note}#{heading}")
+        content = self.content(note)
+        body = content[split_frontmatter(content)[1]:]
+        if heading is not None:
+            body = find_section(body, heading)
+            if body is None:
+                with self._lock:
+                    self.rendered[key] = None
+                return None, False
+        replacements, cut = self._expand(tokenize(body), stack)
+        rendered = splice(body, replacements).strip("\n")
+        # What was rendered with a cycle cut depends on where the cycle was entered.
+        if not cut:
+            with self._lock:
+                self.rendered[key] = rendered
+        return rendered, cut
+
+    def locate(self, target: str, source: Optional[str]) -> Optional[str]:
+        """
+        Return the note an embed target refers to.
+
+        :param target: The embed target, without heading.
+        :type target: str
+        :param source: The File URI of the embedding note.
+        :type source: str
+
+        :return: The File URI of the note, or None when there is none.
+        :rtype: str
+        """
+        candidates = self.vault_index.locate(target, source)
+        if not candidates and target.strip():
+            candidates = self.vault_notes().locate(target, source)
+        return candidates[0] if candidates else None
+
+    def vault_notes(self) -> VaultIndex:
+        """Return an index of every note of the vault by path and name, built when first needed."""
+        with self._lock:
+            if self._vault_notes is None:
+                index = VaultIndex(self.vault_index.obsidian_vault_dir, self.vault_index.vault_content_dir)
+                for entry in self.scanner.scan(self.vault_index.obsidian_vault_dir):
+                    index.add_metadata(entry.path, EMPTY_METADATA, "")
+                self._vault_notes = index
+            return self._vault_notes
+
+    def content(self, note: str) -> str:
+        """Return the content of a note, reading it once per run."""
+        with self._lock:
+            content = self.contents.get(note)
+        if content is None:
+            mtime = os.stat(note).st_mtime_ns
+            content = self.read(note)
+            with self._lock:
+                self.contents[note] = content
+                self.mtimes[note] = mtime
+        return content
+
+    def refresh(self) -> None:
+        """Forget the contents of the notes which changed since they were read, and everything rendered from them."""
+        with self._lock:
+            notes = list(self.mtimes.items())
+        changed = []
+        for note, mtime in notes:
+            try:
+                if os.stat(note).st_mtime_ns == mtime:
+                    continue
+            except OSError:
+                pass
+            changed.append(note)
+        if changed:
+            with self._lock:
+                self.rendered.clear()
+                for note in changed:
+                    self.contents.pop(note, None)
+                    del self.mtimes[note]
+
+    def signature(self, note: str) -> str:
+        """
+        Return a digest of the notes a note embeds, directly or through other embeds.
+
+        The digest changes when one of the embedded notes changes, so the
+        embedding note is exported again by an incremental run.
+
+        :param note: The File URI of the note.
+        :type note: str
+
+        :return: The hex digest, or an empty string when the note embeds no notes.
+        :rtype: str
+        """
+        embedded = set()
+        pending = [note]
+        while pending:
+            source = pending.pop()
+            for target in self.embedded_notes(source):
+                if target not in embedded:
+                    embedded.add(target)
+                    pending.append(target)
+        if not embedded:
+            return ""
+        digest = hashlib.sha256()
+        for path in sorted(embedded):
+            stat = os.stat(path)
+            digest.update(f"{path}\0{stat.st_mtime_ns}\0{stat.st_size}\n".encode())
+        return digest.hexdigest()
+
+    def embedded_notes(self, note: str) -> list[str]:
+        """Return the notes a note embeds directly."""
+        if note in self.vault_index.assets:
+            links = self.vault_index.assets[note]
+        else:
+            links = [span.link for span in tokenize(self.content(note)) if span.kind == EMBED]
+        notes = []
+        for link in links:
+            target = link.partition("#")[0]
+            with self._lock:
+                self.embedders.setdefault(link_name(target), set()).add(note)
+            if self.embeds_note(target, note):
+                located = self.locate(target, note)
+                if located is not None:
+                    notes.append(located)
+        return notes
+
+    def embedding_notes(self, names: Iterable[str]) -> set[str]:
+        """
+        Return the notes embedding any of the given names, as far as their signatures were taken.
+
+        :param names: The names of notes, as :func:`link_name` returns them.
+        :type names: Iterable[str]
+
+        :return: The File URI's of the embedding notes, the exported ones and
+            the other notes of the vault.
+        :rtype: set[str]
+        """
+        with self._lock:
+            return {note for name in names for note in self.embedders.get(name, ())}
+
+    def forget(self, paths: Iterable[str]) -> set[str]:
+        """
+        Forget what was read of notes of the vault which changed, were added or deleted.
+
+        Everything rendered so far is dropped as well, as it may embed them.
+
+        :param paths: The File URI's of the notes, as a scan of the vault
+            names them, and of the directories which were added or deleted.
+        :type paths: Iterable[str]
+
+        :return: The File URI's of the notes of the vault which were deleted,
+            as far as they were indexed.
+        :rtype: set[str]
+        """
+        paths = list(paths)
+        files = [path for path in paths if os.path.isfile(path)]
+        changed = {os.path.normpath(path) for path in files}
+        # The deleted notes, and the notes of the directories, are matched by their path.
+        prefixes = tuple(os.path.normpath(path) + os.sep for path in paths if not os.path.isfile(path))
+        deleted = set()
+        with self._lock:
+            self.rendered.clear()
+            for note in list(self.contents):
+                path = os.path.normpath(note)
+                if path in changed or (path + os.sep).startswith(prefixes):
+                    del self.contents[note]
+            if self._vault_notes is not None:
+                for note in [note for note in self._vault_notes.relpaths if (os.path.normpath(note) + os.sep).startswith(prefixes)]:
+                    self._vault_notes.remove_note(note)
+                    deleted.add(note)
+                for note in files:
+                    self._vault_notes.remove_note(note)
+                    self._vault_notes.add_metadata(note, EMPTY_METADATA, "")
+        return {note for note in deleted if not os.path.isfile(note)}
+
+    def embeds_note(self, target: str, source: Optional[str]) -> bool:
+        """Return whether an embed target is a note, by its extension or because it is an exported note."""
+        return is_note_target(target) or bool(self.vault_index.locate(target, source))
+
+    def _expand(self, spans: list[Span], stack: tuple) -> tuple[list[tuple[Span, str]], bool]:
+        """Return the replacement of each note embed of a note or section, and whether a cycle was cut."""
+        source = stack[-1][0]
+        replacements = []
+        cut = False
+        for span in spans:
+            if span.kind != EMBED:
+                continue
+            if not self.embeds_note(span.target, source):
+                continue
+            note = self.locate(span.target, source)
+            key = (note, span.heading)
+            if note is None:
+                # Leave it to the link rewriting to report.
+                replacements.append((span, span.source[1:]))
+                continue
+            if key in stack:
+                logger.warning("    Embed cycle cut at `%s` in `%s`", span.link, source)
+                replacements.append((span, span.source[1:]))
+                cut = True
+                continue
+            rendered, inner_cut = self.render(note, span.heading, stack + (key,))
+            cut = cut or inner_cut
+            replacements.append((span, span.source[1:] if rendered is None else rendered))
+        return replacements, cut
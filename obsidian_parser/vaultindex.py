@@ -0,0 +1,340 @@
+"""Vault wide index resolving wiki link targets to Hugo bundle URLs."""
+import hashlib
+import os
+import re
+from typing import Iterable, Optional
+from urllib.parse import unquote
+from obsidian_parser.instrumentation import logger
+from obsidian_parser.metadata import NoteMetadata, scan_note
+
+
+HEADING_SLUG_REGEX = re.compile(r"[^\w\- ]")
+URL_PATH_REGEX = re.compile(r"[^\w\-./]")
+INDEX_FRONTMATTER_KEYS = ("aliases", "url", "slug")
+
+
+def slugify(heading: str) -> str:
+    """
+    Return the anchor Hugo generates for a heading.
+
+    :param heading: The text of the heading.
+    :type heading: str
+
+    :return: The heading anchor.
+    :rtype: str
+    """
+    return HEADING_SLUG_REGEX.sub("", heading.strip().lower()).replace(" ", "-")
+
+
+def urlize(name: str) -> str:
+    """
+    Return the URL path Hugo generates for a page bundle name.
+
+    :param name: The name of the page bundle.
+    :type name: str
+
+    :return: The URL path segment.
+    :rtype: str
+    """
+    return URL_PATH_REGEX.sub("", re.sub(r"\s+", "-", name.strip().lower()))
+
+
+def link_name(target: str) -> str:
+    """
+    Return the name a link or embed target looks a note or attachment up by.
+
+    That is the last part of its path, lower cased and URL decoded, without
+    the heading and the `.md` extension, so it matches the name of a note or
+    attachment file the same way.
+
+    :param target: The target of the link or embed, or the name of a file.
+    :type target: str
+
+    :return: The name.
+    :rtype: str
+    """
+    target = unquote(target.partition("#")[0]).strip().replace("\\", "/").lower()
+    name = target.rsplit("/", 1)[-1] if not target.endswith("/") else "_index"
+    return name[:-3] if name.endswith(".md") else name
+
+
+class VaultIndex:
+    """
+    Index of the notes of a vault, used to resolve wiki links the way Obsidian does.
+
+    Notes are found by their path relative to the vault or the exported
+    folder, by their basename when that is unique (the shortest path
+    otherwise), and by the `aliases` of their frontmatter. All lookups are
+    dictionary lookups, the vault is only read while the index is built.
+
+    Targets which cannot be resolved, and names shared by several notes, are
+    collected while links are resolved so they can be reported in bulk.
+
+    :param obsidian_vault_dir: The Obsidian vault directory.
+    :type obsidian_vault_dir: str
+    :param vault_content_dir: The vault folder the notes are exported from.
+    :type vault_content_dir: str
+    :param frontmatter_keys: The frontmatter keys which make the index parse
+        the YAML header of a note.
+    :type frontmatter_keys: tuple[str, ...]
+    """
+
+    def __init__(self, obsidian_vault_dir: str, vault_content_dir: str, frontmatter_keys: tuple[str, ...] = INDEX_FRONTMATTER_KEYS):
+        """Initialize an empty VaultIndex."""
+        self.obsidian_vault_dir = obsidian_vault_dir
+        self.vault_content_dir = vault_content_dir
+        self.frontmatter_keys = frontmatter_keys
+        self.paths: dict[str, str] = {}
+        self.names: dict[str, list[str]] = {}
+        self.aliases: dict[str, list[str]] = {}
+        self.relpaths: dict[str, str] = {}
+        self.urls: dict[str, str] = {}
+        self.sections: dict[str, str] = {}
+        self.headings: dict[str, set[str]] = {}
+        self.links: dict[str, list[str]] = {}
+        self.assets: dict[str, list[str]] = {}
+        self.tags: dict[str, list[str]] = {}
+        self.note_aliases: dict[str, list[str]] = {}
+        self.linkers: dict[str, set[str]] = {}
+        self.unresolved: dict[str, set[str]] = {}
+        self.ambiguous: dict[str, list[str]] = {}
+
+    def add_note(self, note: str, note_content: str, bundle_dir: str, section: Optional[str] = None) -> None:
+        """
+        Add a note to the index.
+
+        Only the frontmatter keys the index needs are looked for, notes
+        without them are not YAML parsed.
+
+        :param note: The File URI of the note.
+        :type note: str
+        :param note_content: The content of the note.
+        :type note_content: str
+        :param bundle_dir: The page bundle directory the note is exported to.
+        :type bundle_dir: str
+        :param section: The URL path of the section the note is exported to,
+            when the notes are exported to several sections.
+        :type section: str
+        """
+        self.add_metadata(note, scan_note(note_content, self.frontmatter_keys), bundle_dir, section)
+
+    def add_metadata(self, note: str, metadata: NoteMetadata, bundle_dir: str, section: Optional[str] = None) -> None:
+        """
+        Add a note to the index from its extracted metadata.
+
+        :param note: The File URI of the note.
+        :type note: str
+        :param metadata: The metadata of the note.
+        :type metadata: NoteMetadata
+        :param bundle_dir: The page bundle directory the note is exported to.
+        :type bundle_dir: str
+        :param section: The URL path of the section the note is exported to,
+            when the notes are exported to several sections.
+        :type section: str
+        """
+        relpath = os.path.relpath(note, self.obsidian_vault_dir).replace(os.sep, "/")
+        key = relpath.rsplit(".", 1)[0].lower()
+        self.relpaths[note] = key
+        self.paths[key] = note
+        content_prefix = self.vault_content_dir.strip("/").lower() + "/"
+        if key.startswith(content_prefix):
+            self.paths.setdefault(key[len(content_prefix):], note)
+        self.names.setdefault(key.rsplit("/", 1)[-1], []).append(note)
+
+        frontmatter = metadata["frontmatter"]
+        aliases = frontmatter.get("aliases") or []
+        self.note_aliases[note] = [str(alias).lower() for alias in ([aliases] if isinstance(aliases, str) else aliases)]
+        for alias in self.note_aliases[note]:
+            self.aliases.setdefault(alias, []).append(note)
+        if frontmatter.get("url"):
+            self.urls[note] = str(frontmatter["url"])
+        else:
+            self.urls[note] = f"../{urlize(str(frontmatter.get('slug') or os.path.basename(bundle_dir)))}/"
+        if section is not None:
+            self.sections[note] = section
+
+        self.headings[note] = {slugify(heading) for heading in metadata["headings"]}
+        self.links[note] = metadata["links"]
+        self.assets[note] = metadata["assets"]
+        self.tags[note] = metadata["tags"]
+        for link in self.links[note] + self.assets[note]:
+            self.linkers.setdefault(link_name(link), set()).add(note)
+
+    def remove_note(self, note: str) -> None:
+        """
+        Remove a note from the index, so it can be added again once it changed.
+
+        :param note: The File URI of the note.
+        :type note: str
+        """
+        key = self.relpaths.pop(note, None)
+        if key is None:
+            return
+        content_prefix = self.vault_content_dir.strip("/").lower() + "/"
+        for path in (key, key[len(content_prefix):] if key.startswith(content_prefix) else None):
+            if path is not None and self.paths.get(path) == note:
+                del self.paths[path]
+        for table, name in [(self.names, key.rsplit("/", 1)[-1])] + [(self.aliases, alias) for alias in self.note_aliases.pop(note)]:
+            notes = table.get(name, [])
+            if note in notes:
+                notes.remove(note)
+            if not notes:
+                table.pop(name, None)
+        for link in self.links.pop(note) + self.assets.pop(note):
+            self.linkers.get(link_name(link), set()).discard(note)
+        for table in (self.urls, self.sections, self.headings, self.tags):
+            table.pop(note, None)
+
+    def get_names(self, note: str) -> list[str]:
+        """
+        Return the names a note is linked by, its name and its aliases.
+
+        :param note: The File URI of the note.
+        :type note: str
+
+        :return: The names, as :func:`link_name` returns them for the links.
+        :rtype: list[str]
+        """
+        if note not in self.relpaths:
+            return [link_name(os.path.basename(note))]
+        return [self.relpaths[note].rsplit("/", 1)[-1]] + [link_name(alias) for alias in self.note_aliases[note]]
+
+    def linking_notes(self, names: Iterable[str]) -> set[str]:
+        """
+        Return the notes linking to or embedding any of the given names.
+
+        :param names: The names of notes and attachments, as :func:`link_name`
+            returns them.
+        :type names: Iterable[str]
+
+        :return: The File URI's of the notes.
+        :rtype: set[str]
+        """
+        return {note for name in names for note in self.linkers.get(name, ())}
+
+    def reset_report(self) -> None:
+        """Forget the unresolved and ambiguous links found so far, so the next report only has the new ones."""
+        self.unresolved.clear()
+        self.ambiguous.clear()
+
+    def locate(self, target: str, source: Optional[str] = None) -> list[str]:
+        """
+        Return the notes a link target may refer to, the best match first.
+
+        :param target: The link target, without heading.
+        :type target: str
+        :param source: The File URI of the linking note.
+        :type source: str
+
+        :return: The File URI's of the matching notes.
+        :rtype: list[str]
+        """
+        target = target.strip().lower()
+        if not target:
+            return [source] if source else []
+        if target.endswith(".md"):
+            target = target[:-3]
+        if target.endswith("/"):
+            target += "_index"
+        if target in self.paths:
+            return [self.paths[target]]
+        candidates = self.names.get(target.rsplit("/", 1)[-1], [])
+        if "/" in target:
+            candidates = [note for note in candidates if self.relpaths[note].endswith("/" + target)]
+        if not candidates:
+            candidates = self.aliases.get(target, [])
+        if len(candidates) > 1:
+            # Like Obsidian, prefer the note closest to the linking note, then the shortest path.
+            source_dir = os.path.dirname(self.relpaths.get(source, ""))
+            candidates = sorted(candidates, key=lambda note: (
+                -len(os.path.commonpath([source_dir, os.path.dirname(self.relpaths[note])]) or ""),
+                len(self.relpaths[note]),
+                self.relpaths[note],
+            ))
+        return candidates
+
+    def resolve(self, link: str, source: Optional[str] = None) -> Optional[str]:
+        """
+        Resolve a wiki link to the URL of the page bundle it refers to.
+
+        :param link: The link, with an optional heading.
+        :type link: str
+        :param source: The File URI of the linking note.
+        :type source: str
+
+        :return: The URL of the bundle and heading anchor, or None when the
+            link cannot be resolved.
+        :rtype: str
+        """
+        target, _, heading = link.partition("#")
+        candidates = self.locate(target, source)
+        if not candidates:
+            self.unresolved.setdefault(link, set()).add(source or "")
+            return None
+        if len(candidates) > 1:
+            self.ambiguous[target] = candidates
+        note = candidates[0]
+        url = "" if note == source else self.page_url(note, source)
+        # Obsidian allows nested headings, `Note#Chapter#Section`. Block
+        # references, `Note#^block`, have no anchor in Hugo.
+        heading = heading.rsplit("#", 1)[-1]
+        if heading and not heading.startswith("^"):
+            anchor = slugify(heading)
+            if anchor not in self.headings.get(note, ()):
+                self.unresolved.setdefault(link, set()).add(source or "")
+            url += f"#{anchor}"
+        # A link to the note itself without an anchor points at its own page.
+        return url or "./"
+
+    def page_url(self, note: str, source: Optional[str] = None) -> str:
+        """
+        Return the URL of the page of a note, as linked from another note.
+
+        Pages of the same section are linked relative to each other, pages of
+        another section by their path from the root of the site.
+
+        :param note: The File URI of the note.
+        :type note: str
+        :param source: The File URI of the linking note.
+        :type source: str
+
+        :return: The URL of the page.
+        :rtype: str
+        """
+        url = self.urls[note]
+        section = self.sections.get(note)
+        if section is not None and section != self.sections.get(source) and url.startswith("../"):
+            url = section + url[3:]
+        return url
+
+    def link_signature(self, note: str) -> str:
+        """
+        Return a digest of where the links of a note resolve to.
+
+        The digest changes when a note the links resolve to is renamed, moved,
+        deleted or added, even though the linking note itself did not change.
+
+        :param note: The File URI of the note.
+        :type note: str
+
+        :return: The hex digest of the link resolutions.
+        :rtype: str
+        """
+        digest = hashlib.sha256()
+        for link in self.links.get(note, []):
+            candidates = self.locate(link.partition("#")[0], note)
+            digest.update(f"{link}\0{self.page_url(candidates[0], note) if candidates else ''}\n".encode())
+        return digest.hexdigest()
+
+    def report(self) -> None:
+        """Log the unresolved and ambiguous link targets."""
+        if self.unresolved:
+            logger.warning("Unresolved links (%d):", len(self.unresolved))
+            for link, sources in sorted(self.unresolved.items()):
+                notes = ", ".join(sorted(self.relpaths.get(source, source) for source in sources))
+                logger.warning("  `%s` in %s", link, notes)
+        if self.ambiguous:
+            logger.warning("Ambiguous links (%d):", len(self.ambiguous))
+            for target, candidates in sorted(self.ambiguous.items()):
+                notes = ", ".join(self.relpaths[note] for note in candidates)
+                logger.warning("  `%s` matches %s, using the first", target, notes)
@@ -0,0 +1,223 @@
+"""Watch an Obsidian vault for changes."""
+import ctypes
+import errno
+import os
+import select
+import struct
+import sys
+import time
+from typing import Iterator, Optional, Union
+from obsidian_parser.scanner import VaultScanner
+
+
+# inotify event masks, see inotify(7).
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+    | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_ONLYDIR
+)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class PollingBackend:
+    """
+    Detect changes by comparing the size and mtime of the files of a directory tree.
+
+    :param watcher: The watcher the backend reports to.
+    :type watcher: VaultWatcher
+    """
+
+    def __init__(self, watcher: "VaultWatcher"):
+        """Initialize PollingBackend."""
+        self.watcher = watcher
+        self.snapshot = self.scan()
+
+    def scan(self) -> dict[str, tuple[int, int]]:
+        """Return the size and mtime of each file of the watched tree."""
+        snapshot = {}
+        for root, dirs, files in os.walk(self.watcher.path):
+            dirs[:] = [name for name in dirs if not self.watcher.ignored(os.path.join(root, name), True)]
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                snapshot[path] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def read(self, timeout: float) -> set[str]:
+        """Wait for the next poll, at least timeout seconds, and return the files which changed."""
+        time.sleep(max(timeout, self.watcher.interval))
+        snapshot = self.scan()
+        changes = {
+            path for path in snapshot.keys() | self.snapshot.keys()
+            if snapshot.get(path) != self.snapshot.get(path)
+        }
+        self.snapshot = snapshot
+        return changes
+
+    def close(self) -> None:
+        """Release the backend."""
+
+
+class InotifyBackend:
+    """
+    Detect changes with the Linux inotify API.
+
+    Each directory of the watched tree gets a watch, directories created
+    later on are watched as they appear.
+
+    :param watcher: The watcher the backend reports to.
+    :type watcher: VaultWatcher
+    """
+
+    def __init__(self, watcher: "VaultWatcher"):
+        """Initialize InotifyBackend."""
+        if not sys.platform.startswith("linux"):
+            raise OSError(errno.ENOSYS, "inotify is only available on Linux")
+        # Imported here, it imports subprocess, which is slow to import.
+        import ctypes.util
+        self.watcher = watcher
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs: dict[int, str] = {}
+        self.add_tree(watcher.path)
+
+    def add_tree(self, path: str) -> set[str]:
+        """Watch a directory and its subdirectories, and return the files in them."""
+        files = set()
+        for root, dirs, names in os.walk(path):
+            dirs[:] = [name for name in dirs if not self.watcher.ignored(os.path.join(root, name), True)]
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(root), WATCH_MASK)
+            if wd < 0:
+                error = ctypes.get_errno()
+                if error == errno.ENOSPC:
+                    raise OSError(error, "the inotify watch limit is reached")
+                continue
+            self.dirs[wd] = root
+            files.update(os.path.join(root, name) for name in names)
+        return files
+
+    def read(self, timeout: float) -> set[str]:
+        """Wait at most timeout seconds and return the files which changed."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        data = os.read(self.fd, 1 << 16)
+        changes = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            name = os.fsdecode(data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0"))
+            offset += EVENT_HEADER.size + length
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped, report the whole tree as changed.
+                changes.add(self.watcher.path)
+                continue
+            if mask & IN_IGNORED:
+                self.dirs.pop(wd, None)
+                continue
+            if wd not in self.dirs:
+                continue
+            path = os.path.join(self.dirs[wd], name) if name else self.dirs[wd]
+            if self.watcher.ignored(path, bool(mask & IN_ISDIR)):
+                continue
+            changes.add(path)
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                # Files may be written before the new directory is watched.
+                changes.update(self.add_tree(path))
+        return changes
+
+    def close(self) -> None:
+        """Release the inotify instance."""
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class VaultWatcher:
+    """
+    Watch a vault and yield the files which changed, in debounced batches.
+
+    inotify is used where it is available, other platforms fall back to
+    polling. A batch is only yielded once no further change arrived for the
+    debounce period, so an editor saving a burst of files triggers one export.
+
+    :param path: The directory to watch.
+    :type path: str
+    :param debounce: Seconds without changes before a batch is yielded.
+    :type debounce: float
+    :param interval: Seconds between polls of the polling fallback.
+    :type interval: float
+    :param exclude: Directories within the watched directory to ignore, such
+        as an export target inside the vault.
+    :type exclude: list[str]
+    :param polling: Whether to poll even when inotify is available.
+    :type polling: bool
+    :param scanner: The scanner whose ignore rules apply to the changes.
+    :type scanner: VaultScanner
+    """
+
+    def __init__(self, path: str, debounce: float = 0.2, interval: float = 1.0, exclude: list[str] = None, polling: bool = False, scanner: VaultScanner = None):
+        """Initialize VaultWatcher."""
+        self.path = os.path.abspath(path)
+        self.debounce = debounce
+        self.interval = interval
+        self.exclude = [os.path.abspath(directory) for directory in exclude or []]
+        self.scanner = scanner or VaultScanner(path)
+        self.closed = False
+        self._iterating = False
+        self.backend: Optional[Union[PollingBackend, InotifyBackend]] = None
+        if not polling:
+            try:
+                self.backend = InotifyBackend(self)
+            except (OSError, AttributeError):
+                self.backend = None
+        if self.backend is None:
+            self.backend = PollingBackend(self)
+
+    def ignored(self, path: str, is_dir: bool = False) -> bool:
+        """Whether changes to a path are ignored."""
+        path = os.path.abspath(path)
+        if any(path == directory or path.startswith(directory + os.sep) for directory in self.exclude):
+            return True
+        return self.scanner.ignored(path, is_dir)
+
+    def __iter__(self) -> Iterator[set[str]]:
+        """Yield the batches of changed files until the watcher is closed."""
+        self._iterating = True
+        try:
+            while not self.closed:
+                changes = self.backend.read(0.5)
+                if not changes:
+                    continue
+                while not self.closed:
+                    more = self.backend.read(self.debounce)
+                    if not more:
+                        break
+                    changes |= more
+                if not self.closed:
+                    yield changes
+        finally:
+            self._iterating = False
+            self.backend.close()
+
+    def close(self) -> None:
+        """Stop watching, an ongoing iteration ends at its next wait."""
+        self.closed = True
+        if not self._iterating:
+            self.backend.close()
@@ -1,6 +1,5 @@
 """Wiki Link Parser"""
-import re
-from typing import TypedDict
+from obsidian_parser.tokenizer import HASHTAG, tokenize
 
 
 class WikiParser:
@@ -10,6 +9,4 @@ class WikiParser:
     @staticmethod
     def get_note_hashtags(text: str) -> list[str]:
         """Get all hashtags from the given text and return a list of them."""
-        hashtag_regex = r"#(\w+)"
-        hashtag_list = re.findall(hashtag_regex, text)
-        return hashtag_list
\ No newline at end of file
+        return [span.target for span in tokenize(text) if span.kind == HASHTAG]
\ No newline at end of file
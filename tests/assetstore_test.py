@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+from obsidian_parser.assetstore import AssetStore
+
+
+class AssetStoreTestCase(unittest.TestCase):
+    """Test placing vault assets into page bundles."""
+
+    def setUp(self):
+        """Set up an asset and two page bundles."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.asset = os.path.join(self.tmp.name, "Logo.PNG")
+        with open(self.asset, "wb") as f:
+            f.write(b"png")
+        self.bundles = []
+        for name in ("one", "two"):
+            self.bundles.append(os.path.join(self.tmp.name, "content", name))
+            os.makedirs(self.bundles[-1])
+        self.store_dir = os.path.join(self.tmp.name, "store")
+
+    def tearDown(self):
+        """Remove the temporary directories."""
+        self.tmp.cleanup()
+
+    def test_copy(self):
+        """Each bundle gets a copy of the asset."""
+        store = AssetStore()
+        self.assertEqual(store.place(self.asset, self.bundles[0]), "one/Logo.PNG")
+        self.assertTrue(os.path.isfile(os.path.join(self.bundles[0], "Logo.PNG")))
+        self.assertFalse(os.path.exists(self.store_dir))
+
+    def test_link(self):
+        """Bundles share the inode of the single stored asset."""
+        store = AssetStore("link", self.store_dir)
+        for bundle in self.bundles:
+            self.assertEqual(store.place(self.asset, bundle), f"{os.path.basename(bundle)}/Logo.PNG")
+        stored = [os.path.join(self.store_dir, name) for name in os.listdir(self.store_dir)]
+        self.assertEqual(len(stored), 1)
+        self.assertTrue(stored[0].endswith(".png"))
+        for bundle in self.bundles:
+            self.assertTrue(os.path.samefile(os.path.join(bundle, "Logo.PNG"), stored[0]))
+
+    def test_shared(self):
+        """Pages link to the single stored asset."""
+        store = AssetStore("shared", self.store_dir, "/assets/")
+        links = {store.place(self.asset, bundle) for bundle in self.bundles}
+        self.assertEqual(links, {f"/assets/{os.listdir(self.store_dir)[0]}"})
+        self.assertEqual(os.listdir(self.bundles[0]), [])
+
+    def test_mode_requires_store(self):
+        """The store directory and URL are required where they are used."""
+        with self.assertRaises(ValueError):
+            AssetStore("link")
+        with self.assertRaises(ValueError):
+            AssetStore("shared", self.store_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import unittest
+from obsidian_parser import ObsidianParser
+from obsidian_parser.attachments import AttachmentIndex
+from tests.fixtures import VaultTestCase
+
+
+class AttachmentsTestCase(VaultTestCase):
+    """Test resolving embedded attachments the way Obsidian does."""
+
+    def setUp(self):
+        """Set up a vault storing its attachments apart from the notes."""
+        super().setUp()
+        for path in ("attachments/diagram.png", "attachments/my photo.jpg", "blog/guides/img/shot.png",
+                     "attachments/shot.png", "archive/shot.png"):
+            self.write(path, path)
+        self.write("blog/post.md", "# Post\n\n![[diagram.png]] ![photo](my%20photo.jpg) ![[shot.png]] ![[gone.png]]\n")
+        self.write("blog/guides/setup.md", "# Setup\n\n![[shot.png]] ![[img/shot.png]] ![[./img/shot.png]]\n")
+
+    def export(self, incremental=False):
+        """Export the blog folder."""
+        with self.assertLogs("obsidian_parser") as logs:
+            ObsidianParser(self.vault_dir, "blog", self.hugo_dir).process(erase_hugo_content=True, incremental=incremental)
+        return logs.output
+
+    def test_locate(self):
+        """Attachments resolve by vault path, path relative to the note, then by name, closest first."""
+        index = AttachmentIndex(self.vault_dir)
+        for path in ("attachments/diagram.png", "attachments/shot.png", "archive/shot.png", "blog/guides/img/shot.png"):
+            index.add(os.path.join(self.vault_dir, path))
+        post = os.path.join(self.vault_dir, "blog", "post.md")
+        setup = os.path.join(self.vault_dir, "blog", "guides", "setup.md")
+        vault_path = lambda path: os.path.join(self.vault_dir, path)
+        self.assertEqual(index.locate("Diagram.PNG", post), [vault_path("attachments/diagram.png")])
+        self.assertEqual(index.locate("archive/shot.png", setup), [vault_path("archive/shot.png")])
+        self.assertEqual(index.locate("./img/shot.png", setup), [vault_path("blog/guides/img/shot.png")])
+        self.assertEqual(index.locate("shot.png", post)[0], vault_path("blog/guides/img/shot.png"))
+        # Equally far from the note, the shortest path wins.
+        self.assertEqual(index.locate("shot.png", vault_path("index.md"))[0], vault_path("archive/shot.png"))
+        self.assertEqual(index.locate("missing.png", post), [])
+
+        self.assertIsNone(index.resolve("missing.png", post))
+        index.resolve("shot.png", post)
+        with self.assertLogs("obsidian_parser", "WARNING") as logs:
+            index.report()
+        self.assertEqual(logs.output[:2], ["WARNING:obsidian_parser:Missing attachments (1):", f"WARNING:obsidian_parser:  `missing.png` in {os.path.join('blog', 'post.md')}"])
+        self.assertIn("matches blog/guides/img/shot.png, archive/shot.png, attachments/shot.png, using the first", logs.output[-1])
+
+    def test_export(self):
+        """Embeds by bare name are bundled, the missing and ambiguous ones are reported once at the end."""
+        output = self.export()
+        post = self.read("post/index.md")
+        self.assertIn("![diagram.png](post/diagram.png)", post)
+        self.assertIn("![photo](post/my photo.jpg)", post)
+        self.assertIn("![gone.png](post/opps-missing-image.png)", post)
+        self.assertEqual(self.read("post/diagram.png"), "attachments/diagram.png")
+        self.assertEqual(self.read("setup/shot.png"), "blog/guides/img/shot.png")
+        self.assertNotIn("Vault Image not found", "\n".join(output))
+        self.assertIn("WARNING:obsidian_parser:Missing attachments (1):", output)
+        self.assertIn("WARNING:obsidian_parser:Ambiguous attachments (1):", output)
+
+    def test_incremental(self):
+        """A missing attachment which shows up gets the notes embedding it exported again."""
+        self.export(incremental=True)
+        self.write("attachments/gone.png", "png")
+        output = self.export(incremental=True)
+        self.assertIn("INFO:obsidian_parser:Skipped 1 unchanged note(s)", output)
+        self.assertEqual(self.read("post/gone.png"), "png")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import os
+import tempfile
+import unittest
+from benchmarks.run import STAGES, compare, run_benchmark
+from benchmarks.startup import eager_modules
+from benchmarks.vaultgen import VaultShape, generate_vault
+
+
+class BenchmarkTestCase(unittest.TestCase):
+    """Test the benchmark harness on a tiny vault."""
+
+    def read_vault(self, vault_dir):
+        """Return the content of every file of a vault."""
+        files = {}
+        for root, _, names in os.walk(vault_dir):
+            for name in names:
+                with open(os.path.join(root, name), "rb") as f:
+                    files[os.path.relpath(os.path.join(root, name), vault_dir)] = f.read()
+        return files
+
+    def test_vault_is_deterministic(self):
+        """The same shape generates the same vault."""
+        shape = VaultShape(notes=30, images=5)
+        with tempfile.TemporaryDirectory() as one, tempfile.TemporaryDirectory() as two:
+            self.assertEqual(len(generate_vault(one, shape)), 30)
+            generate_vault(two, shape)
+            self.assertEqual(self.read_vault(one), self.read_vault(two))
+
+    def test_run_and_compare(self):
+        """Every stage is timed, and slower stages are reported."""
+        run = run_benchmark(VaultShape(notes=20, images=5), repeat=1)
+        self.assertEqual(set(run["stages"]), set(STAGES))
+        results = {"runs": [run]}
+        self.assertEqual(compare(results, results, 0.25), [])
+        slower = {"runs": [dict(run, stages={stage: seconds * 2 + 1 for stage, seconds in run["stages"].items()})]}
+        self.assertEqual(len(compare(slower, results, 0.25)), len(STAGES))
+
+    def test_imports_are_lazy(self):
+        """Importing the parser leaves the modules only some runs need alone."""
+        self.assertEqual(eager_modules("obsidian_parser.obsidianparser"), [])
+        self.assertEqual(eager_modules("obsidian_parser"), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+"""Shared fixture of the tests exporting a temporary vault."""
+import os
+import tempfile
+import unittest
+
+
+class VaultTestCase(unittest.TestCase):
+    """
+    Test case with an empty vault and Hugo content directory.
+
+    Both are directories of the temporary directory `tmp`, which the tests
+    may also use for other directories of their own, and which is removed
+    after each test.
+    """
+
+    def setUp(self):
+        """Set up an empty vault and an empty Hugo content directory."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.vault_dir = os.path.join(self.tmp.name, "vault")
+        self.hugo_dir = os.path.join(self.tmp.name, "content")
+        os.makedirs(self.vault_dir)
+        os.makedirs(self.hugo_dir)
+
+    def write(self, path, content):
+        """Write a file into the vault, creating its folders."""
+        path = os.path.join(self.vault_dir, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def read(self, path):
+        """Read a file of the Hugo content directory, or any file by its absolute path."""
+        with open(os.path.join(self.hugo_dir, path), "r", encoding="utf-8") as f:
+            return f.read()
@@ -0,0 +1,75 @@
+import json
+import os
+import unittest
+from array import array
+from obsidian_parser import ObsidianParser
+from obsidian_parser.graph import LinkGraph, transpose
+from obsidian_parser.vaultindex import VaultIndex
+from tests.fixtures import VaultTestCase
+
+
+class LinkGraphTestCase(VaultTestCase):
+    """Test the backlinks and related notes of the link graph."""
+
+    def setUp(self):
+        """Set up a vault whose notes link to each other and share tags."""
+        super().setUp()
+        self.notes = {
+            "hub": "# Hub\n\n[[one]] [[two]] [[one|again]] [[hub]]\n",
+            "one": "---\ntags: [python]\n---\n# One\n\n[[hub]]\n",
+            "two": "# Two\n\n#python [[missing]]\n",
+            "three": "# Three\n\n[[hub]] ![[two]]\n",
+        }
+        for name, content in self.notes.items():
+            self.write(f"blog/{name}.md", content)
+
+    def note(self, name):
+        """Return the File URI of a note."""
+        return os.path.join(self.vault_dir, "blog", f"{name}.md")
+
+    def graph(self):
+        """Build the graph of the vault."""
+        index = VaultIndex(self.vault_dir, "blog", ("tags",))
+        for name, content in self.notes.items():
+            index.add_note(self.note(name), content, name)
+        return LinkGraph.build(index)
+
+    def names(self, notes):
+        """Return the names of notes."""
+        return [os.path.basename(note)[:-3] for note in notes]
+
+    def test_transpose(self):
+        """Reversed edges keep their sources in ascending order."""
+        offsets, sources = transpose(array("l", [0, 2, 3, 3]), array("l", [1, 2, 2]), 3)
+        self.assertEqual(list(offsets), [0, 0, 1, 3])
+        self.assertEqual(list(sources), [0, 0, 1])
+
+    def test_backlinks(self):
+        """Repeated links, links of a note to itself and unresolved links are left out, embeds are links."""
+        graph = self.graph()
+        self.assertEqual(self.names(graph.links(self.note("hub"))), ["one", "two"])
+        self.assertEqual(self.names(graph.backlinks(self.note("hub"))), ["one", "three"])
+        self.assertEqual(self.names(graph.backlinks(self.note("two"))), ["hub", "three"])
+
+    def test_related(self):
+        """Notes are related by the links between them, the links they share and their tags."""
+        graph = self.graph()
+        # One and two share the hub backlink and the python tag, three links to two.
+        self.assertEqual(self.names(graph.related(self.note("two"), 2)), ["hub", "one"])
+        self.assertEqual(self.names(graph.related(self.note("two"), 1, max_feature_notes=1)), ["hub"])
+
+    def test_export(self):
+        """Backlinks go into the frontmatter and the graph data file."""
+        data_file = os.path.join(self.tmp.name, "data", "graph.json")
+        graph = {"frontmatter": True, "data_file": data_file, "related": 3}
+        with self.assertLogs("obsidian_parser"):
+            ObsidianParser(self.vault_dir, "blog", self.hugo_dir, graph=graph).process(erase_hugo_content=True)
+        with open(data_file, "r", encoding="utf-8") as f:
+            pages = json.load(f)["pages"]
+        self.assertCountEqual(pages["two"]["backlinks"], ["hub", "three"])
+        self.assertCountEqual(pages["two"]["related"], ["hub", "one", "three"])
+        self.assertIn(f"backlinks: {pages['two']['backlinks']}\nrelated: {pages['two']['related']}\n", self.read("two/index.md"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import unittest
+from obsidian_parser import ObsidianParser
+from tests.fixtures import VaultTestCase
+
+
+class IncrementalExportTestCase(VaultTestCase):
+    """Test the incremental export driven by the export manifest."""
+
+    def setUp(self):
+        """Set up a small vault and an empty Hugo content directory."""
+        super().setUp()
+        self.write("blog/first.md", "# First\n\nSee ![[logo.png]]\n")
+        self.write("blog/second.md", "# Second\n\nLinks to [[first]]\n")
+        self.write("logo.png", "png")
+        self.parser = ObsidianParser(self.vault_dir, "blog", self.hugo_dir)
+
+    def export(self):
+        """Run an incremental export and return the notes it processed."""
+        with self.assertLogs("obsidian_parser", "DEBUG") as logs:
+            self.parser.process(erase_hugo_content=True, incremental=True)
+        return [
+            os.path.basename(line.rsplit(" ", 1)[-1])
+            for line in (record.getMessage() for record in logs.records)
+            if line.startswith("Processing note:")
+        ]
+
+    def test_first_run_exports_everything(self):
+        """Without a manifest every note is exported."""
+        self.assertEqual(sorted(self.export()), ["first.md", "second.md"])
+        self.assertTrue(os.path.isfile(os.path.join(self.hugo_dir, "first", "logo.png")))
+
+    def test_unchanged_notes_are_skipped(self):
+        """A second run without changes exports nothing."""
+        self.export()
+        self.assertEqual(self.export(), [])
+
+    def test_changed_note_is_exported(self):
+        """Only the changed note is exported again."""
+        self.export()
+        self.write("blog/second.md", "# Second\n\nChanged\n")
+        self.assertEqual(self.export(), ["second.md"])
+
+    def test_changed_asset_exports_note(self):
+        """A changed asset exports the notes using it."""
+        self.export()
+        self.write("logo.png", "new png")
+        self.assertEqual(self.export(), ["first.md"])
+        self.assertEqual(self.read("first/logo.png"), "new png")
+
+    def test_renamed_link_target_exports_linking_note(self):
+        """A note whose link target moved is exported again."""
+        self.export()
+        os.rename(os.path.join(self.vault_dir, "blog", "first.md"), os.path.join(self.vault_dir, "blog", "third.md"))
+        self.write("blog/first.md", "# First again\n")
+        self.assertEqual(sorted(self.export()), ["first.md", "third.md"])
+        self.write("blog/third.md", "---\nslug: moved\n---\n# Third\n")
+        self.assertEqual(self.export(), ["third.md"])
+        os.remove(os.path.join(self.vault_dir, "blog", "first.md"))
+        self.assertEqual(self.export(), ["second.md"])
+
+    def test_deleted_note_bundle_is_pruned(self):
+        """The bundle of a deleted note is removed."""
+        self.export()
+        os.remove(os.path.join(self.vault_dir, "blog", "second.md"))
+        self.assertEqual(self.export(), [])
+        self.assertFalse(os.path.exists(os.path.join(self.hugo_dir, "second")))
+        self.assertTrue(os.path.isdir(os.path.join(self.hugo_dir, "first")))
+
+    def test_unchanged_notes_are_not_read(self):
+        """The vault index takes the notes which did not change from the manifest, and each changed note is read once."""
+        self.export()
+        self.write("blog/second.md", "---\naliases: [two]\n---\n# Second\n\nLinks to [[first]]\n")
+        second = os.path.join(self.vault_dir, "blog", "second.md")
+        for expected_exports, expected_reads in ((["second.md"], [second]), ([], [])):
+            self.parser = ObsidianParser(self.vault_dir, "blog", self.hugo_dir)
+            reads = []
+            read_note = self.parser.read_note
+            self.parser.read_note = lambda note: reads.append(note) or read_note(note)
+            self.assertEqual(self.export(), expected_exports)
+            self.assertEqual(reads, expected_reads)
+            self.assertEqual(self.parser.vault_index.locate("two"), [second])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from obsidian_parser import ObsidianParser
+from obsidian_parser.instrumentation import Metrics, ThreadLogCapture, logger, replay
+
+
+class MetricsTestCase(unittest.TestCase):
+    """Test the counters, timers and log capture of a run."""
+
+    def test_counters_and_timers(self):
+        """Counters and stage timers add up across threads."""
+        metrics = Metrics()
+
+        def work():
+            for _ in range(100):
+                metrics.count("notes_processed")
+                with metrics.timer("transfer"):
+                    pass
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        metrics.record_note("slow.md", 2.0)
+        metrics.record_note("fast.md", 0.5)
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot["counters"], {"notes_processed": 400})
+        self.assertEqual(list(snapshot["stages"]), ["transfer"])
+        self.assertEqual([note["note"] for note in snapshot["slowest_notes"]], ["slow.md", "fast.md"])
+
+    def test_capture_replays_in_order(self):
+        """Captured records are only logged when replayed."""
+        capture = ThreadLogCapture()
+        logger.addFilter(capture)
+        try:
+            with self.assertLogs("obsidian_parser", "DEBUG") as logs:
+                with capture.capture() as records:
+                    logger.debug("first")
+                logger.debug("second")
+                replay(records)
+        finally:
+            logger.removeFilter(capture)
+        self.assertEqual([record.getMessage() for record in logs.records], ["second", "first"])
+
+    def test_export_metrics(self):
+        """An export counts its notes, bytes and assets."""
+        with tempfile.TemporaryDirectory() as tmp:
+            vault_dir = os.path.join(tmp, "vault")
+            os.makedirs(os.path.join(vault_dir, "blog"))
+            os.makedirs(os.path.join(tmp, "content"))
+            with open(os.path.join(vault_dir, "logo.png"), "w") as f:
+                f.write("png")
+            with open(os.path.join(vault_dir, "blog", "note.md"), "w") as f:
+                f.write("# Note\n\n![[logo.png]] ![[missing.png]]\n")
+            parser = ObsidianParser(vault_dir, "blog", os.path.join(tmp, "content"))
+            with self.assertLogs("obsidian_parser"):
+                parser.process(erase_hugo_content=True)
+                parser.log_summary()
+            path = os.path.join(tmp, "metrics.json")
+            parser.metrics.write_json(path)
+            with open(path, "r", encoding="utf-8") as f:
+                counters = json.load(f)["counters"]
+        self.assertEqual(counters["notes_processed"], 1)
+        self.assertEqual(counters["assets_copied"], 1)
+        self.assertEqual(counters["assets_missing"], 1)
+        # The note is read once, to index it, and exported from what was read.
+        self.assertEqual(counters["bytes_read"], len("# Note\n\n![[logo.png]] ![[missing.png]]\n"))
+        self.assertGreater(counters["bytes_written"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
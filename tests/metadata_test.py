@@ -0,0 +1,73 @@
+import os
+import unittest
+from obsidian_parser import ObsidianParser
+from obsidian_parser.metadata import MetadataIndex, scan_note
+from tests.fixtures import VaultTestCase
+
+
+class MetadataIndexTestCase(VaultTestCase):
+    """Test selecting notes through the metadata index."""
+
+    def setUp(self):
+        """Set up a small vault."""
+        super().setUp()
+        self.write("blog/first.md", "---\ntags: [Publish]\ntype: article\n---\n# First\n\nLinks to [[second]]\n")
+        self.write("blog/second.md", "---\ndraft: true\n---\n# Second\n\n#publish it\n")
+        self.write("blog/drafts/third.md", "# Third\n\n`#publish` is code\n")
+        self.db_path = os.path.join(self.tmp.name, "cache", "metadata.sqlite3")
+
+    def notes(self):
+        """Return the File URI's of the notes of the vault."""
+        return sorted(
+            os.path.join(root, name)
+            for root, _, files in os.walk(self.vault_dir) for name in files
+        )
+
+    def names(self, notes):
+        """Return the file names of notes."""
+        return [os.path.basename(note) for note in notes]
+
+    def test_scan_note(self):
+        """Tags come from the frontmatter and the body, not from code."""
+        metadata = scan_note("---\ntags: [A]\n---\n# Title #b\n\n#c `#d` [[Note#Part|alias]] ![[x.png]]\n")
+        self.assertEqual(metadata["tags"], ["a", "b", "c"])
+        self.assertEqual(metadata["links"], ["Note#Part"])
+        self.assertEqual(metadata["assets"], ["x.png"])
+
+    def test_refresh_reads_changed_notes(self):
+        """Only new and changed notes are read again, also after reopening the index."""
+        index = MetadataIndex(self.db_path, self.vault_dir)
+        self.assertEqual(index.refresh(self.notes()), 3)
+        index.close()
+        index = MetadataIndex(self.db_path, self.vault_dir)
+        self.assertEqual(index.refresh(self.notes()), 0)
+        self.write("blog/second.md", "# Second\n\nNot tagged any more\n")
+        self.assertEqual(index.refresh(self.notes()), 1)
+        self.assertEqual(self.names(index.select("publish")), ["first.md"])
+        os.remove(os.path.join(self.vault_dir, "blog", "first.md"))
+        index.refresh(self.notes())
+        self.assertIsNone(index.get(os.path.join(self.vault_dir, "blog", "first.md")))
+        index.close()
+
+    def test_select(self):
+        """Notes are selected by tag, frontmatter field and folder."""
+        index = MetadataIndex(":memory:", self.vault_dir)
+        index.refresh(self.notes())
+        self.assertEqual(self.names(index.select("#publish")), ["first.md", "second.md"])
+        self.assertEqual(self.names(index.select(fields={"type": "article"})), ["first.md"])
+        self.assertEqual(self.names(index.select(fields={"draft": "true"})), ["second.md"])
+        self.assertEqual(self.names(index.select(fields={"draft": None})), ["second.md"])
+        self.assertEqual(self.names(index.select(folders=["blog/drafts"])), ["third.md"])
+        self.assertEqual(self.names(index.select("publish", folders=["blog/drafts"])), [])
+        index.close()
+
+    def test_export_filter(self):
+        """Only the selected notes are exported."""
+        parser = ObsidianParser(self.vault_dir, "blog", self.hugo_dir, export_filter={"hashtag": "publish"})
+        with self.assertLogs("obsidian_parser"):
+            parser.process(erase_hugo_content=True)
+        self.assertEqual(sorted(os.listdir(self.hugo_dir)), ["first", "second"])
+
+
+if __name__ == '__main__':
+    unittest.main()
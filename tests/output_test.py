@@ -0,0 +1,65 @@
+import os
+import unittest
+from obsidian_parser import ObsidianParser
+from obsidian_parser.output import ContentWriter
+from tests.fixtures import VaultTestCase
+
+
+class ContentWriterTestCase(VaultTestCase):
+    """Test that exports leave unchanged files untouched."""
+
+    def setUp(self):
+        """Set up a vault with a note embedding an image."""
+        super().setUp()
+        self.note = os.path.join(self.vault_dir, "blog", "first.md")
+        self.write("logo.png", "png")
+        self.write("blog/first.md", "# First\n\n![[logo.png]]\n")
+        os.utime(self.note, (1000000000, 1000000000))
+
+    def export(self):
+        """Export the vault, erasing what the export does not write."""
+        with self.assertLogs("obsidian_parser"):
+            ObsidianParser(self.vault_dir, "blog", self.hugo_dir).process(erase_hugo_content=True)
+
+    def mtimes(self):
+        """Return the modification time of every file and directory of the export."""
+        return {
+            os.path.relpath(os.path.join(dirpath, name), self.hugo_dir): os.stat(os.path.join(dirpath, name)).st_mtime_ns
+            for dirpath, dirs, files in os.walk(self.hugo_dir) for name in dirs + files
+        }
+
+    def test_unchanged_files_are_untouched(self):
+        """A second export keeps every modification time, the page and bundle have that of the note."""
+        self.export()
+        page = os.path.join(self.hugo_dir, "first", "index.md")
+        self.assertEqual(os.stat(page).st_mtime, 1000000000)
+        self.assertEqual(os.stat(os.path.dirname(page)).st_mtime, 1000000000)
+        before = self.mtimes()
+        self.export()
+        self.assertEqual(self.mtimes(), before)
+
+    def test_stale_files_are_removed(self):
+        """Files the export did not write are removed, with the directories left empty."""
+        os.makedirs(os.path.join(self.hugo_dir, "gone"))
+        for path in ("gone/index.md", "first/old.png"):
+            os.makedirs(os.path.dirname(os.path.join(self.hugo_dir, path)), exist_ok=True)
+            with open(os.path.join(self.hugo_dir, path), "w") as f:
+                f.write("old")
+        self.export()
+        self.assertEqual(sorted(os.listdir(self.hugo_dir)), ["first"])
+        self.assertEqual(sorted(os.listdir(os.path.join(self.hugo_dir, "first"))), ["index.md", "logo.png"])
+
+    def test_changed_file_is_replaced(self):
+        """A changed file is replaced without leaving its temporary file behind."""
+        writer = ContentWriter()
+        path = os.path.join(self.hugo_dir, "page.md")
+        writer.write_text(path, "old\n")
+        writer.write_text(path, "new\n", mtime=1000000000)
+        self.assertEqual(self.read(path), "new\n")
+        self.assertEqual(os.listdir(self.hugo_dir), ["page.md"])
+        # The file was written after the note changed, so its time is not moved back.
+        self.assertGreater(os.stat(path).st_mtime, 1000000000)
+
+
+if __name__ == '__main__':
+    unittest.main()
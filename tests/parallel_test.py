@@ -0,0 +1,72 @@
+import os
+import unittest
+from obsidian_parser import ObsidianParser
+from tests.fixtures import VaultTestCase
+
+
+def read_tree(root):
+    """Return the relative path and content of every file below root."""
+    tree = {}
+    for dirpath, dirs, files in os.walk(root):
+        for file in files:
+            path = os.path.join(dirpath, file)
+            with open(path, "rb") as f:
+                tree[os.path.relpath(path, root)] = f.read()
+    return tree
+
+
+class ParallelExportTestCase(VaultTestCase):
+    """Test that a parallel export matches the serial one."""
+
+    def setUp(self):
+        """Set up a vault with a handful of notes."""
+        super().setUp()
+        self.write("logo.png", "png")
+        for i in range(6):
+            self.write(f"blog/note{i}.md", f"---\ntags: [t{i}]\n---\n# Note {i}\n\n![[logo.png]] [[note{i + 1}|next]]\n")
+
+    def export(self, jobs):
+        """Export the vault with the given number of jobs."""
+        hugo_dir = os.path.join(self.tmp.name, f"content-{jobs}")
+        os.makedirs(hugo_dir)
+        with self.assertLogs("obsidian_parser", "DEBUG") as logs:
+            ObsidianParser(self.vault_dir, "blog", hugo_dir, jobs=jobs).process(erase_hugo_content=True)
+        return read_tree(hugo_dir), [record.getMessage().replace(hugo_dir, "<content>") for record in logs.records]
+
+    def test_parallel_matches_serial(self):
+        """Output files and log are identical to the serial run."""
+        serial_tree, serial_log = self.export(1)
+        parallel_tree, parallel_log = self.export(3)
+        self.assertEqual(parallel_tree, serial_tree)
+        self.assertEqual(parallel_log, serial_log)
+
+    def test_parser_stays_in_process(self):
+        """Only the pages are sent to the worker processes, the parser and its indexes are not."""
+        parser = ObsidianParser(self.vault_dir, "blog", self.hugo_dir, jobs=2)
+        reads = []
+        read_note = parser.read_note
+        # A lambda cannot be pickled, so this fails should the parser be sent.
+        parser.read_note = lambda note: reads.append(note) or read_note(note)
+        with self.assertLogs("obsidian_parser"):
+            parser.process(erase_hugo_content=True)
+        self.assertEqual(len(set(reads)), 6)
+        self.assertIn("title: Note 0", self.read("note0/index.md"))
+
+    def test_worker_processes_are_kept(self):
+        """The worker processes are started once per parser, not once per export, and stopped when it is closed."""
+        parser = ObsidianParser(self.vault_dir, "blog", self.hugo_dir, jobs=2)
+        with self.assertLogs("obsidian_parser"):
+            manifest = parser.process_incremental(erase_hugo_content=True)
+            processes = parser.executor.processes
+            self.write("blog/note0.md", "# Note 0\n\nChanged\n")
+            self.write("blog/note1.md", "# Note 1\n\nChanged\n")
+            manifest.reset()
+            parser.process_incremental(False, manifest)
+        self.assertIs(parser.executor.processes, processes)
+        self.assertIn("Changed", self.read("note1/index.md"))
+        parser.close()
+        self.assertIsNone(parser.executor.processes)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import unittest
+from obsidian_parser import ObsidianParser
+from obsidian_parser.manifest import MANIFEST_NAME
+from obsidian_parser.renderers import MarkdownRenderer
+from obsidian_parser.targets import ExportTarget
+from tests.fixtures import VaultTestCase
+
+
+class ExportPlanTestCase(VaultTestCase):
+    """Test planning and syncing an export against the hugo content directory."""
+
+    def setUp(self):
+        """Set up a vault, exported once."""
+        super().setUp()
+        self.write("logo.png", "png")
+        self.write("blog/first.md", "# First\n\n![[logo.png]] [[second]]\n")
+        self.write("blog/second.md", "# Second\n\nText\n")
+        self.export()
+
+    def export(self):
+        """Export the vault into the hugo content directory."""
+        with self.assertLogs("obsidian_parser"):
+            ObsidianParser(self.vault_dir, "blog", self.hugo_dir).process(erase_hugo_content=True)
+
+    def plan(self):
+        """Plan an export of the vault."""
+        with self.assertLogs("obsidian_parser"):
+            return ObsidianParser(self.vault_dir, "blog", self.hugo_dir).plan()
+
+    def relative(self, paths):
+        """Return paths relative to the hugo content directory."""
+        return [os.path.relpath(path, self.hugo_dir) for path in paths]
+
+    def test_nothing_to_publish(self):
+        """A plan against an up to date export has no changes, and writes nothing."""
+        mtime = os.stat(os.path.join(self.hugo_dir, "first", "index.md")).st_mtime_ns
+        plan = self.plan()
+        self.assertFalse(plan.has_changes())
+        self.assertEqual(plan.unchanged, 3)
+        self.assertEqual(os.stat(os.path.join(self.hugo_dir, "first", "index.md")).st_mtime_ns, mtime)
+
+    def test_plan_and_sync(self):
+        """Changed, new and removed notes show up in the plan, and syncing applies only those."""
+        self.write("blog/second.md", "# Second\n\nEdited\n")
+        self.write("blog/third.md", "# Third\n")
+        os.remove(os.path.join(self.vault_dir, "blog", "first.md"))
+        with open(os.path.join(self.hugo_dir, MANIFEST_NAME), "w") as f:
+            f.write("{}")
+        plan = self.plan()
+        self.assertEqual(self.relative(plan.create), [os.path.join("third", "index.md")])
+        self.assertEqual(self.relative(plan.update), [os.path.join("second", "index.md")])
+        self.assertEqual(self.relative(plan.delete), [os.path.join("first", "index.md"), os.path.join("first", "logo.png")])
+        self.assertEqual(sorted(os.listdir(self.hugo_dir)), [MANIFEST_NAME, "first", "second"])
+
+        with self.assertLogs("obsidian_parser"):
+            ObsidianParser(self.vault_dir, "blog", self.hugo_dir).sync()
+        self.assertEqual(sorted(os.listdir(self.hugo_dir)), [MANIFEST_NAME, "second", "third"])
+        self.assertFalse(self.plan().has_changes())
+
+    def test_other_output_dirs(self):
+        """Stale files of the renderers and of export targets with a content directory of their own are deleted too."""
+        mirror_dir = os.path.join(self.tmp.name, "mirror")
+        docs_dir = os.path.join(self.tmp.name, "docs")
+        parser = lambda: ObsidianParser(
+            self.vault_dir, "blog", self.hugo_dir,
+            renderers=[MarkdownRenderer(mirror_dir)], targets=[ExportTarget(content_dir=docs_dir)],
+        )
+        with self.assertLogs("obsidian_parser"):
+            parser().sync()
+        for directory in (mirror_dir, docs_dir):
+            os.makedirs(os.path.join(directory, "old"))
+            with open(os.path.join(directory, "old", "stale.md"), "w") as f:
+                f.write("stale")
+        with self.assertLogs("obsidian_parser"):
+            plan = parser().plan()
+        self.assertEqual(plan.delete, [os.path.join(docs_dir, "old", "stale.md"), os.path.join(mirror_dir, "old", "stale.md")])
+        with self.assertLogs("obsidian_parser"):
+            parser().sync()
+        self.assertNotIn("old", os.listdir(mirror_dir))
+        self.assertEqual(sorted(os.listdir(docs_dir)), ["first", "second"])
+        with self.assertLogs("obsidian_parser"):
+            self.assertFalse(parser().plan().has_changes())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from obsidian_parser.remote import FetchError, RemoteFetcher
+
+
+class AssetHandler(BaseHTTPRequestHandler):
+    """Serve a few stand-in remote images."""
+
+    protocol_version = "HTTP/1.1"
+    requests = []
+
+    def do_GET(self):
+        """Serve an image, revalidating its ETag."""
+        AssetHandler.requests.append((self.path, self.headers.get("If-None-Match")))
+        if self.path == "/moved.png":
+            self.send_response(301)
+            self.send_header("Location", "/img/logo.png")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif self.path.startswith("/img/"):
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body = self.path.encode()
+            self.send_response(200)
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path == "/big.png":
+            body = b"x" * 2048
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    def log_message(self, format, *args):
+        """Keep the test output quiet."""
+
+
+class RemoteFetcherTestCase(unittest.TestCase):
+    """Test fetching remote assets from a local server."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Start the local server."""
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), AssetHandler)
+        cls.base = f"http://127.0.0.1:{cls.server.server_port}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Stop the local server."""
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        """Set up a cache and a page bundle."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp.name, "cache")
+        self.bundle_dir = os.path.join(self.tmp.name, "bundle")
+        os.makedirs(self.bundle_dir)
+        AssetHandler.requests = []
+
+    def tearDown(self):
+        """Remove the temporary directories."""
+        self.tmp.cleanup()
+
+    def read(self, name):
+        """Read an asset from the page bundle."""
+        with open(os.path.join(self.bundle_dir, name), "rb") as f:
+            return f.read()
+
+    def test_names_are_deterministic(self):
+        """The asset name only depends on the URL."""
+        fetcher = RemoteFetcher()
+        url = f"{self.base}/img/a%20b.png?size=2"
+        self.assertEqual(fetcher.asset_name(url), fetcher.asset_name(url))
+        self.assertTrue(fetcher.asset_name(url).endswith("_a-b.png"))
+        self.assertNotEqual(fetcher.asset_name(url), fetcher.asset_name(f"{self.base}/img/a%20b.png"))
+
+    def test_concurrent_fetch_once_per_url(self):
+        """Each URL is downloaded once per run, however often it is saved."""
+        fetcher = RemoteFetcher(workers=4)
+        urls = [f"{self.base}/img/{i}.png" for i in range(8)]
+        fetcher.prefetch(urls + urls)
+        for url in urls:
+            name = fetcher.save(url, self.bundle_dir)
+            self.assertEqual(self.read(name), url[len(self.base):].encode())
+        fetcher.close()
+        self.assertEqual(len(AssetHandler.requests), 8)
+
+    def test_cache_revalidates(self):
+        """A cached asset is revalidated with its ETag on the next run."""
+        url = f"{self.base}/img/logo.png"
+        for run in range(2):
+            fetcher = RemoteFetcher(self.cache_dir)
+            self.assertEqual(self.read(fetcher.save(url, self.bundle_dir)), b"/img/logo.png")
+            fetcher.close()
+        self.assertEqual(AssetHandler.requests, [("/img/logo.png", None), ("/img/logo.png", '"v1"')])
+
+    def test_redirect(self):
+        """Redirects are followed."""
+        fetcher = RemoteFetcher()
+        self.assertEqual(self.read(fetcher.save(f"{self.base}/moved.png", self.bundle_dir)), b"/img/logo.png")
+        fetcher.close()
+
+    def test_errors(self):
+        """Missing and oversized assets fail."""
+        fetcher = RemoteFetcher(max_size=1024)
+        with self.assertRaises(FetchError):
+            fetcher.save(f"{self.base}/missing.png", self.bundle_dir)
+        with self.assertRaises(FetchError):
+            fetcher.save(f"{self.base}/big.png", self.bundle_dir)
+        fetcher.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import json
+import os
+import unittest
+from obsidian_parser import ObsidianParser
+from obsidian_parser.model import ParsedNote
+from obsidian_parser.renderers import JsonRenderer, MarkdownRenderer, Renderer
+from obsidian_parser.tokenizer import tokenize
+from tests.fixtures import VaultTestCase
+
+
+class RenderersTestCase(VaultTestCase):
+    """Test rendering the parsed notes to several output targets."""
+
+    def setUp(self):
+        """Set up a vault with notes in folders, linking to each other and embedding an image."""
+        super().setUp()
+        self.markdown_dir = os.path.join(self.tmp.name, "mirror")
+        self.json_dir = os.path.join(self.tmp.name, "api")
+        self.write("logo.png", "png")
+        self.write("blog/first.md", "---\ntags: [python]\n---\n# First post\n\n[[setup#Install it|install]] [[missing]] ![[logo.png]] #draft\n")
+        self.write("blog/guides/setup.md", "# Setup\n\n## Install it\n\nBack to [[first]]\n")
+
+    def export(self, incremental=False):
+        """Export the vault to the Hugo content directory, a Markdown mirror and JSON documents."""
+        parser = ObsidianParser(
+            self.vault_dir, "blog", self.hugo_dir,
+            renderers=[MarkdownRenderer(self.markdown_dir), JsonRenderer(self.json_dir)],
+        )
+        reads = []
+        read_note = parser.read_note
+        parser.read_note = lambda note: reads.append(note) or read_note(note)
+        with self.assertLogs("obsidian_parser"):
+            parser.process(erase_hugo_content=True, incremental=incremental)
+        return reads
+
+    def test_parsed_note(self):
+        """The records of a parsed note are derived from its tokens, and it cannot be changed."""
+        content = "---\ntitle: Custom\ntags: tools\n---\n# Heading\n\n[[a#B|c]] ![[d.png|e]] #Tag\n"
+        parsed = ParsedNote("/vault/note.md", content, tokenize(content))
+        self.assertEqual(parsed.name, "note")
+        self.assertEqual(parsed.title, "Custom")
+        self.assertEqual(parsed.body, "# Heading\n\n[[a#B|c]] ![[d.png|e]] #Tag\n")
+        self.assertEqual(parsed.tags, ("tools", "tag"))
+        self.assertEqual([(heading.level, heading.anchor) for heading in parsed.headings], [(1, "heading")])
+        self.assertEqual([(link.target, link.heading, link.text, link.note) for link in parsed.links], [("a", "B", "c", None)])
+        self.assertEqual([(embed.link, embed.text) for embed in parsed.embeds], [("d.png", "e")])
+        with self.assertRaises(AttributeError):
+            parsed.content = ""
+        with self.assertRaises(TypeError):
+            parsed.frontmatter["title"] = "Changed"
+
+    def test_render_targets(self):
+        """Every target is rendered from the same parsed notes, each note is read once."""
+        reads = self.export()
+        # By the vault index, the export of all the targets reuses what was read.
+        notes = [os.path.join(self.vault_dir, "blog", "first.md"), os.path.join(self.vault_dir, "blog", "guides", "setup.md")]
+        self.assertCountEqual(reads, notes)
+        self.assertIn("[install](../setup/#install-it)", self.read(os.path.join(self.hugo_dir, "first", "index.md")))
+
+        mirrored = self.read(os.path.join(self.markdown_dir, "blog", "first.md"))
+        self.assertTrue(mirrored.startswith("---\ntags: [python]\n---\n# First post\n"))
+        self.assertIn("[install](guides/setup.md#install-it) missing ![logo.png](../logo.png) #draft", mirrored)
+        self.assertIn("[first](../first.md)", self.read(os.path.join(self.markdown_dir, "blog", "guides", "setup.md")))
+        self.assertTrue(os.path.isfile(os.path.join(self.markdown_dir, "logo.png")))
+
+        document = json.loads(self.read(os.path.join(self.json_dir, "first.json")))
+        self.assertEqual(document["title"], "First post")
+        self.assertEqual(document["tags"], ["python", "draft"])
+        self.assertEqual([link["page"] for link in document["links"]], ["setup", None])
+        self.assertEqual(document["assets"], ["logo.png"])
+
+    def test_incremental_removes_stale_pages(self):
+        """The pages of deleted notes are removed from every target."""
+        self.export(incremental=True)
+        os.remove(os.path.join(self.vault_dir, "blog", "guides", "setup.md"))
+        self.export(incremental=True)
+        self.assertFalse(os.path.exists(os.path.join(self.markdown_dir, "blog", "guides", "setup.md")))
+        self.assertEqual(os.listdir(self.json_dir), ["first.json"])
+        # The note linking to the deleted note is rendered again, its link is now text.
+        self.assertIn("install missing", self.read(os.path.join(self.markdown_dir, "blog", "first.md")))
+
+    def test_incomplete_renderer(self):
+        """A renderer which does not implement every method fails when it is created."""
+        class TextRenderer(Renderer):
+            name = "text"
+
+            def render(self, parser, parsed):
+                pass
+
+        with self.assertRaises(TypeError):
+            TextRenderer(self.tmp.name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import unittest
+from obsidian_parser.scanner import VaultScanner
+from tests.fixtures import VaultTestCase
+
+
+class VaultScannerTestCase(VaultTestCase):
+    """Test scanning a vault for notes."""
+
+    def setUp(self):
+        """Set up a vault with folders to skip."""
+        super().setUp()
+        for path in (
+            "blog/a.md", "blog/b.txt", "blog/sub/c.md", "blog/drafts/d.md", "blog/sub/e.tmp.md",
+            ".obsidian/f.md", ".trash/g.md", ".git/h.md", "attachments/i.md", "blog/sub/.git/j.md",
+        ):
+            self.write(path, "# Note\n")
+
+    def scan(self, scanner, directory=""):
+        """Return the vault relative paths of the notes found by a scanner."""
+        return sorted(
+            os.path.relpath(entry.path, self.vault_dir).replace(os.sep, "/")
+            for entry in scanner.scan(os.path.join(self.vault_dir, directory))
+        )
+
+    def test_prunes_vault_folders(self):
+        """Obsidian, trash and git folders are skipped."""
+        self.assertEqual(self.scan(VaultScanner(self.vault_dir)), [
+            "attachments/i.md", "blog/a.md", "blog/drafts/d.md", "blog/sub/c.md", "blog/sub/e.tmp.md",
+        ])
+
+    def test_walk_order(self):
+        """Notes are yielded in the order os.walk finds them."""
+        walked = [
+            os.path.join(root, name)
+            for root, dirs, files in os.walk(os.path.join(self.vault_dir, "blog"))
+            for name in files if name.endswith(".md") and ".git" not in root
+        ]
+        scanner = VaultScanner(self.vault_dir)
+        self.assertEqual([entry.path for entry in scanner.scan(os.path.join(self.vault_dir, "blog"))], walked)
+
+    def test_ignore_globs(self):
+        """Ignore globs and the .exportignore file skip files and folders."""
+        self.write(".exportignore", "# Drafts are private\nblog/drafts/\n/attachments\n")
+        scanner = VaultScanner(self.vault_dir, ["*.tmp.md"])
+        self.assertEqual(self.scan(scanner), ["blog/a.md", "blog/sub/c.md"])
+        self.assertTrue(scanner.ignored(os.path.join(self.vault_dir, "blog", "drafts", "new.md")))
+        self.assertFalse(scanner.ignored(os.path.join(self.vault_dir, "blog", "drafts.md")))
+
+    def test_stat_is_cached(self):
+        """The entries carry the stat of the notes."""
+        entry = next(VaultScanner(self.vault_dir).scan(os.path.join(self.vault_dir, "blog")))
+        self.assertEqual(entry.stat().st_size, os.stat(entry.path).st_size)
+
+
+if __name__ == '__main__':
+    unittest.main()
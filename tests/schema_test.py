@@ -0,0 +1,42 @@
+import os
+import tempfile
+import unittest
+import frontmatter
+from obsidian_parser.schema import DEFAULT_SCHEMA, FieldSpec, FrontmatterSchema, parse_frontmatter
+
+
+class FrontmatterSchemaTestCase(unittest.TestCase):
+    """Test parsing and emitting frontmatter."""
+
+    def test_parse_matches_frontmatter(self):
+        """The fast path splits notes the way python-frontmatter does."""
+        for note in (
+            "", "# Title\n\nBody\n", "---\ntitle: Hi\n---\n\n# Title\n", "  \n---\r\ntags: [a]\r\n---\r\nBody\r\n",
+            "---\n---\nBody", "---\ntitle: Hi\n", "---\n- a\n---\nBody", "{\n\"title\": \"Hi\"\n}\nBody",
+        ):
+            self.assertEqual(parse_frontmatter(note), frontmatter.parse(note), note)
+
+    def test_default_schema(self):
+        """Missing and empty fields get their defaults, sources are renamed."""
+        emitted = DEFAULT_SCHEMA.emit({"tags": [], "years": 2021, "draft": True}, "Heading")
+        self.assertEqual(emitted, (
+            "---\ntitle: Heading\ntype: article \nlayout: post \nyear: 2021\ncategories: ['todo'] \n"
+            "tags: ['untagged'] \nauthors: ['damian'] \ndraft: True\ntoc: false \nfeatured: false \n"
+            "comments: false \n---\n\n"
+        ))
+
+    def test_load(self):
+        """A schema is loaded from a YAML file."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "schema.yaml")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("- key: title\n  from_heading: true\n- key: authors\n  default: \"['me']\"\n  empty: [[]]\n")
+            schema = FrontmatterSchema.load(path)
+        self.assertEqual(schema.fields, [
+            FieldSpec("title", from_heading=True), FieldSpec("authors", default="['me']", empty=([],)),
+        ])
+        self.assertEqual(schema.emit({"authors": []}, None), "---\ntitle: None\nauthors: ['me']\n---\n\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
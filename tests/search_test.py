@@ -0,0 +1,73 @@
+import gzip
+import json
+import os
+import unittest
+from obsidian_parser import ObsidianParser
+from obsidian_parser.search import DOCS_NAME, SHARD_NAME, SearchIndex, index_terms, shard_of
+from obsidian_parser.targets import ExportTarget
+from tests.fixtures import VaultTestCase
+
+
+class SearchIndexTestCase(VaultTestCase):
+    """Test the search index written during the export."""
+
+    def setUp(self):
+        """Set up a vault with a few notes."""
+        super().setUp()
+        self.search_dir = os.path.join(self.tmp.name, "search")
+        self.write("blog/first.md", "# First\n\nApples and pears, apples again.\n")
+        self.write("blog/second.md", "# Second\n\nOnly pears here.\n\n```\napples in code\n```\n")
+
+    def export(self, incremental=False):
+        """Export the vault with a search index of two shards."""
+        parser = ObsidianParser(self.vault_dir, "blog", self.hugo_dir, search_index=SearchIndex(self.search_dir, 2))
+        with self.assertLogs("obsidian_parser"):
+            parser.process(erase_hugo_content=True, incremental=incremental)
+
+    def read_index(self, name):
+        """Read a file of the search index."""
+        with gzip.open(os.path.join(self.search_dir, name), "rt", encoding="utf-8") as f:
+            return json.load(f)
+
+    def postings(self, term):
+        """Return the postings of a term by page URL."""
+        docs = self.read_index(DOCS_NAME)["docs"]
+        entries = self.read_index(SHARD_NAME.format(shard_of(term, 2)))[term]
+        return {docs[str(entry[0])][0]: entry[1:] for entry in entries}
+
+    def test_index_terms(self):
+        """The frontmatter, code and link URLs are not indexed."""
+        terms = index_terms("---\ntitle: Hidden\n---\n\nSee [the docs](https://example.com/page) `inline` text, the end\n")
+        self.assertEqual(terms, {"see": [0], "the": [1, 4], "docs": [2], "text": [3], "end": [5]})
+
+    def test_full_and_incremental(self):
+        """Pages are indexed with delta encoded positions, and updated incrementally."""
+        self.export(incremental=True)
+        self.assertEqual(self.read_index(DOCS_NAME)["docs"], {"0": ["/first/", "First"], "1": ["/second/", "Second"]})
+        self.assertEqual(self.postings("apples"), {"/first/": [0, 3]})
+        self.assertEqual(self.postings("pears"), {"/first/": [2], "/second/": [1]})
+
+        self.write("blog/second.md", "# Second\n\nApples now.\n")
+        os.remove(os.path.join(self.vault_dir, "blog", "first.md"))
+        self.write("blog/third.md", "# Third\n\nPears.\n")
+        self.export(incremental=True)
+        self.assertEqual(self.read_index(DOCS_NAME)["docs"], {"1": ["/second/", "Second"], "2": ["/third/", "Third"]})
+        self.assertEqual(self.postings("apples"), {"/second/": [0]})
+        self.assertEqual(self.postings("pears"), {"/third/": [0]})
+
+    def test_pages_of_the_same_name(self):
+        """Pages of the same name in different sections are indexed apart, by their URL."""
+        self.write("blog/docs/first.md", "# First steps\n\nBananas.\n")
+        targets = [ExportTarget("docs", folders=("docs",)), ExportTarget("posts")]
+        parser = ObsidianParser(self.vault_dir, "blog", self.hugo_dir, search_index=SearchIndex(self.search_dir, 2), targets=targets)
+        with self.assertLogs("obsidian_parser"):
+            parser.process(erase_hugo_content=True)
+        self.assertEqual(
+            sorted(self.read_index(DOCS_NAME)["docs"].values()),
+            [["/docs/first/", "First steps"], ["/posts/first/", "First"], ["/posts/second/", "Second"]],
+        )
+        self.assertEqual(self.postings("bananas"), {"/docs/first/": [0]})
+
+
+if __name__ == '__main__':
+    unittest.main()
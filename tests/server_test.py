@@ -0,0 +1,86 @@
+import io
+import json
+import os
+import socket
+import threading
+import unittest
+from obsidian_parser import ObsidianParser
+from obsidian_parser.server import ConversionServer
+from tests.fixtures import VaultTestCase
+
+
+class ConversionServerTestCase(VaultTestCase):
+    """Test converting notes on request."""
+
+    def setUp(self):
+        """Set up a vault with a note linking to another and embedding an image."""
+        super().setUp()
+        self.write("logo.png", "png")
+        self.write("blog/first.md", "# First\n\n[[second]] ![[logo.png]]\n")
+        self.write("blog/second.md", "# Second\n")
+        self.server = ConversionServer(ObsidianParser(self.vault_dir, "blog", self.hugo_dir))
+        with self.assertLogs("obsidian_parser"):
+            self.server.load()
+
+    def serve(self, *requests):
+        """Send requests to the server, and return its responses."""
+        outfile = io.BytesIO()
+        self.server.serve(io.BytesIO(b"\n".join(requests) + b"\n"), outfile)
+        return [json.loads(line) for line in outfile.getvalue().splitlines()]
+
+    def test_convert(self):
+        """Notes and texts are converted, and nothing is written to the hugo content directory."""
+        responses = self.serve(
+            b'{"id": 1, "note": "blog/first.md"}',
+            b'{"note": "blog/draft.md", "text": "# Draft\\n\\n[[first|The first]]"}',
+        )
+        self.assertEqual(responses[0]["id"], 1)
+        self.assertEqual(responses[0]["page"], "first")
+        self.assertIn("[second](../second/) ![logo.png](first/logo.png)", responses[0]["content"])
+        self.assertEqual(responses[0]["assets"], [os.path.join(self.vault_dir, "logo.png")])
+        self.assertEqual(responses[1]["page"], "draft")
+        self.assertIn("title: Draft", responses[1]["content"])
+        self.assertIn("[The first](../first/)", responses[1]["content"])
+        self.assertEqual(os.listdir(self.hugo_dir), [])
+
+    def test_errors(self):
+        """Bad requests are answered with an error, and the server keeps serving."""
+        with self.assertLogs("obsidian_parser", "WARNING"):
+            responses = self.serve(
+                b"not json", b"[]", b'{"id": "x", "note": "blog/missing.md"}',
+                b'{"id": "y", "note": "blog/bad.md", "text": "---\\ntitle: a: b\\n---\\nbody"}', b'{"note": "blog/second.md"}',
+            )
+        self.assertIn("Invalid request", responses[0]["error"])
+        self.assertEqual(responses[1], {"error": "A request must be an object"})
+        self.assertEqual(responses[2]["id"], "x")
+        self.assertIn("missing.md", responses[2]["error"])
+        self.assertEqual(responses[3]["id"], "y")
+        self.assertIn("mapping values are not allowed", responses[3]["error"])
+        self.assertEqual(responses[4]["page"], "second")
+
+    def test_changed_embedded_note(self):
+        """An embedded note which changed is read again."""
+        self.write("blog/part.md", "Part one\n")
+        request = b'{"note": "blog/draft.md", "text": "![[part]]"}'
+        self.assertIn("Part one", self.serve(request)[0]["content"])
+        self.write("blog/part.md", "Part two, edited\n")
+        self.assertIn("Part two, edited", self.serve(request)[0]["content"])
+
+    def test_socket(self):
+        """Requests are answered on a Unix socket."""
+        path = os.path.join(self.tmp.name, "server.sock")
+        thread = threading.Thread(target=self.server.serve_socket, args=(path,), daemon=True)
+        with self.assertLogs("obsidian_parser"):
+            thread.start()
+            for _ in range(100):
+                if os.path.exists(path):
+                    break
+                thread.join(0.01)
+        with socket.socket(socket.AF_UNIX) as client:
+            client.connect(path)
+            client.sendall(b'{"note": "blog/second.md"}\n')
+            self.assertEqual(json.loads(client.makefile("rb").readline())["page"], "second")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import filecmp
+import os
+import unittest
+from obsidian_parser import ObsidianParser
+from obsidian_parser.shard import SHARD_MANIFEST_NAME, Shard, ShardManifest, merge_shards
+from obsidian_parser.targets import ExportTarget
+from tests.fixtures import VaultTestCase
+
+
+class ShardTestCase(VaultTestCase):
+    """Test splitting an export over shards and merging them."""
+
+    def setUp(self):
+        """Set up a vault of notes linking to each other and sharing an image."""
+        super().setUp()
+        self.write("logo.png", "png")
+        for index in range(8):
+            self.write(f"blog/note-{index}.md", f"# Note {index}\n\n[[note-{(index + 1) % 8}]] ![[logo.png]]\n")
+
+    def export(self, name, shard=None):
+        """Export the vault, or a shard of it, into a directory of its own."""
+        hugo_dir = os.path.join(self.tmp.name, name)
+        os.makedirs(hugo_dir, exist_ok=True)
+        with self.assertLogs("obsidian_parser"):
+            ObsidianParser(self.vault_dir, "blog", hugo_dir, shard=shard).process(erase_hugo_content=True)
+        return hugo_dir
+
+    def test_parse(self):
+        """A shard is given as i/N, and every page bundle belongs to exactly one shard."""
+        self.assertEqual(Shard.parse("2/3"), Shard(2, 3))
+        self.assertEqual(str(Shard(2, 3)), "2/3")
+        for text in ("3", "0/3", "4/3", "a/b", "1/"):
+            with self.assertRaises(ValueError):
+                Shard.parse(text)
+        for page in ("first", "second", "third"):
+            self.assertEqual(sum(Shard(index, 3).owns(page) for index in range(1, 4)), 1)
+
+    def test_merge(self):
+        """The merged shards are the same as an export which is not sharded."""
+        full_dir = self.export("full")
+        shard_dirs = [self.export(f"shard-{index}", Shard(index, 2)) for index in (1, 2)]
+        manifests = [ShardManifest.load(os.path.join(shard_dir, SHARD_MANIFEST_NAME)) for shard_dir in shard_dirs]
+        self.assertEqual(sum(len(manifest.pages) for manifest in manifests), 8)
+        self.assertEqual(manifests[0].pages.get("note-0", manifests[-1].pages.get("note-0"))["links"], ["note-1"])
+
+        merged_dir = os.path.join(self.tmp.name, "merged")
+        with self.assertLogs("obsidian_parser") as logs:
+            result = merge_shards(shard_dirs, merged_dir)
+        self.assertEqual(result["pages"], 8)
+        self.assertEqual(result["broken_links"], [])
+        self.assertIn("Merged 2 shard(s)", logs.output[-1])
+        comparison = filecmp.dircmp(full_dir, merged_dir)
+        self.assertEqual((comparison.left_only, comparison.right_only, comparison.diff_files), ([], [], []))
+        self.assertEqual(sorted(os.listdir(full_dir)), sorted(os.listdir(merged_dir)))
+
+    def test_merge_targets(self):
+        """The files of export targets with a content directory of their own are merged as well."""
+        for index in range(4):
+            self.write(f"blog/docs/guide-{index}.md", f"# Guide {index}\n\n[[note-{index}]] ![[logo.png]]\n")
+
+        def export(name, shard=None):
+            hugo_dir = os.path.join(self.tmp.name, name, "content")
+            os.makedirs(hugo_dir)
+            targets = [
+                ExportTarget(folders=("docs",), content_dir=os.path.join(self.tmp.name, name, "docs"), base_url="https://docs.example.com"),
+                ExportTarget("posts"),
+            ]
+            with self.assertLogs("obsidian_parser"):
+                ObsidianParser(self.vault_dir, "blog", hugo_dir, shard=shard, targets=targets).process(erase_hugo_content=True)
+            return hugo_dir
+
+        def read_tree(root):
+            return {
+                os.path.relpath(os.path.join(dirpath, file), root): self.read(os.path.join(dirpath, file))
+                for dirpath, _, files in os.walk(root) for file in files if file != SHARD_MANIFEST_NAME
+            }
+
+        export("full")
+        shard_dirs = [export(f"shard-{index}", Shard(index, 2)) for index in (1, 2)]
+        self.assertEqual(ShardManifest.load(os.path.join(shard_dirs[0], SHARD_MANIFEST_NAME)).directories, [".", "../docs"])
+        merged_dir = os.path.join(self.tmp.name, "merged", "content")
+        stale = os.path.join(self.tmp.name, "merged", "docs", "stale", "index.md")
+        os.makedirs(os.path.dirname(stale))
+        with open(stale, "w") as f:
+            f.write("stale")
+        with self.assertLogs("obsidian_parser"):
+            result = merge_shards(shard_dirs, merged_dir)
+        self.assertEqual(result["pages"], 12)
+        self.assertEqual(len(os.listdir(os.path.join(self.tmp.name, "merged", "docs"))), 4)
+        self.assertEqual(read_tree(os.path.join(self.tmp.name, "merged")), read_tree(os.path.join(self.tmp.name, "full")))
+
+    def test_merge_errors(self):
+        """Missing shards fail the merge, links to pages no shard exported are reported."""
+        shard_dirs = [self.export(f"shard-{index}", Shard(index, 2)) for index in (1, 2)]
+        merged_dir = os.path.join(self.tmp.name, "merged")
+        with self.assertRaisesRegex(ValueError, r"missing \[2\]"):
+            merge_shards(shard_dirs[:1], merged_dir)
+
+        manifest_path = os.path.join(shard_dirs[0], SHARD_MANIFEST_NAME)
+        manifest = ShardManifest.load(manifest_path)
+        page = next(iter(manifest.pages))
+        manifest.pages[page]["links"].append("gone")
+        manifest.save(manifest_path)
+        with self.assertLogs("obsidian_parser", "WARNING") as logs:
+            result = merge_shards(shard_dirs, merged_dir)
+        self.assertEqual(result["broken_links"], [(page, "gone")])
+        self.assertIn(f"`{page}` links to `gone`", logs.output[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import unittest
+from obsidian_parser import ObsidianParser
+from obsidian_parser.scanner import VaultScanner
+from obsidian_parser.targets import ExportTarget, load_targets
+from tests.fixtures import VaultTestCase
+
+
+class TargetsTestCase(VaultTestCase):
+    """Test exporting the notes of one vault scan to several sections."""
+
+    def setUp(self):
+        """Set up a vault with blog posts, docs and a talk, linking across the sections."""
+        super().setUp()
+        os.makedirs(os.path.join(self.hugo_dir, "blog", "stale"))
+        with open(os.path.join(self.hugo_dir, "blog", "stale", "index.md"), "w") as f:
+            f.write("stale")
+        with open(os.path.join(self.hugo_dir, "_index.md"), "w") as f:
+            f.write("home")
+        self.write("blog/post.md", "# Post\n\n[[setup#Install it|install]] [[other post]] [[Conference Talk]]\n")
+        self.write("blog/other post.md", "# Other post\n\nBack to [[post]]\n")
+        self.write("docs/setup.md", "# Setup\n\n## Install it\n\nSee [[post]]\n")
+        self.write("notes/conference talk.md", "---\ntags: [talk]\n---\n# Talk\n")
+        self.write("notes/private.md", "# Private\n")
+        self.targets = [
+            ExportTarget("blog", folders=("blog",)),
+            ExportTarget("docs", folders=("docs",)),
+            ExportTarget("talks", hashtag="talk"),
+        ]
+
+    def test_export(self):
+        """Each note goes to the section of its target, from a single scan, and links across sections are absolute."""
+        scanner = VaultScanner(self.vault_dir)
+        scans = []
+        scan = scanner.scan
+        scanner.scan = lambda directory, attachments=False: scans.append(attachments) or scan(directory, attachments)
+        parser = ObsidianParser(self.vault_dir, ".", self.hugo_dir, scanner=scanner, targets=self.targets)
+        with self.assertLogs("obsidian_parser") as logs:
+            parser.process(erase_hugo_content=True)
+        self.assertEqual(scans.count(False), 1)
+        self.assertIn("INFO:obsidian_parser:  1 note(s) match no export target", logs.output)
+
+        self.assertEqual(sorted(os.listdir(os.path.join(self.hugo_dir, "blog"))), ["other post", "post"])
+        self.assertEqual(os.listdir(os.path.join(self.hugo_dir, "docs")), ["setup"])
+        self.assertEqual(os.listdir(os.path.join(self.hugo_dir, "talks")), ["conference talk"])
+        post = self.read("blog/post/index.md")
+        self.assertIn("[install](/docs/setup/#install-it)", post)
+        self.assertIn("[other post](../other-post/)", post)
+        self.assertIn("[Conference Talk](/talks/conference-talk/)", post)
+        self.assertIn("[post](/blog/post/)", self.read("docs/setup/index.md"))
+        # The sections are pruned, the rest of the content directory is left alone.
+        self.assertFalse(os.path.exists(os.path.join(self.hugo_dir, "blog", "stale")))
+        self.assertEqual(self.read("_index.md"), "home")
+
+    def test_first_target_wins(self):
+        """A note matching several targets is only exported to the first of them."""
+        self.write("blog/talk recap.md", "---\ntags: [talk]\n---\n# Recap\n")
+        with self.assertLogs("obsidian_parser"):
+            ObsidianParser(self.vault_dir, ".", self.hugo_dir, targets=self.targets).process(erase_hugo_content=True)
+        self.assertIn("talk recap", os.listdir(os.path.join(self.hugo_dir, "blog")))
+        self.assertNotIn("talk recap", os.listdir(os.path.join(self.hugo_dir, "talks")))
+
+    def test_other_content_dir(self):
+        """A target can export to the content directory of another site, linked by its URL."""
+        docs_dir = os.path.join(self.tmp.name, "docs-site")
+        self.targets[1] = ExportTarget(folders=("docs",), content_dir=docs_dir, base_url="https://docs.example.com")
+        with self.assertLogs("obsidian_parser"):
+            ObsidianParser(self.vault_dir, ".", self.hugo_dir, targets=self.targets).process(erase_hugo_content=True)
+        self.assertEqual(os.listdir(docs_dir), ["setup"])
+        self.assertFalse(os.path.exists(os.path.join(self.hugo_dir, "docs")))
+        self.assertIn("[install](https://docs.example.com/setup/#install-it)", self.read("blog/post/index.md"))
+        self.assertIn("[post](/blog/post/)", self.read(os.path.join(docs_dir, "setup", "index.md")))
+
+    def test_load_targets(self):
+        """The targets are read from YAML, sections must stay within their content directory."""
+        path = os.path.join(self.tmp.name, "targets.yaml")
+        with open(path, "w") as f:
+            f.write(
+                "- section: posts/2024\n  folder: blog\n- section: Talks\n  tag: talk\n  where: {draft: false, event: null}\n"
+                "- content_dir: ../docs-site/content\n  url: https://docs.example.com/\n  folder: docs\n"
+            )
+        targets = load_targets(path)
+        self.assertEqual(targets[0], ExportTarget("posts/2024", ("blog",)))
+        self.assertEqual(targets[1].fields, {"draft": "false", "event": None})
+        self.assertEqual(targets[1].url, "/talks/")
+        self.assertEqual(targets[2].output_dir(self.hugo_dir), os.path.normpath(os.path.join(self.tmp.name, "..", "docs-site", "content")))
+        self.assertEqual(targets[2].url, "https://docs.example.com/")
+        with open(path, "w") as f:
+            f.write("- section: ../outside\n")
+        with self.assertRaisesRegex(ValueError, "not a directory of the content directory"):
+            load_targets(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
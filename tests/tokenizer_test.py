@@ -0,0 +1,76 @@
+import unittest
+from obsidian_parser import ObsidianParser
+from obsidian_parser.tokenizer import CODE, EMBED, HASHTAG, HEADING, IMAGE, WIKI_LINK, splice, tokenize
+
+
+class TokenizerTestCase(unittest.TestCase):
+    """Test the single pass note tokenizer."""
+
+    def test_kinds_in_document_order(self):
+        """Links, embeds, images and hashtags are found in order."""
+        spans = tokenize("#tag [[Note#Part|alias]] ![[img.png|cap]] ![alt](pic.png)")
+        self.assertEqual([span.kind for span in spans], [HASHTAG, WIKI_LINK, EMBED, IMAGE])
+        link = spans[1]
+        self.assertEqual((link.target, link.heading, link.alias), ("Note", "Part", "alias"))
+        self.assertEqual(link.link, "Note#Part")
+        self.assertEqual((spans[3].target, spans[3].alias), ("pic.png", "alt"))
+
+    def test_code_is_skipped(self):
+        """Nothing inside fenced blocks or inline code is a link."""
+        text = "```\n[[a]] #b\n```\n`[[c]]` [[d]]\n~~~md\n![[e.png]]\n~~~\n"
+        kinds = [(span.kind, span.target) for span in tokenize(text)]
+        self.assertEqual(kinds, [(CODE, ""), (CODE, ""), (WIKI_LINK, "d"), (CODE, "")])
+
+    def test_unterminated_fence_runs_to_end(self):
+        """An unclosed fence hides the rest of the note."""
+        self.assertEqual([span.kind for span in tokenize("[[a]]\n```\n[[b]]")], [WIKI_LINK, CODE])
+
+    def test_hashtags(self):
+        """Headings, anchors and entities are no hashtags."""
+        spans = tokenize("# Title\n#one two#three &#38; #four")
+        self.assertEqual([span.target for span in spans if span.kind == HASHTAG], ["one", "four"])
+
+    def test_headings(self):
+        """Heading text is captured, and the links within it are still found."""
+        spans = tokenize("## See [[Other]] ##\n")
+        self.assertEqual([(span.kind, span.heading) for span in spans], [(HEADING, "See [[Other]]"), (WIKI_LINK, None)])
+
+    def test_splice(self):
+        """All replacements are applied in one pass."""
+        text = "[[a]] and [[b]]"
+        spans = tokenize(text)
+        self.assertEqual(splice(text, [(spans[1], "B"), (spans[0], "A")]), "A and B")
+
+
+class WikiLinkViewTestCase(unittest.TestCase):
+    """Test the TypedDict views over the tokenizer spans."""
+
+    def setUp(self):
+        """Set up the parser."""
+        self.parser = ObsidianParser("vault", "blog", "content")
+
+    def test_get_wiki_links(self):
+        """Wiki links keep their historic shape."""
+        links = self.parser.get_wiki_links("[[blog/post#My Head|text]] [[docs/_index]]")
+        self.assertEqual(links, [
+            {"wiki_link": "[[blog/post#My Head|text]]", "link": "post#My Head", "text": "text"},
+            {"wiki_link": "[[docs/_index]]", "link": "docs/", "text": "docs/_index"},
+        ])
+
+    def test_replace_wiki_links(self):
+        """Wiki links become markdown links, code is left alone."""
+        text = "[[post#My Head|text]] `[[code]]`"
+        self.assertEqual(self.parser.replace_wiki_links(text), "[text](post#my-head) `[[code]]`")
+
+    def test_get_note_images(self):
+        """Embeds and markdown images are resource links."""
+        links = self.parser.get_note_images("![[a.png]] ![b](c.png) ![d](e.png)")
+        self.assertEqual(links, [
+            {"source": "![[a.png]]", "link": "a.png", "text": "a.png"},
+            {"source": "![b](c.png)", "link": "c.png", "text": "b"},
+            {"source": "![d](e.png)", "link": "e.png", "text": "d"},
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
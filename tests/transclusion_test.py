@@ -0,0 +1,66 @@
+import os
+import unittest
+from obsidian_parser import ObsidianParser
+from obsidian_parser.transclusion import find_section
+from tests.fixtures import VaultTestCase
+
+
+class TransclusionTestCase(VaultTestCase):
+    """Test expanding the notes and sections embedded into notes."""
+
+    def setUp(self):
+        """Set up a vault with shared snippets outside of the exported folder."""
+        super().setUp()
+        self.write("logo.png", "png")
+        self.write("snippets/footer.md", "---\ntags: [snippet]\n---\nShared footer ![[logo.png]]\n")
+        self.write("blog/first.md", "# First\n\n![[footer]]\n\n![[second#Part two]]\n")
+        self.write("blog/second.md", "# Second\n\n## Part one\n\nOne\n\n## Part two\n\nTwo ![[footer]]\n\n### Detail\n\nMore\n\n## Part three\n\nThree\n")
+        self.write("blog/loop.md", "# Loop\n\nBefore ![[loop-back]]\n")
+        self.write("snippets/loop-back.md", "Back ![[loop]]\n")
+
+    def read_page(self, bundle):
+        """Return the content of an exported page."""
+        return self.read(os.path.join(bundle, "index.md"))
+
+    def test_find_section(self):
+        """A section runs up to the next heading of the same or a higher level, a block is its paragraph."""
+        body = "# A\n\n## B\n\nb\n\n### C\n\nc\n\n## D\n\nfirst\nsecond ^block\n\nafter\n"
+        self.assertEqual(find_section(body, "B"), "## B\n\nb\n\n### C\n\nc\n\n")
+        self.assertEqual(find_section(body, "A#C"), "### C\n\nc\n\n")
+        self.assertEqual(find_section(body, "^block"), "first\nsecond")
+        self.assertIsNone(find_section(body, "Missing"))
+
+    def test_embeds_are_expanded(self):
+        """Notes and sections are inlined, and their assets bundled with the embedding page."""
+        parser = ObsidianParser(self.vault_dir, "blog", self.hugo_dir)
+        reads = []
+        read_note = parser.read_note
+        parser.read_note = lambda note: reads.append(note) or read_note(note)
+        with self.assertLogs("obsidian_parser", "DEBUG") as logs:
+            parser.process(erase_hugo_content=True)
+        page = self.read_page("first")
+        self.assertIn("Shared footer ![logo.png](first/logo.png)", page)
+        self.assertIn("## Part two\n\nTwo Shared footer", page)
+        self.assertIn("### Detail\n\nMore", page)
+        self.assertNotIn("Three", page)
+        self.assertNotIn("snippet", page)
+        self.assertTrue(os.path.exists(os.path.join(self.hugo_dir, "first", "logo.png")))
+        # The footer is embedded three times, but read once.
+        self.assertEqual(reads.count(os.path.join(self.vault_dir, "snippets", "footer.md")), 1)
+
+        self.assertIn("Before Back [loop](./)", self.read_page("loop"))
+        self.assertTrue(any("Embed cycle cut" in record.getMessage() for record in logs.records))
+
+    def test_incremental_follows_embedded_notes(self):
+        """Editing an embedded note exports the notes embedding it again."""
+        with self.assertLogs("obsidian_parser"):
+            ObsidianParser(self.vault_dir, "blog", self.hugo_dir).process(erase_hugo_content=True, incremental=True)
+        self.write("snippets/footer.md", "Edited footer\n")
+        with self.assertLogs("obsidian_parser") as logs:
+            ObsidianParser(self.vault_dir, "blog", self.hugo_dir).process(erase_hugo_content=True, incremental=True)
+        self.assertIn("Edited footer", self.read_page("first"))
+        self.assertIn("Skipped 1 unchanged note(s)", [record.getMessage() for record in logs.records])
+
+
+if __name__ == '__main__':
+    unittest.main()
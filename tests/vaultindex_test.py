@@ -0,0 +1,72 @@
+import os
+import unittest
+from obsidian_parser import ObsidianParser
+from obsidian_parser.tokenizer import tokenize
+from tests.fixtures import VaultTestCase
+
+
+class VaultIndexTestCase(VaultTestCase):
+    """Test wiki link resolution through the vault index."""
+
+    def setUp(self):
+        """Set up a vault with notes in nested folders."""
+        super().setUp()
+        notes = {
+            "blog/post.md": "---\naliases: [Old Post]\n---\n# Post\n\n## My Heading\n",
+            "blog/deep/Other Note.md": "# Other\n",
+            "blog/a/dup.md": "# Dup A\n",
+            "blog/b/c/dup.md": "# Dup B\n",
+            "blog/b/linker.md": "[[dup]]",
+        }
+        for path, content in notes.items():
+            self.write(path, content)
+        self.parser = ObsidianParser(self.vault_dir, "blog", self.hugo_dir)
+        with self.assertLogs("obsidian_parser"):
+            self.parser.build_vault_index(self.parser.get_notes_to_export(None))
+        self.index = self.parser.vault_index
+        self.note = os.path.join(self.vault_dir, "blog", "deep", "Other Note.md")
+
+    def test_resolve_by_name_path_and_alias(self):
+        """Names, vault and folder relative paths and aliases resolve."""
+        for link in ["post", "Post.md", "blog/post", "old post"]:
+            self.assertEqual(self.index.resolve(link, self.note), "../post/")
+        self.assertEqual(self.index.resolve("Other Note", None), "../other-note/")
+
+    def test_resolve_heading(self):
+        """Headings become Hugo anchors, links to the same note keep only the anchor."""
+        self.assertEqual(self.index.resolve("post#My Heading", self.note), "../post/#my-heading")
+        self.assertEqual(self.index.resolve("#Other", self.note), "#other")
+        self.assertEqual(self.index.unresolved, {})
+
+    def test_resolve_self_link(self):
+        """Links to the note itself point at its own page, at the heading when there is one."""
+        self.assertEqual(self.index.resolve("Other Note#Other", self.note), "#other")
+        self.assertEqual(self.index.resolve("Other Note", self.note), "./")
+        self.assertEqual(self.index.resolve("Other Note#^block", self.note), "./")
+        text = self.parser.replace_wiki_links("[[post|this page]]")
+        self.assertEqual(text, "[this page](../post/)")
+        self.assertEqual(
+            self.parser.collect_wiki_links(tokenize("[[Other Note|here]]"), self.note)[0][1], "[here](./)"
+        )
+
+    def test_unresolved(self):
+        """Unknown notes and headings are reported."""
+        self.assertIsNone(self.index.resolve("missing", self.note))
+        self.index.resolve("post#Nope", self.note)
+        self.assertEqual(set(self.index.unresolved), {"missing", "post#Nope"})
+
+    def test_ambiguous_prefers_closest(self):
+        """A shared name resolves to the note closest to the linking note."""
+        linker = os.path.join(self.vault_dir, "blog", "b", "linker.md")
+        self.assertEqual(self.index.locate("dup", linker)[0], os.path.join(self.vault_dir, "blog", "b", "c", "dup.md"))
+        self.index.resolve("dup", linker)
+        self.assertIn("dup", self.index.ambiguous)
+
+    def test_replace_wiki_links(self):
+        """Wiki links are rewritten to the resolved bundle URLs."""
+        text = self.parser.replace_wiki_links("[[blog/post#My Heading|see]] [[missing]]")
+        self.assertEqual(text, "[see](../post/#my-heading) [missing](missing)")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,198 @@
+import logging
+import os
+import tempfile
+import threading
+import time
+import unittest
+from obsidian_parser import ObsidianParser
+from obsidian_parser.watcher import InotifyBackend, VaultWatcher
+from tests.fixtures import VaultTestCase
+
+
+def inotify_available():
+    """Whether the inotify backend can be used here."""
+    try:
+        InotifyBackend(VaultWatcher(tempfile.gettempdir(), polling=True)).close()
+        return True
+    except (OSError, AttributeError):
+        return False
+
+
+class VaultWatcherTestCase(VaultTestCase):
+    """Test watching a vault for changes."""
+
+    def setUp(self):
+        """Set up a small vault."""
+        super().setUp()
+        os.makedirs(os.path.join(self.vault_dir, ".obsidian"))
+        self.write("blog/first.md", "# First\n")
+
+    def collect(self, watcher, change):
+        """Make a change and return the first batch the watcher yields."""
+        batches = []
+
+        def consume():
+            for batch in watcher:
+                batches.append(batch)
+                watcher.close()
+
+        thread = threading.Thread(target=consume)
+        thread.start()
+        time.sleep(0.1)
+        change()
+        thread.join(5)
+        watcher.close()
+        return {os.path.relpath(path, self.vault_dir) for path in batches[0]} if batches else None
+
+    def burst(self):
+        """Change a few files in quick succession."""
+        self.write("blog/first.md", "# First\n\nChanged\n")
+        self.write(".obsidian/workspace.json", "{}")
+        os.makedirs(os.path.join(self.vault_dir, "blog", "new"))
+        self.write("blog/new/second.md", "# Second\n")
+
+    def test_polling(self):
+        """Polling reports a burst of changes as one batch, without ignored folders."""
+        watcher = VaultWatcher(self.vault_dir, debounce=0.1, interval=0.05, polling=True)
+        self.assertEqual(self.collect(watcher, self.burst), {"blog/first.md", "blog/new/second.md"})
+
+    @unittest.skipUnless(inotify_available(), "inotify is not available")
+    def test_inotify(self):
+        """inotify reports a burst of changes as one batch, also in new folders."""
+        watcher = VaultWatcher(self.vault_dir, debounce=0.1)
+        self.assertIsInstance(watcher.backend, InotifyBackend)
+        self.assertLessEqual({"blog/first.md", "blog/new/second.md"}, self.collect(watcher, self.burst))
+
+    def test_watch_exports_affected_notes(self):
+        """Watch mode exports the changed notes and the notes linking to them."""
+        self.write("blog/second.md", "# Second\n\nLinks to [[first]]\n")
+        self.write("blog/third.md", "# Third\n")
+        parser = ObsidianParser(self.vault_dir, "blog", self.hugo_dir)
+        watcher = VaultWatcher(self.vault_dir, debounce=0.1, interval=0.05, polling=True)
+        messages = []
+        handler = logging.Handler(logging.DEBUG)
+        handler.emit = lambda record: messages.append(record.getMessage())
+
+        def rename():
+            time.sleep(0.5)
+            os.rename(os.path.join(self.vault_dir, "blog", "first.md"), os.path.join(self.vault_dir, "blog", "renamed.md"))
+            self.write("blog/second.md", "# Second\n\nLinks to [[renamed]]\n")
+            self.write("blog/third.md", "# Third\n\nEdited\n")
+            deadline = time.monotonic() + 5
+            while not any(message.startswith("Updated in") for message in messages) and time.monotonic() < deadline:
+                time.sleep(0.05)
+            watcher.close()
+
+        thread = threading.Thread(target=rename)
+        thread.start()
+        logger = logging.getLogger("obsidian_parser")
+        level = logger.level
+        logger.addHandler(handler)
+        logger.setLevel(logging.DEBUG)
+        try:
+            parser.watch(erase_hugo_content=True, watcher=watcher)
+        finally:
+            logger.removeHandler(handler)
+            logger.setLevel(level)
+        thread.join()
+        passes = "\n".join(messages).split("Detected")
+        self.assertEqual(len(passes), 2)
+        exported = sorted(
+            os.path.basename(line.rsplit(" ", 1)[-1])
+            for line in passes[1].splitlines() if line.startswith("Processing note:")
+        )
+        self.assertEqual(exported, ["renamed.md", "second.md", "third.md"])
+        self.assertEqual(sorted(os.listdir(self.hugo_dir)), [".obsidian-parser-manifest.json", "renamed", "second", "third"])
+
+
+class ProcessChangesTestCase(VaultTestCase):
+    """Test the passes of watch mode, which only check the notes the changed files affect."""
+
+    def setUp(self):
+        """Set up a vault with links, an embedded note outside the exported folder and an attachment, and export it."""
+        super().setUp()
+        self.write("blog/first.md", "# First\n\n![[logo.png]]\n")
+        self.write("blog/second.md", "# Second\n\nLinks to [[first]]\n")
+        self.write("blog/third.md", "# Third\n\n![[part]]\n")
+        self.write("blog/fourth.md", "# Fourth\n")
+        self.write("snippets/part.md", "Part one\n")
+        self.write("logo.png", "png")
+        self.parser = ObsidianParser(self.vault_dir, "blog", self.hugo_dir)
+        with self.assertLogs("obsidian_parser"):
+            self.manifest = self.parser.process_incremental(erase_hugo_content=True)
+
+    def process(self, *paths):
+        """Run a pass for the changed vault paths and return the notes it exported."""
+        self.manifest.reset()
+        with self.assertLogs("obsidian_parser", "DEBUG") as logs:
+            self.parser.process_changes({os.path.join(self.vault_dir, path) for path in paths}, self.manifest)
+        return sorted(
+            os.path.basename(line.rsplit(" ", 1)[-1])
+            for line in (record.getMessage() for record in logs.records)
+            if line.startswith("Processing note:")
+        )
+
+    def assertMatchesFullExport(self):
+        """The content directory is the same as that of an export from scratch."""
+        hugo_dir = os.path.join(self.tmp.name, "full")
+        os.makedirs(hugo_dir)
+        with self.assertLogs("obsidian_parser"):
+            ObsidianParser(self.vault_dir, "blog", hugo_dir).process(erase_hugo_content=True)
+        tree = lambda root: {
+            os.path.relpath(os.path.join(dirpath, file), root): self.read(os.path.join(dirpath, file))
+            for dirpath, dirs, files in os.walk(root) for file in files if file != ".obsidian-parser-manifest.json"
+        }
+        self.assertEqual(tree(self.hugo_dir), tree(hugo_dir))
+
+    def test_no_changes(self):
+        """A pass without changes exports nothing and leaves the manifest alone."""
+        mtime = os.stat(self.parser.manifest_path).st_mtime_ns
+        self.assertEqual(self.process(), [])
+        self.assertEqual(os.stat(self.parser.manifest_path).st_mtime_ns, mtime)
+
+    def test_changed_note(self):
+        """An edited note is exported with the notes linking to it, the others are not checked."""
+        self.write("blog/first.md", "---\naliases: [one]\n---\n# First\n\n![[logo.png]] Edited\n")
+        self.assertEqual(self.process("blog/first.md"), ["first.md"])
+        self.write("blog/fourth.md", "# Fourth\n\n[[one]]\n")
+        self.assertEqual(self.process("blog/fourth.md"), ["fourth.md"])
+        self.assertMatchesFullExport()
+
+    def test_renamed_and_deleted_notes(self):
+        """Renamed and deleted notes lose their bundles, and the notes linking to them are exported again."""
+        os.rename(os.path.join(self.vault_dir, "blog", "first.md"), os.path.join(self.vault_dir, "blog", "renamed.md"))
+        self.assertEqual(self.process("blog/first.md", "blog/renamed.md"), ["renamed.md", "second.md"])
+        os.remove(os.path.join(self.vault_dir, "blog", "fourth.md"))
+        self.assertEqual(self.process("blog/fourth.md"), [])
+        self.assertEqual(sorted(os.listdir(self.hugo_dir)), [".obsidian-parser-manifest.json", "renamed", "second", "third"])
+        self.assertMatchesFullExport()
+
+    def test_new_folder(self):
+        """The notes of a new folder are exported, and links to them resolve."""
+        self.write("blog/new/fifth.md", "# Fifth\n\n[[fourth]]\n")
+        self.write("blog/fourth.md", "# Fourth\n\n[[fifth]]\n")
+        self.assertEqual(self.process("blog/new", "blog/fourth.md"), ["fifth.md", "fourth.md"])
+        self.assertIn("[fifth](../fifth/)", self.read("fourth/index.md"))
+        self.assertMatchesFullExport()
+
+    def test_embedded_note(self):
+        """A changed note outside the exported folder exports the notes embedding it."""
+        self.write("snippets/part.md", "Part two\n")
+        self.assertEqual(self.process("snippets/part.md"), ["third.md"])
+        self.assertIn("Part two", self.read("third/index.md"))
+        self.assertMatchesFullExport()
+
+    def test_attachments(self):
+        """Changed and new attachments export the notes embedding them."""
+        self.write("logo.png", "new png")
+        self.assertEqual(self.process("logo.png"), ["first.md"])
+        self.write("blog/fourth.md", "# Fourth\n\n![[chart.png]]\n")
+        self.assertEqual(self.process("blog/fourth.md"), ["fourth.md"])
+        self.write("img/chart.png", "chart")
+        self.assertEqual(self.process("img"), ["fourth.md"])
+        self.assertEqual(self.read("fourth/chart.png"), "chart")
+        self.assertMatchesFullExport()
+
+
+if __name__ == '__main__':
+    unittest.main()